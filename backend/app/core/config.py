@@ -1,11 +1,15 @@
 import os
-from typing import List
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Placeholder secret used when SECRET_KEY is not set; admin endpoints stay disabled with it
+DEV_SECRET_KEY = "insecure-secret-key-for-dev-only"
+
+
 class Settings(BaseSettings):
     # API settings
     API_V1_STR: str = "/api"
@@ -17,19 +21,103 @@ class Settings(BaseSettings):
     # OpenAI API settings
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4o")
+    OPENAI_MAX_CONCURRENCY: int = 8  # completions in flight at once
+    OPENAI_TIMEOUT: float = 60.0  # seconds per call
+    OPENAI_MAX_CONNECTIONS: int = 20
+    # Outbound LLM resilience: retries, circuit breaker and client-side rate limits (0 = unlimited)
+    OPENAI_MAX_RETRIES: int = 3
+    OPENAI_RETRY_BASE_DELAY: float = 0.5  # seconds
+    OPENAI_RETRY_MAX_DELAY: float = 8.0  # seconds
+    OPENAI_BREAKER_FAILURE_THRESHOLD: int = 5
+    OPENAI_BREAKER_RESET_SECONDS: float = 30.0
+    OPENAI_REQUESTS_PER_MINUTE: int = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "500"))
+    OPENAI_TOKENS_PER_MINUTE: int = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "150000"))
+    # Upstream traffic: "live", "record" (capture exchanges to the cassette) or "replay" (serve them offline)
+    OPENAI_TRANSPORT: str = os.getenv("OPENAI_TRANSPORT", "live")
+    OPENAI_CASSETTE_PATH: str = os.getenv("OPENAI_CASSETTE_PATH", "data/llm_cassette.jsonl")
+    # Replay latency: "recorded", "lognormal" (median/sigma below) or "none"; chunk interval overrides recorded pacing
+    OPENAI_REPLAY_LATENCY: str = os.getenv("OPENAI_REPLAY_LATENCY", "recorded")
+    OPENAI_REPLAY_LATENCY_MEDIAN: float = 0.8  # seconds
+    OPENAI_REPLAY_LATENCY_SIGMA: float = 0.5
+    OPENAI_REPLAY_CHUNK_INTERVAL: Optional[float] = None  # seconds
+    OPENAI_REPLAY_SEED: int = 0
+    OPENAI_REPLAY_STRICT: bool = False  # 404 for unrecorded requests instead of a similar recording
+    # Answer and extract MatterGen parameters in one call (falls back to two calls)
+    OPENAI_SINGLE_PASS_EXTRACTION: bool = os.getenv("OPENAI_SINGLE_PASS_EXTRACTION", "True").lower() == "true"
+    
+    # LLM telemetry: per-request usage headers and pricing overrides (model -> [prompt, completion] USD per 1M tokens)
+    LLM_USAGE_HEADERS: bool = os.getenv("LLM_USAGE_HEADERS", "False").lower() == "true"
+    LLM_PRICING: Dict[str, List[float]] = {}
+    
+    # Chat history compaction: older turns beyond the budget are summarized
+    HISTORY_TOKEN_BUDGET: int = 3000
+    HISTORY_KEEP_LAST_MESSAGES: int = 8
+    HISTORY_SUMMARY_BATCH: int = 6
+    
+    # Server-side chat sessions ("memory" or "sqlite")
+    SESSION_STORAGE: str = os.getenv("SESSION_STORAGE", "sqlite")
+    SESSION_IDLE_TTL_SECONDS: int = 24 * 3600
+    SESSION_MAX_MEMORY_BYTES: int = 64 * 1024 * 1024  # 64 MB of message text
+    
+    # Response cache for property guidance
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    RESPONSE_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    RESPONSE_CACHE_MAX_DISK_ENTRIES: int = 100000
+    
+    # Semantic cache for chat interpretations (cosine similarity of hashed n-grams)
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "False").lower() == "true"
+    SEMANTIC_CACHE_THRESHOLD: float = 0.85
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 512  # per goal/property pair
+    SEMANTIC_CACHE_MAX_TOTAL_ENTRIES: int = 4096  # across all keys, least recently used keys dropped first
+    SEMANTIC_CACHE_DIM: int = 2048
+    
+    # Batch interpretation: items per request and completions in flight per batch
+    BATCH_INTERPRET_MAX_ITEMS: int = 20
+    BATCH_INTERPRET_MAX_CONCURRENCY: int = 4
+    
+    # Local lexicon for layman property descriptions, consulted before the LLM
+    PROPERTY_LEXICON_ENABLED: bool = os.getenv("PROPERTY_LEXICON_ENABLED", "True").lower() == "true"
+    PROPERTY_LEXICON_MIN_CONFIDENCE: float = 0.8
     
     # File upload settings
     UPLOAD_DIR: str = "data/uploads"
     MAX_UPLOAD_SIZE: int = 5 * 1024 * 1024  # 5 MB
     
+    # Material storage settings ("json" or "sqlite"; switching to sqlite imports the JSON files once)
+    MATERIAL_STORAGE_BACKEND: str = os.getenv("MATERIAL_STORAGE_BACKEND", "json")
+    
+    # Write-behind journal for material mutations (writes are acknowledged before they reach storage)
+    MATERIAL_JOURNAL_ENABLED: bool = os.getenv("MATERIAL_JOURNAL_ENABLED", "False").lower() == "true"
+    MATERIAL_JOURNAL_FSYNC_INTERVAL: float = 0.05  # seconds
+    MATERIAL_JOURNAL_FSYNC_BATCH_SIZE: int = 256
+    MATERIAL_JOURNAL_COMPACT_INTERVAL: float = 60.0  # seconds
+    
+    # Dataset ingestion settings
+    INGEST_CHUNK_SIZE: int = 10000
+    INGEST_MAX_REPORTED_ERRORS: int = 1000
+    MAX_CONCURRENT_INGESTIONS: int = 2
+    INGEST_JOB_RETENTION_SECONDS: int = 3600  # finished jobs stay queryable this long
+    
+    # Number of parsed formulas kept in the formula LRU cache
+    FORMULA_CACHE_SIZE: int = 65536
+    
     # Security settings
-    SECRET_KEY: str = os.getenv("SECRET_KEY", "insecure-secret-key-for-dev-only")
+    SECRET_KEY: str = os.getenv("SECRET_KEY", DEV_SECRET_KEY)
     
     # Development settings
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
     
     # Template settings
     TEMPLATES_DIR: str = "app/templates"
+    # Reload templates as their files change, with inotify or by polling modification times.
+    # Off by default; docker-compose turns it on for development.
+    TEMPLATE_HOT_RELOAD: bool = os.getenv("TEMPLATE_HOT_RELOAD", "False").lower() == "true"
+    TEMPLATE_POLL_INTERVAL: float = 2.0
+    # Usage counts behind the popular templates, saved under UPLOAD_DIR
+    TEMPLATE_POPULARITY_CAPACITY: int = 256
+    TEMPLATE_POPULARITY_HALF_LIFE: float = 7 * 24 * 3600.0  # seconds
+    TEMPLATE_POPULARITY_FLUSH_INTERVAL: float = 60.0  # seconds
+    TEMPLATE_POPULARITY_REFRESH_INTERVAL: float = 5.0  # seconds
     
     # Colab code settings
     COLAB_TEMPLATES_DIR: str = "app/templates/colab"
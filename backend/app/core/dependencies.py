@@ -1,10 +1,22 @@
-from fastapi import Depends
+import os
+import hmac
+from typing import Optional
+from fastapi import Depends, Header, HTTPException
 
 from app.services.openai_service import OpenAIService
 from app.services.material_service import MaterialService
 from app.services.template_service import TemplateService
+from app.services.template_popularity import TemplatePopularityTracker
 from app.services.colab_service import ColabService
-from app.core.config import settings
+from app.services.ingestion_jobs import IngestionJobManager
+from app.services.response_cache import ResponseCache
+from app.services.session_store import SessionStore
+from app.services.semantic_cache import SemanticCache
+from app.services.property_lexicon import PropertyLexicon
+from app.services.llm_telemetry import LLMTelemetry
+from app.services.llm_transport import create_llm_transport
+from app.services.llm_resilience import ResilientCaller
+from app.core.config import settings, DEV_SECRET_KEY
 
 
 # OpenAI Service singleton
@@ -14,13 +26,87 @@ def get_openai_service():
     """Dependency to get OpenAI service instance"""
     global _openai_service
     if _openai_service is None:
+        transport = create_llm_transport(
+            settings.OPENAI_TRANSPORT,
+            settings.OPENAI_CASSETTE_PATH,
+            max_connections=settings.OPENAI_MAX_CONNECTIONS,
+            latency=settings.OPENAI_REPLAY_LATENCY,
+            latency_median=settings.OPENAI_REPLAY_LATENCY_MEDIAN,
+            latency_sigma=settings.OPENAI_REPLAY_LATENCY_SIGMA,
+            chunk_interval=settings.OPENAI_REPLAY_CHUNK_INTERVAL,
+            seed=settings.OPENAI_REPLAY_SEED,
+            strict=settings.OPENAI_REPLAY_STRICT
+        )
         _openai_service = OpenAIService(
-            api_key=settings.OPENAI_API_KEY,
-            model=settings.OPENAI_MODEL
+            # Replayed traffic never reaches the provider, so no key is needed
+            api_key=settings.OPENAI_API_KEY or ("replay" if settings.OPENAI_TRANSPORT == "replay" else ""),
+            model=settings.OPENAI_MODEL,
+            max_concurrency=settings.OPENAI_MAX_CONCURRENCY,
+            timeout=settings.OPENAI_TIMEOUT,
+            max_connections=settings.OPENAI_MAX_CONNECTIONS,
+            single_pass_extraction=settings.OPENAI_SINGLE_PASS_EXTRACTION,
+            history_token_budget=settings.HISTORY_TOKEN_BUDGET,
+            history_keep_last_messages=settings.HISTORY_KEEP_LAST_MESSAGES,
+            history_summary_batch=settings.HISTORY_SUMMARY_BATCH,
+            resilient_caller=ResilientCaller(
+                max_retries=settings.OPENAI_MAX_RETRIES,
+                base_delay=settings.OPENAI_RETRY_BASE_DELAY,
+                max_delay=settings.OPENAI_RETRY_MAX_DELAY,
+                failure_threshold=settings.OPENAI_BREAKER_FAILURE_THRESHOLD,
+                reset_seconds=settings.OPENAI_BREAKER_RESET_SECONDS,
+                requests_per_minute=settings.OPENAI_REQUESTS_PER_MINUTE,
+                tokens_per_minute=settings.OPENAI_TOKENS_PER_MINUTE
+            ),
+            response_cache=ResponseCache(
+                db_path=os.path.join(settings.UPLOAD_DIR, "response_cache.db"),
+                max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+                ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+                max_disk_entries=settings.RESPONSE_CACHE_MAX_DISK_ENTRIES
+            ),
+            semantic_cache=SemanticCache(
+                threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+                max_entries_per_key=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+                max_entries=settings.SEMANTIC_CACHE_MAX_TOTAL_ENTRIES,
+                dim=settings.SEMANTIC_CACHE_DIM
+            ) if settings.SEMANTIC_CACHE_ENABLED else None,
+            property_lexicon=PropertyLexicon(
+                min_confidence=settings.PROPERTY_LEXICON_MIN_CONFIDENCE
+            ) if settings.PROPERTY_LEXICON_ENABLED else None,
+            telemetry=LLMTelemetry(pricing=settings.LLM_PRICING),
+            transport=transport
         )
     return _openai_service
 
 
+# Chat session store singleton
+_session_store = None
+
+def get_session_store():
+    """Dependency to get the chat session store"""
+    global _session_store
+    if _session_store is None:
+        db_path = None
+        if settings.SESSION_STORAGE == "sqlite":
+            db_path = os.path.join(settings.UPLOAD_DIR, "sessions.db")
+        _session_store = SessionStore(
+            db_path=db_path,
+            idle_ttl_seconds=settings.SESSION_IDLE_TTL_SECONDS,
+            max_memory_bytes=settings.SESSION_MAX_MEMORY_BYTES
+        )
+    return _session_store
+
+
+def require_admin(x_admin_key: Optional[str] = Header(None)):
+    """Dependency that only lets requests carrying the secret key in X-Admin-Key through
+
+    Admin endpoints are refused outright until a real SECRET_KEY is configured.
+    """
+    if not settings.SECRET_KEY or settings.SECRET_KEY == DEV_SECRET_KEY:
+        raise HTTPException(status_code=503, detail="Admin endpoints are disabled until SECRET_KEY is configured")
+    if x_admin_key is None or not hmac.compare_digest(x_admin_key, settings.SECRET_KEY):
+        raise HTTPException(status_code=403, detail="Admin key required")
+
+
 # Material Service singleton
 _material_service = None
 
@@ -30,11 +116,28 @@ def get_material_service(openai_service: OpenAIService = Depends(get_openai_serv
     if _material_service is None:
         _material_service = MaterialService(
             openai_service=openai_service,
-            upload_dir=settings.UPLOAD_DIR
+            upload_dir=settings.UPLOAD_DIR,
+            storage_backend=settings.MATERIAL_STORAGE_BACKEND,
+            journal=settings.MATERIAL_JOURNAL_ENABLED
         )
     return _material_service
 
 
+# Ingestion job manager singleton
+_ingestion_job_manager = None
+
+def get_ingestion_job_manager(material_service: MaterialService = Depends(get_material_service)):
+    """Dependency to get the dataset ingestion job manager"""
+    global _ingestion_job_manager
+    if _ingestion_job_manager is None:
+        _ingestion_job_manager = IngestionJobManager(
+            material_service=material_service,
+            max_concurrent=settings.MAX_CONCURRENT_INGESTIONS,
+            retention_seconds=settings.INGEST_JOB_RETENTION_SECONDS
+        )
+    return _ingestion_job_manager
+
+
 # Template Service singleton
 _template_service = None
 
@@ -43,7 +146,16 @@ def get_template_service():
     global _template_service
     if _template_service is None:
         _template_service = TemplateService(
-            templates_dir=settings.TEMPLATES_DIR
+            templates_dir=settings.TEMPLATES_DIR,
+            watch=settings.TEMPLATE_HOT_RELOAD,
+            poll_interval=settings.TEMPLATE_POLL_INTERVAL,
+            popularity=TemplatePopularityTracker(
+                path=os.path.join(settings.UPLOAD_DIR, "template_popularity.json"),
+                capacity=settings.TEMPLATE_POPULARITY_CAPACITY,
+                half_life=settings.TEMPLATE_POPULARITY_HALF_LIFE,
+                flush_interval=settings.TEMPLATE_POPULARITY_FLUSH_INTERVAL,
+                refresh_interval=settings.TEMPLATE_POPULARITY_REFRESH_INTERVAL
+            )
         )
     return _template_service
 
@@ -63,4 +175,17 @@ def get_colab_service(
             material_service=material_service,
             templates_dir=settings.COLAB_TEMPLATES_DIR
         )
-    return _colab_service
\ No newline at end of file
+    return _colab_service
+
+async def shutdown_services():
+    """Release resources held by the service singletons"""
+    if _ingestion_job_manager is not None:
+        _ingestion_job_manager.shutdown()
+    if _template_service is not None:
+        _template_service.close()
+    if _material_service is not None:
+        _material_service.close()
+    if _session_store is not None:
+        _session_store.close()
+    if _openai_service is not None:
+        await _openai_service.close()
@@ -0,0 +1,11 @@
+from typing import Optional
+
+
+def format_sse(data: str, event: Optional[str] = None) -> str:
+    """Format a server-sent event message"""
+    message = ""
+    if event:
+        message += f"event: {event}\n"
+    for line in data.splitlines() or [""]:
+        message += f"data: {line}\n"
+    return message + "\n"
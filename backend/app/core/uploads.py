@@ -0,0 +1,108 @@
+import os
+import tempfile
+from typing import Iterable
+from fastapi import HTTPException, UploadFile
+from starlette.responses import JSONResponse
+
+# Size of the chunks read from an upload at a time
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+# Allowance for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(HTTPException):
+    """Raised when a request body crosses the configured size limit"""
+
+    def __init__(self, max_size: int):
+        super().__init__(status_code=413, detail=f"File exceeds the maximum upload size of {max_size} bytes")
+
+
+async def save_upload_to_temp(file: UploadFile, max_size: int, suffix: str = ".csv") -> str:
+    """Stream an upload to a temporary file in chunks, aborting once it exceeds max_size
+
+    The temporary file is removed if anything goes wrong; on success the
+    caller owns the returned path and must delete it.
+    """
+    if file.size is not None and file.size > max_size:
+        raise UploadTooLarge(max_size)
+
+    temp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    try:
+        with temp:
+            size = 0
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge(max_size)
+                temp.write(chunk)
+    except BaseException:
+        os.unlink(temp.name)
+        raise
+
+    return temp.name
+
+
+class UploadSizeLimitMiddleware:
+    """ASGI middleware that rejects oversized upload bodies before they are parsed
+
+    Requests whose Content-Length is already too large are refused without
+    reading the body; chunked requests are aborted as soon as the received
+    bytes cross the limit.
+    """
+
+    def __init__(self, app, max_size: int, paths: Iterable[str]):
+        self.app = app
+        self.max_size = max_size
+        self.max_body_size = max_size + MULTIPART_OVERHEAD
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].rstrip("/") not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers", []):
+            if name != b"content-length":
+                continue
+            try:
+                content_length = int(value)
+            except ValueError:
+                response = JSONResponse(status_code=400, content={"detail": "Invalid Content-Length header"})
+                await response(scope, receive, send)
+                return
+            if content_length > self.max_body_size:
+                await self._reject(scope, receive, send)
+                return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    raise UploadTooLarge(self.max_size)
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except UploadTooLarge:
+            if not response_started:
+                await self._reject(scope, receive, send)
+
+    async def _reject(self, scope, receive, send):
+        error = UploadTooLarge(self.max_size)
+        response = JSONResponse(status_code=error.status_code, content={"detail": error.detail})
+        await response(scope, receive, send)
@@ -0,0 +1,39 @@
+from app.services.llm_telemetry import RequestUsage, current_usage
+
+
+class LLMUsageHeadersMiddleware:
+    """ASGI middleware that reports the LLM usage of each request in response headers
+
+    Usage is collected while the response is produced, so streamed responses
+    only report the calls completed before their headers were sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        usage = RequestUsage()
+        token = current_usage.set(usage)
+
+        async def send_with_usage(message):
+            if message["type"] == "http.response.start" and (usage.calls or usage.cache_hits or usage.cache_misses):
+                headers = list(message.get("headers", []))
+                headers.extend([
+                    (b"x-llm-calls", str(usage.calls).encode()),
+                    (b"x-llm-prompt-tokens", str(usage.prompt_tokens).encode()),
+                    (b"x-llm-completion-tokens", str(usage.completion_tokens).encode()),
+                    (b"x-llm-cost-usd", f"{usage.cost_usd:.6f}".encode()),
+                    (b"x-llm-time-ms", str(round(usage.llm_seconds * 1000)).encode()),
+                    (b"x-llm-cache-hits", str(usage.cache_hits).encode())
+                ])
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_usage)
+        finally:
+            current_usage.reset(token)
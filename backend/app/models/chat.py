@@ -46,6 +46,32 @@ class ChatToMatterGenResponse(BaseModel):
     explanation: str
 
 
+class BatchInterpretRequest(BaseModel):
+    """Request model for interpreting several properties at once
+    
+    Either a list of full requests, or one chat history and goal with a list of properties.
+    """
+    requests: List[ChatToMatterGenRequest] = []
+    chat_history: Optional[ChatHistory] = None
+    current_goal: Optional[str] = None
+    properties: List[str] = []
+    merge: bool = Field(False, description="Answer properties that share a chat history with a single completion")
+
+
+class BatchInterpretItem(BaseModel):
+    """Result of one property of a batch interpretation"""
+    current_property: str
+    result: Optional[ChatToMatterGenResponse] = None
+    error: Optional[str] = None
+
+
+class BatchInterpretResponse(BaseModel):
+    """Response model for a batch interpretation"""
+    results: List[BatchInterpretItem]
+    succeeded: int
+    failed: int
+
+
 class UserQuery(BaseModel):
     """Model for a user query"""
     text: str
@@ -56,4 +82,36 @@ class AssistantResponse(BaseModel):
     """Model for assistant response"""
     text: str
     interpretations: Optional[List[PropertyInterpretation]] = None
-    mattergen_params: Optional[Dict[str, Any]] = None
\ No newline at end of file
+    mattergen_params: Optional[Dict[str, Any]] = None
+
+
+class ChatSessionCreate(BaseModel):
+    """Request model for starting a chat session"""
+    metadata: Dict[str, Any] = {}
+
+
+class ChatSession(BaseModel):
+    """Model for a server-side chat session"""
+    session_id: str
+    created_at: str
+    metadata: Dict[str, Any] = {}
+    messages: List[ChatMessage] = []
+
+
+class SessionMessage(BaseModel):
+    """Request model for sending a user message to a chat session"""
+    session_id: Optional[str] = Field(None, description="Session to continue; a new session is started if omitted")
+    message: str
+
+
+class SessionReply(BaseModel):
+    """Response model for a message sent to a chat session"""
+    session_id: str
+    message: ChatMessage
+
+
+class SessionInterpretRequest(BaseModel):
+    """Request model for interpreting a chat session for MatterGen"""
+    session_id: str
+    current_goal: str = Field(description="Current material design goal")
+    current_property: str = Field(description="Current property being discussed")
@@ -1,5 +1,6 @@
 from typing import List, Optional, Dict, Any, Union
 from pydantic import BaseModel, Field
+from enum import Enum
 
 
 class MaterialBase(BaseModel):
@@ -32,10 +33,78 @@ class Material(MaterialBase):
         orm_mode = True
 
 
+class RejectedRow(BaseModel):
+    """Model for a dataset row rejected during ingestion"""
+    line: int = Field(description="Line number in the uploaded CSV (the header is line 1)")
+    reason: str
+
+
+class IngestionReport(BaseModel):
+    """Model for the outcome of a dataset ingestion"""
+    total_rows: int
+    accepted_rows: int
+    rejected_rows: int
+    elapsed_seconds: float
+    rows_per_second: float
+    rejected: List[RejectedRow] = Field(
+        description="Rejected rows with reasons (truncated for very large files)",
+        default=[]
+    )
+
+
+class IngestionJobStatus(str, Enum):
+    """Enum for dataset ingestion job states"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class IngestionJob(BaseModel):
+    """Model for a background dataset ingestion job"""
+    id: str
+    status: IngestionJobStatus = IngestionJobStatus.QUEUED
+    filename: str
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    total_rows: Optional[int] = Field(
+        description="Estimated number of data rows in the file",
+        default=None
+    )
+    rows_processed: int = 0
+    rows_accepted: int = 0
+    rows_rejected: int = 0
+    rows_per_second: float = 0.0
+    eta_seconds: Optional[float] = None
+    errors: List[RejectedRow] = Field(
+        description="Rejected rows with reasons (truncated for very large files)",
+        default=[]
+    )
+    error: Optional[str] = Field(
+        description="Reason the whole job failed, if it did",
+        default=None
+    )
+    metadata: Dict[str, Any] = {}
+
+
+class SimilarityMetric(str, Enum):
+    """Enum for composition distance metrics"""
+    COSINE = "cosine"
+    L1 = "l1"
+
+
+class SimilarMaterial(BaseModel):
+    """Model for a nearest-neighbour search result"""
+    material: Material
+    distance: float = Field(description="Composition distance to the query (lower is more similar)")
+
+
 class MaterialDataset(BaseModel):
     """Model for a complete material dataset"""
     materials: List[Material]
     metadata: Dict[str, Any] = {}
+    report: Optional[IngestionReport] = None
 
 
 class MaterialProperty(BaseModel):
@@ -55,6 +124,10 @@ class MaterialDesignGoal(BaseModel):
     material_constraints: List[str] = Field(
         description="List of material formulas to use as constraints"
     )
+    template_id: Optional[str] = Field(
+        default=None,
+        description="ID of the design template this goal was started from, if any"
+    )
     
     
 class MaterialDesignResult(BaseModel):
@@ -64,4 +137,12 @@ class MaterialDesignResult(BaseModel):
     properties: List[MaterialProperty]
     materials_used: List[str]
     colab_code: str
-    created_at: str
\ No newline at end of file
+    created_at: str
+
+
+class MaterialDesignSummary(BaseModel):
+    """Model for a design result in listings"""
+    design_id: str
+    name: str
+    type: str
+    created_at: str
@@ -41,4 +41,16 @@ class TemplateResponse(BaseModel):
     """Response model for templates"""
     templates: List[DesignTemplate]
     total: int
-    categories: List[str]
\ No newline at end of file
+    categories: List[str]
+
+
+class TemplateSearchHit(BaseModel):
+    """A template matching a search, with its relevance score"""
+    template: DesignTemplate
+    score: float = Field(description="BM25 relevance score; 0 when searching by filters only")
+
+
+class TemplateSearchResponse(BaseModel):
+    """Response model for template searches"""
+    results: List[TemplateSearchHit]
+    total: int
\ No newline at end of file
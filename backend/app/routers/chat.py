@@ -1,5 +1,7 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional
+import json
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 from app.models.chat import (
     UserQuery, 
@@ -7,27 +9,104 @@ from app.models.chat import (
     ChatHistory,
     ChatMessage,
     ChatToMatterGenRequest,
-    ChatToMatterGenResponse
+    ChatToMatterGenResponse,
+    BatchInterpretRequest,
+    BatchInterpretItem,
+    BatchInterpretResponse,
+    ChatSession,
+    ChatSessionCreate,
+    SessionMessage,
+    SessionReply,
+    SessionInterpretRequest
 )
 from app.services.openai_service import OpenAIService
-from app.core.dependencies import get_openai_service
+from app.services.session_store import SessionStore
+from app.core.dependencies import get_openai_service, get_session_store, require_admin
+from app.core.config import settings
+from app.core.sse import format_sse
+from app.services.history_manager import last_compaction
+from app.services.semantic_cache import last_semantic_lookup
+from app.services.property_lexicon import last_lexicon_outcome
+from app.services.llm_resilience import UpstreamUnavailableError
 
 
 router = APIRouter()
 
+# Streaming endpoints and the telemetry methods their completions are recorded under
+STREAM_METHODS = {"query": "stream_query", "continue": "stream_conversation"}
+
+
+def _set_history_headers(response: Response):
+    """Report the token counts of the history compacted for this request"""
+    stats = last_compaction.get()
+    if stats is not None:
+        response.headers["X-History-Tokens-Before"] = str(stats.tokens_before)
+        response.headers["X-History-Tokens-After"] = str(stats.tokens_after)
+        response.headers["X-History-Summarized-Messages"] = str(stats.summarized_messages)
+
+
+def _set_interpretation_headers(response: Response):
+    """Report whether this request's interpretation came from the lexicon or the semantic cache"""
+    outcome = last_lexicon_outcome.get()
+    if outcome is not None:
+        response.headers["X-Lexicon"] = outcome
+    
+    lookup = last_semantic_lookup.get()
+    if lookup is not None:
+        hit, similarity = lookup
+        response.headers["X-Semantic-Cache"] = "hit" if hit else "miss"
+        response.headers["X-Semantic-Similarity"] = f"{similarity:.4f}"
+
+
+def _wants_stream(request: Request) -> bool:
+    """Whether the client asked for server-sent events"""
+    return "text/event-stream" in request.headers.get("accept", "")
+
+
+def _sse_response(events: AsyncIterator[Tuple[str, Any]]) -> StreamingResponse:
+    """Forward (event, payload) pairs as server-sent events
+
+    Tokens are sent as ``token`` events, the structured result as one
+    ``final`` event, and a failure mid-stream as an ``error`` event.
+    """
+    async def stream():
+        try:
+            async for event, payload in events:
+                if event == "token":
+                    yield format_sse(json.dumps({"text": payload}), event="token")
+                else:
+                    yield format_sse(payload.json(), event=event)
+        except Exception as e:
+            yield format_sse(json.dumps({"detail": str(e)}), event="error")
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 
 @router.post("/query", response_model=AssistantResponse)
 async def chat_query(
     query: UserQuery,
+    request: Request,
     openai_service: OpenAIService = Depends(get_openai_service)
 ):
     """
     Process a user query and return a response
+
+    With ``Accept: text/event-stream`` the answer is streamed as ``token``
+    events followed by a ``final`` event holding the full response.
     """
+    if _wants_stream(request):
+        return _sse_response(openai_service.stream_query(query.text, query.context))
+    
     try:
         # Process the user's query with OpenAI
         response = await openai_service.process_query(query.text, query.context)
         return response
+    except UpstreamUnavailableError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
@@ -35,6 +114,7 @@ async def chat_query(
 @router.post("/interpret", response_model=ChatToMatterGenResponse)
 async def interpret_chat(
     request: ChatToMatterGenRequest,
+    response: Response,
     openai_service: OpenAIService = Depends(get_openai_service)
 ):
     """
@@ -47,23 +127,89 @@ async def interpret_chat(
             request.current_goal,
             request.current_property
         )
+        _set_history_headers(response)
+        _set_interpretation_headers(response)
         return interpretation
+    except UpstreamUnavailableError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interpreting chat: {str(e)}")
 
 
+@router.post("/interpret/batch", response_model=BatchInterpretResponse)
+async def interpret_chat_batch(
+    request: BatchInterpretRequest,
+    openai_service: OpenAIService = Depends(get_openai_service)
+):
+    """
+    Interpret several properties concurrently, returning a result or an error per property
+    """
+    items = list(request.requests)
+    if request.properties:
+        if request.chat_history is None or request.current_goal is None:
+            raise HTTPException(status_code=400, detail="chat_history and current_goal are required with properties")
+        items.extend(
+            ChatToMatterGenRequest(
+                chat_history=request.chat_history,
+                current_goal=request.current_goal,
+                current_property=prop
+            )
+            for prop in request.properties
+        )
+    
+    if not items:
+        raise HTTPException(status_code=400, detail="No properties to interpret")
+    if len(items) > settings.BATCH_INTERPRET_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BATCH_INTERPRET_MAX_ITEMS} properties can be interpreted per batch"
+        )
+    
+    results = await openai_service.interpret_batch(
+        items,
+        merge=request.merge,
+        max_concurrency=settings.BATCH_INTERPRET_MAX_CONCURRENCY
+    )
+    
+    # Nothing succeeded because the provider is down: report it as such
+    if all(isinstance(result, UpstreamUnavailableError) for result in results):
+        raise results[0]
+    
+    batch = [
+        BatchInterpretItem(current_property=item.current_property, error=str(result))
+        if isinstance(result, Exception) else
+        BatchInterpretItem(current_property=item.current_property, result=result)
+        for item, result in zip(items, results)
+    ]
+    failed = sum(1 for item in batch if item.error is not None)
+    return BatchInterpretResponse(results=batch, succeeded=len(batch) - failed, failed=failed)
+
+
 @router.post("/continue", response_model=List[ChatMessage])
 async def continue_conversation(
     history: ChatHistory,
+    request: Request,
+    response: Response,
     openai_service: OpenAIService = Depends(get_openai_service)
 ):
     """
     Continue a conversation based on chat history
+
+    Long histories are compacted to a token budget; the token counts before
+    and after are returned in the ``X-History-Tokens-*`` headers. With
+    ``Accept: text/event-stream`` the reply is streamed as ``token`` events
+    followed by a ``final`` event holding the new message.
     """
+    if _wants_stream(request):
+        return _sse_response(openai_service.stream_conversation(history))
+    
     try:
         # Continue the conversation based on chat history
         continued_messages = await openai_service.continue_conversation(history)
+        _set_history_headers(response)
         return continued_messages
+    except UpstreamUnavailableError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error continuing conversation: {str(e)}")
 
@@ -81,5 +227,219 @@ async def get_property_guidance(
         # Get guidance for a specific material property
         guidance = await openai_service.get_property_guidance(property_name, user_level)
         return guidance
+    except UpstreamUnavailableError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting property guidance: {str(e)}")
+
+
+@router.get("/stream-stats", response_model=Dict[str, Dict[str, Any]])
+async def get_stream_stats(
+    openai_service: OpenAIService = Depends(get_openai_service)
+):
+    """
+    Get time-to-first-token statistics for the streaming chat endpoints
+
+    A view over the LLM telemetry of the completions each endpoint streams,
+    also reported per method by ``/api/metrics``.
+    """
+    return {
+        name: openai_service.telemetry.method_snapshot(method)["time_to_first_token"]
+        for name, method in STREAM_METHODS.items()
+    }
+
+
+@router.get("/cache/stats", response_model=Dict[str, Any])
+async def get_cache_stats(
+    openai_service: OpenAIService = Depends(get_openai_service)
+):
+    """
+    Get hit/miss statistics for the response cache
+    """
+    return openai_service.response_cache.stats()
+
+
+@router.post("/cache/invalidate", dependencies=[Depends(require_admin)])
+async def invalidate_cache(
+    property_name: Optional[str] = None,
+    openai_service: OpenAIService = Depends(get_openai_service)
+):
+    """
+    Drop cached property guidance, for one property or all of them (requires X-Admin-Key)
+    """
+    try:
+        removed = openai_service.invalidate_property_guidance(property_name)
+        return {"removed": removed}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error getting property guidance: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error invalidating cache: {str(e)}")
+
+
+@router.get("/semantic-cache/stats", response_model=Dict[str, Any])
+async def get_semantic_cache_stats(
+    openai_service: OpenAIService = Depends(get_openai_service)
+):
+    """
+    Get hit rate and best-match similarity distribution for the semantic interpretation cache
+    """
+    if openai_service.semantic_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **openai_service.semantic_cache.stats()}
+
+
+@router.get("/lexicon/stats", response_model=Dict[str, Any])
+async def get_lexicon_stats(
+    openai_service: OpenAIService = Depends(get_openai_service)
+):
+    """
+    Get the fraction of interpretation requests resolved by the local lexicon
+    """
+    if openai_service.property_lexicon is None:
+        return {"enabled": False}
+    return {"enabled": True, **openai_service.property_lexicon.stats()}
+
+
+@router.post("/semantic-cache/clear", dependencies=[Depends(require_admin)])
+async def clear_semantic_cache(
+    openai_service: OpenAIService = Depends(get_openai_service)
+):
+    """
+    Drop every cached interpretation (requires X-Admin-Key)
+    """
+    removed = openai_service.semantic_cache.clear() if openai_service.semantic_cache is not None else 0
+    return {"removed": removed}
+
+
+@router.post("/sessions", response_model=ChatSession)
+async def create_session(
+    session: Optional[ChatSessionCreate] = None,
+    session_store: SessionStore = Depends(get_session_store)
+):
+    """
+    Start a server-side chat session
+    """
+    try:
+        session_id = session_store.create(session.metadata if session else None)
+        return session_store.get(session_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating session: {str(e)}")
+
+
+@router.post("/sessions/message", response_model=SessionReply)
+async def send_session_message(
+    body: SessionMessage,
+    request: Request,
+    response: Response,
+    openai_service: OpenAIService = Depends(get_openai_service),
+    session_store: SessionStore = Depends(get_session_store)
+):
+    """
+    Send a user message to a session and get the assistant's reply
+
+    Only the new message is sent; the conversation is rebuilt from the
+    session's log. A new session is started if ``session_id`` is omitted.
+    With ``Accept: text/event-stream`` the reply is streamed like
+    ``/continue``, with the ``SessionReply`` as the ``final`` event.
+    """
+    session_id = body.session_id or session_store.create()
+    lock = session_store.lock(session_id)
+    if lock is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    user_message = ChatMessage(role="user", content=body.message)
+    
+    def history() -> ChatHistory:
+        return ChatHistory(
+            messages=session_store.messages(session_id) + [user_message],
+            metadata={"conversation_id": session_id}
+        )
+    
+    if _wants_stream(request):
+        async def events():
+            # Hold the session for the whole turn so replies stay in order
+            async with lock:
+                async for event, payload in openai_service.stream_conversation(history()):
+                    if event == "final":
+                        session_store.append(session_id, [user_message, payload])
+                        payload = SessionReply(session_id=session_id, message=payload)
+                    yield event, payload
+        
+        return _sse_response(events())
+    
+    try:
+        async with lock:
+            reply = (await openai_service.continue_conversation(history()))[0]
+            session_store.append(session_id, [user_message, reply])
+        _set_history_headers(response)
+        return SessionReply(session_id=session_id, message=reply)
+    except UpstreamUnavailableError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error continuing session: {str(e)}")
+
+
+@router.post("/sessions/interpret", response_model=ChatToMatterGenResponse)
+async def interpret_session(
+    body: SessionInterpretRequest,
+    response: Response,
+    openai_service: OpenAIService = Depends(get_openai_service),
+    session_store: SessionStore = Depends(get_session_store)
+):
+    """
+    Interpret a session's conversation and convert it to MatterGen parameters
+    """
+    messages = session_store.messages(body.session_id)
+    if messages is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    try:
+        interpretation = await openai_service.interpret_chat_for_mattergen(
+            ChatHistory(messages=messages, metadata={"conversation_id": body.session_id}),
+            body.current_goal,
+            body.current_property
+        )
+        _set_history_headers(response)
+        _set_interpretation_headers(response)
+        return interpretation
+    except UpstreamUnavailableError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interpreting session: {str(e)}")
+
+
+@router.get("/sessions/{session_id}", response_model=ChatSession)
+async def get_session(
+    session_id: str,
+    session_store: SessionStore = Depends(get_session_store)
+):
+    """
+    Get a chat session with its messages
+    """
+    session = session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+
+@router.delete("/sessions/{session_id}")
+async def delete_session(
+    session_id: str,
+    session_store: SessionStore = Depends(get_session_store)
+):
+    """
+    Delete a chat session
+    """
+    if not session_store.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"detail": "Session deleted successfully"}
+
+
+@router.get("/upstream", response_model=Dict[str, Any])
+async def get_upstream_status(
+    openai_service: OpenAIService = Depends(get_openai_service)
+):
+    """
+    Get circuit breaker state, retry counters and rate-limit budgets for the LLM provider
+
+    The same view ``/api/metrics`` reports under ``upstream``.
+    """
+    return openai_service.caller.stats()
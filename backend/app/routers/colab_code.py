@@ -2,7 +2,6 @@ from fastapi import APIRouter, HTTPException, Depends, Query, File, UploadFile
 from fastapi.responses import FileResponse
 from typing import List, Optional
 import os
-import tempfile
 from pathlib import Path
 
 from app.models.colab import (
@@ -10,6 +9,8 @@ from app.models.colab import (
     ColabCodeResponse,
     ColabNotebook
 )
+from app.core.config import settings
+from app.core.uploads import save_upload_to_temp
 from app.services.colab_service import ColabService
 from app.core.dependencies import get_colab_service
 
@@ -101,17 +102,15 @@ async def convert_dataset_to_colab(
         if not file.filename.endswith('.csv'):
             raise HTTPException(status_code=400, detail="Only CSV files are allowed")
         
-        # Save file to temporary location
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as temp:
-            contents = await file.read()
-            temp.write(contents)
-            temp_path = temp.name
+        # Stream the upload to a temporary file, enforcing the size limit
+        temp_path = await save_upload_to_temp(file, settings.MAX_UPLOAD_SIZE)
         
-        # Generate Colab code for the dataset
-        notebook_path = await colab_service.dataset_to_notebook(temp_path, include_fine_tuning)
-        
-        # Clean up temporary file
-        os.unlink(temp_path)
+        try:
+            # Generate Colab code for the dataset
+            notebook_path = await colab_service.dataset_to_notebook(temp_path, include_fine_tuning)
+        finally:
+            # Clean up temporary file
+            os.unlink(temp_path)
         
         # Return the notebook file as a download
         return FileResponse(
@@ -1,10 +1,10 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, Query
-from fastapi.responses import FileResponse
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from typing import List, Optional, Union
 import os
+import asyncio
 import csv
 import pandas as pd
-import tempfile
 from pathlib import Path
 
 from app.models.materials import (
@@ -13,11 +13,21 @@ from app.models.materials import (
     MaterialUpdate,
     MaterialDataset,
     MaterialDesignGoal,
-    MaterialDesignResult
+    MaterialDesignResult,
+    MaterialDesignSummary,
+    IngestionJob,
+    IngestionJobStatus,
+    SimilarMaterial,
+    SimilarityMetric
 )
 from app.core.config import settings
+from app.core.uploads import save_upload_to_temp
+from app.core.sse import format_sse
 from app.services.material_service import MaterialService
-from app.core.dependencies import get_material_service
+from app.services.formula_parser import FormulaParseError
+from app.services.ingestion_jobs import IngestionJobManager
+from app.services.template_service import TemplateService
+from app.core.dependencies import get_material_service, get_ingestion_job_manager, get_template_service
 
 
 router = APIRouter()
@@ -25,20 +35,128 @@ router = APIRouter()
 
 @router.get("/", response_model=List[Material])
 async def get_materials(
+    request: Request,
+    response: Response,
     skip: int = 0, 
-    limit: int = 100,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's X-Next-Cursor header"),
+    cost_min: Optional[float] = Query(None, ge=0.0, description="Minimum cost in $/g"),
+    cost_max: Optional[float] = Query(None, ge=0.0, description="Maximum cost in $/g"),
+    availability: Optional[str] = Query(None, description="Availability (case-insensitive), e.g. 'Abundant'"),
     material_service: MaterialService = Depends(get_material_service)
 ):
     """
-    Get a list of materials
+    Get a list of materials in ID order, optionally filtered by cost range and availability
+
+    Pass ``cursor`` (from the ``X-Next-Cursor`` response header) for keyset
+    pagination instead of ``skip``. With ``Accept: application/x-ndjson``
+    every matching material is streamed, one JSON object per line.
     """
     try:
-        materials = await material_service.get_materials(skip, limit)
+        if "application/x-ndjson" in request.headers.get("accept", ""):
+            # A bad cursor fails here, before the response starts
+            materials = material_service.iter_materials(
+                cursor=cursor,
+                cost_min=cost_min,
+                cost_max=cost_max,
+                availability=availability
+            )
+            
+            # Plain generators are iterated in the threadpool, off the event loop
+            lines = (material.json() + "\n" for material in materials)
+            return StreamingResponse(lines, media_type="application/x-ndjson")
+        
+        if cursor is not None:
+            materials, next_cursor = await material_service.get_materials_page(
+                cursor,
+                limit,
+                cost_min=cost_min,
+                cost_max=cost_max,
+                availability=availability
+            )
+        else:
+            materials = await material_service.get_materials(
+                skip,
+                limit,
+                cost_min=cost_min,
+                cost_max=cost_max,
+                availability=availability
+            )
+            next_cursor = material_service.next_cursor(materials, limit)
+        
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return materials
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving materials: {str(e)}")
 
 
+@router.get("/similar", response_model=List[SimilarMaterial])
+async def get_materials_similar_to_formula(
+    formula: str = Query(..., description="Chemical formula to compare against, e.g. 'LiCoO2'"),
+    k: int = Query(10, ge=1, le=1000),
+    metric: SimilarityMetric = SimilarityMetric.COSINE,
+    cost_min: Optional[float] = Query(None, ge=0.0),
+    cost_max: Optional[float] = Query(None, ge=0.0),
+    availability: Optional[str] = None,
+    material_service: MaterialService = Depends(get_material_service)
+):
+    """
+    Find the materials whose composition is most similar to a formula
+    """
+    try:
+        return await material_service.find_similar_to_formula(
+            formula, k, metric.value, cost_min=cost_min, cost_max=cost_max, availability=availability
+        )
+    except FormulaParseError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching similar materials: {str(e)}")
+
+
+@router.get("/designs", response_model=List[MaterialDesignSummary])
+async def list_designs(
+    response: Response,
+    type: Optional[str] = Query(None, description="Only designs with this goal type, e.g. 'catalyst'"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's X-Next-Cursor header"),
+    limit: int = Query(100, ge=1, le=1000),
+    material_service: MaterialService = Depends(get_material_service)
+):
+    """
+    List stored material designs, newest first
+    """
+    try:
+        designs, next_cursor = await material_service.list_designs(goal_type=type, cursor=cursor, limit=limit)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return designs
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error listing designs: {str(e)}")
+
+
+@router.get("/designs/{design_id}", response_model=MaterialDesignResult)
+async def get_design(
+    design_id: str,
+    material_service: MaterialService = Depends(get_material_service)
+):
+    """
+    Get a stored material design by ID
+    """
+    try:
+        design = await material_service.get_design(design_id)
+        if design is None:
+            raise HTTPException(status_code=404, detail="Design not found")
+        return design
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving design: {str(e)}")
+
+
 @router.post("/", response_model=Material)
 async def create_material(
     material: MaterialCreate,
@@ -50,6 +168,8 @@ async def create_material(
     try:
         created_material = await material_service.create_material(material)
         return created_material
+    except FormulaParseError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating material: {str(e)}")
 
@@ -73,6 +193,34 @@ async def get_material(
         raise HTTPException(status_code=500, detail=f"Error retrieving material: {str(e)}")
 
 
+@router.get("/{material_id}/similar", response_model=List[SimilarMaterial])
+async def get_similar_materials(
+    material_id: int,
+    k: int = Query(10, ge=1, le=1000),
+    metric: SimilarityMetric = SimilarityMetric.COSINE,
+    cost_min: Optional[float] = Query(None, ge=0.0),
+    cost_max: Optional[float] = Query(None, ge=0.0),
+    availability: Optional[str] = None,
+    material_service: MaterialService = Depends(get_material_service)
+):
+    """
+    Find the materials whose composition is most similar to a given material
+    """
+    try:
+        similar = await material_service.find_similar(
+            material_id, k, metric.value, cost_min=cost_min, cost_max=cost_max, availability=availability
+        )
+        if similar is None:
+            raise HTTPException(status_code=404, detail="Material not found")
+        return similar
+    except HTTPException:
+        raise
+    except FormulaParseError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching similar materials: {str(e)}")
+
+
 @router.put("/{material_id}", response_model=Material)
 async def update_material(
     material_id: int,
@@ -89,6 +237,8 @@ async def update_material(
         return updated_material
     except HTTPException:
         raise
+    except FormulaParseError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating material: {str(e)}")
 
@@ -112,10 +262,12 @@ async def delete_material(
         raise HTTPException(status_code=500, detail=f"Error deleting material: {str(e)}")
 
 
-@router.post("/upload-dataset", response_model=MaterialDataset)
+@router.post("/upload-dataset", response_model=Union[MaterialDataset, IngestionJob])
 async def upload_dataset(
+    response: Response,
     file: UploadFile = File(...),
-    material_service: MaterialService = Depends(get_material_service)
+    background: bool = Query(False, description="Return a job immediately and ingest in the background"),
+    job_manager: IngestionJobManager = Depends(get_ingestion_job_manager)
 ):
     """
     Upload a material dataset (CSV format)
@@ -125,18 +277,16 @@ async def upload_dataset(
         if not file.filename.endswith('.csv'):
             raise HTTPException(status_code=400, detail="Only CSV files are allowed")
         
-        # Save file to temporary location
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as temp:
-            contents = await file.read()
-            temp.write(contents)
-            temp_path = temp.name
+        # Stream the upload to a temporary file, enforcing the size limit
+        temp_path = await save_upload_to_temp(file, settings.MAX_UPLOAD_SIZE)
         
-        # Process the dataset
-        dataset = await material_service.process_dataset(temp_path)
-        
-        # Clean up temporary file
-        os.unlink(temp_path)
+        # The ingestion job owns the temporary file from here on and removes it when done
+        if background:
+            job, _ = job_manager.submit(temp_path, file.filename)
+            response.status_code = 202
+            return job
         
+        dataset = await job_manager.run(temp_path, file.filename)
         return dataset
     except HTTPException:
         raise
@@ -144,15 +294,58 @@ async def upload_dataset(
         raise HTTPException(status_code=500, detail=f"Error processing dataset: {str(e)}")
 
 
+@router.get("/jobs/{job_id}", response_model=IngestionJob)
+async def get_ingestion_job(
+    job_id: str,
+    job_manager: IngestionJobManager = Depends(get_ingestion_job_manager)
+):
+    """
+    Get the progress of a dataset ingestion job
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_ingestion_job(
+    job_id: str,
+    interval: float = Query(1.0, gt=0.0, le=60.0, description="Seconds between progress events"),
+    job_manager: IngestionJobManager = Depends(get_ingestion_job_manager)
+):
+    """
+    Stream the progress of a dataset ingestion job as server-sent events
+    """
+    if job_manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def events():
+        while True:
+            job = job_manager.get(job_id)
+            if job is None:
+                return
+            if job.status in (IngestionJobStatus.COMPLETED, IngestionJobStatus.FAILED):
+                yield format_sse(job.json(), event=job.status.value)
+                return
+            yield format_sse(job.json(), event="progress")
+            await asyncio.sleep(interval)
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 @router.post("/design", response_model=MaterialDesignResult)
 async def design_material(
     goal: MaterialDesignGoal,
-    material_service: MaterialService = Depends(get_material_service)
+    material_service: MaterialService = Depends(get_material_service),
+    template_service: TemplateService = Depends(get_template_service)
 ):
     """
     Design a material based on specified goals and constraints
     """
     try:
+        if goal.template_id:
+            template_service.record_template_use(goal.template_id, "design")
         result = await material_service.design_material(goal)
         return result
     except Exception as e:
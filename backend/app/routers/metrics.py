@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+
+from app.services.openai_service import OpenAIService
+from app.core.dependencies import get_openai_service
+
+
+router = APIRouter()
+
+
+@router.get("")
+async def get_metrics(
+    request: Request,
+    format: Optional[str] = None,
+    openai_service: OpenAIService = Depends(get_openai_service)
+):
+    """
+    Get LLM call metrics: latency histograms, token totals, estimated cost, retries and cache hits per method
+
+    Returned as JSON, or in the Prometheus text format with `format=prometheus`
+    or an `Accept: text/plain` header.
+    """
+    if format == "prometheus" or (format is None and "text/plain" in request.headers.get("accept", "")):
+        return PlainTextResponse(
+            openai_service.telemetry.prometheus(),
+            media_type="text/plain; version=0.0.4"
+        )
+
+    metrics = {
+        "llm": openai_service.telemetry.snapshot(),
+        "upstream": openai_service.caller.stats()
+    }
+    if openai_service.transport is not None:
+        metrics["transport"] = openai_service.transport.stats()
+    return metrics
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from typing import List, Optional
 
-from app.models.templates import DesignTemplate, TemplateResponse
+from app.models.templates import DesignTemplate, TemplateResponse, TemplateSearchResponse
 from app.services.template_service import TemplateService
 from app.core.dependencies import get_template_service
 
@@ -9,8 +9,24 @@ from app.core.dependencies import get_template_service
 router = APIRouter()
 
 
+def _not_modified(request: Request, response: Response, etag: str, template_service: TemplateService) -> bool:
+    """Set the validator headers and report whether the client's copy is still current"""
+    response.headers["ETag"] = etag
+    response.headers["X-Templates-Version"] = str(template_service.cache_version)
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+
+
+def _not_modified_response(response: Response) -> Response:
+    return Response(status_code=304, headers=dict(response.headers))
+
+
 @router.get("/", response_model=TemplateResponse)
 async def get_templates(
+    request: Request,
+    response: Response,
     category: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
@@ -18,54 +34,68 @@ async def get_templates(
 ):
     """
     Get a list of design templates
+    
+    Responses carry an ETag; send it back in If-None-Match to get a 304 while no template has changed.
     """
     try:
+        if _not_modified(request, response, template_service.etag, template_service):
+            return _not_modified_response(response)
         templates_response = await template_service.get_templates(category, skip, limit)
         return templates_response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving templates: {str(e)}")
 
 
-@router.get("/{template_id}", response_model=DesignTemplate)
-async def get_template(
-    template_id: str,
+@router.get("/categories", response_model=List[str])
+async def get_categories(
+    request: Request,
+    response: Response,
     template_service: TemplateService = Depends(get_template_service)
 ):
     """
-    Get a specific template by ID
+    Get a list of all template categories
     """
     try:
-        template = await template_service.get_template(template_id)
-        if template is None:
-            raise HTTPException(status_code=404, detail="Template not found")
-        return template
-    except HTTPException:
-        raise
+        if _not_modified(request, response, template_service.etag, template_service):
+            return _not_modified_response(response)
+        categories = await template_service.get_categories()
+        return categories
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error retrieving template: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving categories: {str(e)}")
 
 
-@router.get("/categories", response_model=List[str])
-async def get_categories(
+@router.get("/search", response_model=TemplateSearchResponse)
+async def search_templates(
+    q: str = "",
+    elements: Optional[List[str]] = Query(None, description="Elements every result must suggest; repeat or comma-separate"),
+    category: Optional[str] = None,
+    prefix: bool = True,
+    skip: int = 0,
+    limit: int = Query(20, ge=1, le=100),
     template_service: TemplateService = Depends(get_template_service)
 ):
     """
-    Get a list of all template categories
+    Search design templates by words in their names, descriptions, property explanations and prompts
+    
+    Results are ranked by relevance. With `prefix` on, the last word also matches longer
+    words, for search-as-you-type.
     """
     try:
-        categories = await template_service.get_categories()
-        return categories
+        element_list = [element for value in elements or [] for element in value.split(",") if element.strip()]
+        return await template_service.search_templates(q, element_list, category, prefix, skip, limit)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error retrieving categories: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error searching templates: {str(e)}")
 
 
 @router.get("/popular", response_model=List[DesignTemplate])
 async def get_popular_templates(
-    limit: int = 5,
+    limit: int = Query(5, ge=1, le=50),
     template_service: TemplateService = Depends(get_template_service)
 ):
     """
     Get the most popular templates
+    
+    Ranked by recent template views and designs started from a template, refreshed every few seconds.
     """
     try:
         popular_templates = await template_service.get_popular_templates(limit)
@@ -74,6 +104,32 @@ async def get_popular_templates(
         raise HTTPException(status_code=500, detail=f"Error retrieving popular templates: {str(e)}")
 
 
+@router.get("/{template_id}", response_model=DesignTemplate)
+async def get_template(
+    template_id: str,
+    request: Request,
+    response: Response,
+    template_service: TemplateService = Depends(get_template_service)
+):
+    """
+    Get a specific template by ID
+    """
+    try:
+        template = await template_service.get_template(template_id)
+        if template is None:
+            raise HTTPException(status_code=404, detail="Template not found")
+        etag = template_service.template_etag(template_id)
+        if etag and _not_modified(request, response, etag, template_service):
+            return _not_modified_response(response)
+        # Only count a view when the template is actually sent
+        template_service.record_template_use(template_id, "view")
+        return template
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving template: {str(e)}")
+
+
 @router.get("/{template_id}/examples", response_model=List[dict])
 async def get_template_examples(
     template_id: str,
@@ -0,0 +1,257 @@
+import math
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.services.formula_parser import FormulaParseError, parse_formula
+
+
+class CompositionIndex:
+    """Nearest-neighbour index over normalized element-fraction vectors
+
+    Each material is a row of element fractions (summing to 1) in a
+    column-major matrix with one column per element seen so far, so a query
+    only touches the columns of the elements in the query formula. Rows of
+    removed materials are recycled.
+    """
+
+    METRICS = ("cosine", "l1")
+
+    def __init__(self, initial_capacity: int = 1024):
+        """Initialize an empty index"""
+        self._columns: Dict[str, int] = {}
+        self._matrix = np.zeros((initial_capacity, 8), dtype=np.float32, order="F")
+
+        # Per-row data, valid for rows below self._size
+        self._ids = np.full(initial_capacity, -1, dtype=np.int64)
+        self._norms = np.zeros(initial_capacity, dtype=np.float32)
+        self._costs = np.zeros(initial_capacity, dtype=np.float64)
+        self._availability = np.full(initial_capacity, -1, dtype=np.int32)
+        self._row_columns: List[Tuple[int, ...]] = [()] * initial_capacity
+
+        self._availability_codes: Dict[str, int] = {}
+        self._row_of: Dict[int, int] = {}
+        self._free_rows: List[int] = []
+        self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def add(self, material_id: int, formula: str, cost: float, availability: str) -> bool:
+        """Add or replace a material; returns False if its formula can't be parsed"""
+        return self.add_many([(material_id, formula, cost, availability)]) == 1
+
+    def add_many(self, materials: Iterable[Tuple[int, str, float, str]]) -> int:
+        """Add or replace several (id, formula, cost, availability) entries
+
+        Fractions are computed per entry, then written to the matrix with one
+        scatter. Entries with unparseable formulas are removed from the index.
+        Returns the number of entries indexed.
+        """
+        return self.add_prepared(self.prepare(materials))
+
+    @classmethod
+    def prepare(
+        cls,
+        materials: Iterable[Tuple[int, str, float, str]]
+    ) -> List[Tuple[int, Optional[Dict[str, float]], float, str]]:
+        """Compute the element fractions of (id, formula, cost, availability) entries
+
+        This doesn't touch the index, so it can run without holding the
+        lock that guards it.
+        """
+        return [
+            (material_id, cls._fractions(formula), cost, availability)
+            for material_id, formula, cost, availability in materials
+        ]
+
+    def add_prepared(self, entries: Iterable[Tuple[int, Optional[Dict[str, float]], float, str]]) -> int:
+        """Add or replace entries returned by prepare(); returns the number indexed"""
+        rows, ids, norms, costs, codes = [], [], [], [], []
+        cell_rows, cell_columns, cell_values = [], [], []
+
+        for material_id, fractions, cost, availability in entries:
+            if fractions is None:
+                self.remove(material_id)
+                continue
+
+            row = self._row_of.get(material_id)
+            if row is None:
+                row = self._allocate_row()
+                self._row_of[material_id] = row
+            else:
+                self._clear_row(row)
+
+            columns = tuple(self._column(element) for element in fractions)
+            self._row_columns[row] = columns
+            cell_rows.extend([row] * len(columns))
+            cell_columns.extend(columns)
+            cell_values.extend(fractions.values())
+
+            rows.append(row)
+            ids.append(material_id)
+            norms.append(math.sqrt(sum(value * value for value in fractions.values())))
+            costs.append(cost)
+            codes.append(self._availability_code(availability))
+
+        if rows:
+            self._matrix[cell_rows, cell_columns] = cell_values
+            self._ids[rows] = ids
+            self._norms[rows] = norms
+            self._costs[rows] = costs
+            self._availability[rows] = codes
+
+        return len(rows)
+
+    def remove(self, material_id: int):
+        """Remove a material from the index, if present"""
+        row = self._row_of.pop(material_id, None)
+        if row is None:
+            return
+        self._clear_row(row)
+        self._ids[row] = -1
+        self._free_rows.append(row)
+
+    def query(
+        self,
+        formula: str,
+        k: int = 10,
+        metric: str = "cosine",
+        cost_min: Optional[float] = None,
+        cost_max: Optional[float] = None,
+        availability: Optional[str] = None,
+        exclude_id: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        """Find the k nearest materials to a formula as (id, distance) pairs
+
+        Cosine distance is ``1 - cosine similarity``; L1 distance ranges from 0
+        (identical composition) to 2 (no shared elements).
+        """
+        if metric not in self.METRICS:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {', '.join(self.METRICS)}")
+
+        fractions = self._fractions(formula)
+        if fractions is None:
+            # Raise the parser's own error, or flag a composition with no positive amounts
+            parse_formula(formula)
+            raise FormulaParseError(f"Formula '{formula}' has no positive amounts")
+
+        n = self._size
+        if n == 0 or k <= 0:
+            return []
+
+        # Only the query's element columns matter: every other column of q is zero
+        known = [(self._columns[element], fraction) for element, fraction in fractions.items() if element in self._columns]
+        query_norm = math.sqrt(sum(fraction * fraction for fraction in fractions.values()))
+
+        columns = [column for column, _ in known]
+        q = np.array([fraction for _, fraction in known], dtype=np.float32)
+        block = self._matrix[:n, columns]
+
+        shared_mass = block.sum(axis=1)
+        if metric == "cosine":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                distances = 1.0 - (block @ q) / (self._norms[:n] * np.float32(query_norm))
+            distances[np.isnan(distances)] = 1.0
+        else:
+            # sum_j |x_j - q_j| = sum_{j in q} |x_j - q_j| + (1 - sum_{j in q} x_j) since rows sum to 1,
+            # plus the query mass on elements no material has
+            unknown_mass = np.float32(1.0 - float(q.sum()))
+            distances = np.abs(block - q).sum(axis=1) - shared_mass + (1.0 + unknown_mass)
+
+        # Exclude free rows and apply the optional filters
+        excluded = self._ids[:n] < 0
+        if exclude_id is not None and exclude_id in self._row_of:
+            excluded[self._row_of[exclude_id]] = True
+        if cost_min is not None:
+            excluded |= self._costs[:n] < cost_min
+        if cost_max is not None:
+            excluded |= self._costs[:n] > cost_max
+        if availability is not None:
+            code = self._availability_codes.get(availability.strip().lower())
+            if code is None:
+                return []
+            excluded |= self._availability[:n] != code
+        distances[excluded] = np.inf
+
+        k = min(k, n - int(np.count_nonzero(excluded)))
+        if k <= 0:
+            return []
+
+        # Rows sharing no element with the query sit at the maximum distance, so
+        # partition only the overlapping rows when there are enough of them
+        candidates = np.flatnonzero((shared_mass > 0) & ~excluded)
+        if len(candidates) < k:
+            candidates = np.arange(n)
+
+        top = candidates[np.argpartition(distances[candidates], k - 1)[:k]]
+        top = top[np.argsort(distances[top], kind="stable")]
+        return [(int(self._ids[row]), float(max(distances[row], 0.0))) for row in top]
+
+    @staticmethod
+    def _fractions(formula: str) -> Optional[Dict[str, float]]:
+        """Normalized element fractions for a formula, or None if it can't be used"""
+        try:
+            composition = parse_formula(formula)
+        except FormulaParseError:
+            return None
+
+        total = sum(composition.values())
+        if total <= 0:
+            return None
+        return {element: amount / total for element, amount in composition.items()}
+
+    def _allocate_row(self) -> int:
+        """Get a free row, growing the arrays if needed"""
+        if self._free_rows:
+            return self._free_rows.pop()
+
+        if self._size == len(self._ids):
+            self._grow_rows(2 * len(self._ids))
+
+        row = self._size
+        self._size += 1
+        return row
+
+    def _grow_rows(self, capacity: int):
+        """Double the row capacity of every per-row array"""
+        old = len(self._ids)
+        matrix = np.zeros((capacity, self._matrix.shape[1]), dtype=np.float32, order="F")
+        matrix[:old] = self._matrix
+        self._matrix = matrix
+
+        self._ids = np.concatenate([self._ids, np.full(capacity - old, -1, dtype=np.int64)])
+        self._norms = np.concatenate([self._norms, np.zeros(capacity - old, dtype=np.float32)])
+        self._costs = np.concatenate([self._costs, np.zeros(capacity - old, dtype=np.float64)])
+        self._availability = np.concatenate([self._availability, np.full(capacity - old, -1, dtype=np.int32)])
+        self._row_columns.extend([()] * (capacity - old))
+
+    def _column(self, element: str) -> int:
+        """Get the column for an element, adding one if needed"""
+        column = self._columns.get(element)
+        if column is not None:
+            return column
+
+        column = len(self._columns)
+        if column == self._matrix.shape[1]:
+            matrix = np.zeros((self._matrix.shape[0], 2 * column), dtype=np.float32, order="F")
+            matrix[:, :column] = self._matrix
+            self._matrix = matrix
+
+        self._columns[element] = column
+        return column
+
+    def _availability_code(self, availability: str) -> int:
+        """Get the integer code for an availability value"""
+        key = availability.strip().lower()
+        code = self._availability_codes.get(key)
+        if code is None:
+            code = len(self._availability_codes)
+            self._availability_codes[key] = code
+        return code
+
+    def _clear_row(self, row: int):
+        """Zero the element fractions of a row"""
+        columns = self._row_columns[row]
+        if columns:
+            self._matrix[row, list(columns)] = 0.0
+        self._row_columns[row] = ()
@@ -0,0 +1,163 @@
+import json
+import hashlib
+import threading
+from bisect import bisect_left, insort
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.models.materials import MaterialDesignGoal, MaterialDesignResult, MaterialDesignSummary
+
+
+def goal_hash(goal: MaterialDesignGoal) -> str:
+    """Canonical content hash of a design goal"""
+    # The originating template doesn't change what is designed
+    canonical = json.dumps(goal.dict(exclude={"template_id"}), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class DesignRepository:
+    """Indexed store for design results, persisted as one JSON file per design
+
+    Summaries of every design are kept in memory, indexed by ID, by creation
+    time and by goal type; full results are read from disk on lookup. Results
+    are also addressed by the hash of their goal so identical goals can reuse
+    a stored result. Designs whose file has gone missing or is unreadable are
+    dropped from the indexes when they are next looked up.
+    """
+
+    def __init__(self, designs_dir: str):
+        """Initialize the repository and index the existing design files"""
+        self.designs_dir = Path(designs_dir)
+        self.designs_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+        self._summaries: Dict[str, MaterialDesignSummary] = {}
+        # Sorted (created_at, design_id) keys, overall, per goal type and per goal hash
+        self._by_created: List[Tuple[str, str]] = []
+        self._by_type: Dict[str, List[Tuple[str, str]]] = {}
+        self._by_goal_hash: Dict[str, List[Tuple[str, str]]] = {}
+        self._goal_hashes: Dict[str, str] = {}
+
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._summaries)
+
+    def _load(self):
+        """Index every design file in the designs directory"""
+        for design_file in self.designs_dir.glob("*.json"):
+            try:
+                with open(design_file, "r") as f:
+                    result = MaterialDesignResult(**json.load(f))
+                self._index(result, keep_sorted=False)
+            except Exception as e:
+                # Log error but continue
+                print(f"Error loading design {design_file}: {str(e)}")
+
+        self._by_created.sort()
+        for keys in self._by_type.values():
+            keys.sort()
+        for keys in self._by_goal_hash.values():
+            keys.sort()
+
+    def _index(self, result: MaterialDesignResult, keep_sorted: bool = True):
+        """Add a design to the in-memory indexes (caller holds the lock or is loading)"""
+        key = (result.created_at, result.design_id)
+        summary = MaterialDesignSummary(
+            design_id=result.design_id,
+            name=result.goal.name,
+            type=result.goal.type,
+            created_at=result.created_at
+        )
+
+        self._summaries[result.design_id] = summary
+        digest = goal_hash(result.goal)
+        self._goal_hashes[result.design_id] = digest
+        for keys in (
+            self._by_created,
+            self._by_type.setdefault(result.goal.type, []),
+            self._by_goal_hash.setdefault(digest, [])
+        ):
+            if keep_sorted:
+                insort(keys, key)
+            else:
+                keys.append(key)
+
+    def _unindex(self, design_id: str):
+        """Drop a design from the in-memory indexes (caller holds the lock)"""
+        summary = self._summaries.pop(design_id, None)
+        if summary is None:
+            return
+        key = (summary.created_at, design_id)
+        digest = self._goal_hashes.pop(design_id)
+        for index, group in ((self._by_type, summary.type), (self._by_goal_hash, digest)):
+            keys = index[group]
+            del keys[bisect_left(keys, key)]
+            if not keys:
+                del index[group]
+        del self._by_created[bisect_left(self._by_created, key)]
+
+    def _read(self, design_id: str) -> Optional[MaterialDesignResult]:
+        """Read an indexed design from disk, dropping it if the file is gone or unreadable (caller holds the lock)"""
+        try:
+            with open(self.designs_dir / f"{design_id}.json", "r") as f:
+                return MaterialDesignResult(**json.load(f))
+        except (OSError, ValueError) as e:
+            # Log error and forget the design
+            print(f"Error reading design {design_id}, removing it from the index: {str(e)}")
+            self._unindex(design_id)
+            return None
+
+    def _write(self, result: MaterialDesignResult):
+        """Persist a design result and index it (caller holds the lock)"""
+        design_path = self.designs_dir / f"{result.design_id}.json"
+        with open(design_path, "w") as f:
+            json.dump(result.dict(), f, indent=2)
+        self._index(result)
+
+    def add(self, result: MaterialDesignResult):
+        """Persist and index a design result"""
+        with self._lock:
+            self._write(result)
+
+    def add_if_absent(self, result: MaterialDesignResult) -> MaterialDesignResult:
+        """Store a design unless one with an identical goal exists; returns the stored result"""
+        with self._lock:
+            existing = self._find_by_goal(goal_hash(result.goal))
+            if existing is not None:
+                return existing
+            self._write(result)
+            return result
+
+    def get(self, design_id: str) -> Optional[MaterialDesignResult]:
+        """Load a design result by ID"""
+        with self._lock:
+            if design_id not in self._summaries:
+                return None
+            return self._read(design_id)
+
+    def find_by_goal(self, goal: MaterialDesignGoal) -> Optional[MaterialDesignResult]:
+        """Get the stored result for an identical goal, if any"""
+        with self._lock:
+            return self._find_by_goal(goal_hash(goal))
+
+    def _find_by_goal(self, digest: str) -> Optional[MaterialDesignResult]:
+        """Oldest readable result for a goal hash, so repeated requests stay stable (caller holds the lock)"""
+        while digest in self._by_goal_hash:
+            result = self._read(self._by_goal_hash[digest][0][1])
+            if result is not None:
+                return result
+        return None
+
+    def list(
+        self,
+        goal_type: Optional[str] = None,
+        before: Optional[Tuple[str, str]] = None,
+        limit: int = 100
+    ) -> List[MaterialDesignSummary]:
+        """List design summaries newest first, starting strictly before a (created_at, design_id) key"""
+        with self._lock:
+            keys = self._by_created if goal_type is None else self._by_type.get(goal_type, [])
+            end = len(keys) if before is None else bisect_left(keys, before)
+            start = max(end - limit, 0)
+            return [self._summaries[design_id] for _, design_id in reversed(keys[start:end])]
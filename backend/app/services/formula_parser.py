@@ -0,0 +1,151 @@
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+
+from app.core.config import settings
+
+
+ELEMENT_SYMBOLS = frozenset("""
+H He Li Be B C N O F Ne Na Mg Al Si P S Cl Ar K Ca Sc Ti V Cr Mn Fe Co Ni Cu Zn
+Ga Ge As Se Br Kr Rb Sr Y Zr Nb Mo Tc Ru Rh Pd Ag Cd In Sn Sb Te I Xe Cs Ba La
+Ce Pr Nd Pm Sm Eu Gd Tb Dy Ho Er Tm Yb Lu Hf Ta W Re Os Ir Pt Au Hg Tl Pb Bi Po
+At Rn Fr Ra Ac Th Pa U Np Pu Am Cm Bk Cf Es Fm Md No Lr Rf Db Sg Bh Hs Mt Ds Rg
+Cn Nh Fl Mc Lv Ts Og
+""".split())
+
+# Hydrate separators: middle dots and asterisks always, an ASCII dot when it is
+# followed by a group (CuSO4.FeSO4) or by a water count (CuSO4.5H2O). Any other
+# dot between digits is a decimal point (Li0.5CoO2).
+_HYDRATE_SEPARATOR = re.compile(
+    r"\s*[·•∙*]\s*"
+    r"|\.(?=\s*[A-Z(\[{])"
+    r"|(?<=[A-Za-z)\]}]\d)\.(?=\d+\s*H2O)"
+    r"|(?<=[A-Za-z)\]}]\d\d)\.(?=\d+\s*H2O)"
+)
+
+_LEADING_COEFFICIENT = re.compile(r"\s*(\d+(?:\.\d+)?|\.\d+)")
+
+_TOKEN = re.compile(
+    r"(?P<element>[A-Z][a-z]?)"
+    r"|(?P<number>\d+(?:\.\d+)?|\.\d+)"
+    r"|(?P<open>[(\[{])"
+    r"|(?P<close>[)\]}])"
+    r"|(?P<space>\s+)"
+    r"|(?P<invalid>.)"
+)
+
+_CLOSING = {"(": ")", "[": "]", "{": "}"}
+
+
+class FormulaParseError(ValueError):
+    """Raised when a chemical formula cannot be parsed"""
+    pass
+
+
+def parse_formula(formula: str) -> Dict[str, float]:
+    """Parse a chemical formula into an element -> amount composition
+
+    Supports nested brackets (``Ca3(PO4)2``), hydrates (``CuSO4·5H2O``) and
+    fractional subscripts (``Li0.5CoO2``). Elements are returned in order of
+    first appearance. Results are memoized per formula string.
+    """
+    return dict(_parse_formula_cached(formula))
+
+
+def formula_elements(formula: str) -> List[str]:
+    """Get the elements of a formula in order of first appearance"""
+    return [element for element, _ in _parse_formula_cached(formula)]
+
+
+def parse_formulas(formulas: pd.Series) -> pd.Series:
+    """Parse a Series of formulas, parsing each unique formula only once
+
+    Unparseable formulas map to ``None``.
+    """
+    parsed = {formula: _try_parse(formula) for formula in formulas.unique()}
+    return formulas.map(parsed)
+
+
+def formula_cache_info():
+    """Get hit/miss statistics for the formula cache"""
+    return _parse_formula_cached.cache_info()
+
+
+def _try_parse(formula) -> Optional[Dict[str, float]]:
+    """Parse a formula, returning None instead of raising"""
+    if not isinstance(formula, str):
+        return None
+    try:
+        return parse_formula(formula)
+    except FormulaParseError:
+        return None
+
+
+@lru_cache(maxsize=settings.FORMULA_CACHE_SIZE)
+def _parse_formula_cached(formula: str) -> Tuple[Tuple[str, float], ...]:
+    """Parse a formula into an immutable tuple of (element, amount) pairs"""
+    if not formula or not formula.strip():
+        raise FormulaParseError("Empty formula")
+
+    composition: Dict[str, float] = {}
+    for part in _HYDRATE_SEPARATOR.split(formula.strip()):
+        multiplier = 1.0
+        match = _LEADING_COEFFICIENT.match(part)
+        if match:
+            multiplier = float(match.group(1))
+            part = part[match.end():]
+
+        part_composition = _parse_group(part, formula)
+        if not part_composition:
+            raise FormulaParseError(f"Empty component in formula '{formula}'")
+        for element, amount in part_composition.items():
+            composition[element] = composition.get(element, 0.0) + amount * multiplier
+
+    return tuple(composition.items())
+
+
+def _parse_group(text: str, formula: str) -> Dict[str, float]:
+    """Parse one hydrate component with nested brackets"""
+    # Stack of (opening bracket, composition) frames
+    stack: List[Tuple[str, Dict[str, float]]] = [("", {})]
+    tokens = list(_TOKEN.finditer(text))
+    i = 0
+
+    def read_count(index: int) -> Tuple[float, int]:
+        """Read an optional subscript following a token"""
+        if index < len(tokens) and tokens[index].lastgroup == "number":
+            return float(tokens[index].group()), index + 1
+        return 1.0, index
+
+    while i < len(tokens):
+        token = tokens[i]
+        kind = token.lastgroup
+
+        if kind == "element":
+            symbol = token.group()
+            if symbol not in ELEMENT_SYMBOLS:
+                raise FormulaParseError(f"Unknown element '{symbol}' in formula '{formula}'")
+            count, i = read_count(i + 1)
+            frame = stack[-1][1]
+            frame[symbol] = frame.get(symbol, 0.0) + count
+        elif kind == "open":
+            stack.append((token.group(), {}))
+            i += 1
+        elif kind == "close":
+            if len(stack) == 1 or _CLOSING[stack[-1][0]] != token.group():
+                raise FormulaParseError(f"Unbalanced '{token.group()}' in formula '{formula}'")
+            _, group = stack.pop()
+            count, i = read_count(i + 1)
+            frame = stack[-1][1]
+            for symbol, amount in group.items():
+                frame[symbol] = frame.get(symbol, 0.0) + amount * count
+        elif kind == "space":
+            i += 1
+        else:
+            raise FormulaParseError(f"Unexpected '{token.group()}' in formula '{formula}'")
+
+    if len(stack) != 1:
+        raise FormulaParseError(f"Unclosed '{stack[-1][0]}' in formula '{formula}'")
+
+    return stack[0][1]
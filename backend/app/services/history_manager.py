@@ -0,0 +1,183 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, List, Optional
+
+
+# Tokens added by the chat format around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Average characters per token of English text for the OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+
+Message = Dict[str, str]
+Summarizer = Callable[[Optional[str], List[Message]], Awaitable[str]]
+
+
+@dataclass
+class CompactionStats:
+    """Token counts of a history before and after compaction"""
+    tokens_before: int
+    tokens_after: int
+    messages_before: int
+    messages_after: int
+    summarized_messages: int
+
+
+# Stats for the history compacted during the current request
+last_compaction: ContextVar[Optional[CompactionStats]] = ContextVar("last_compaction", default=None)
+
+
+@dataclass
+class _SummaryState:
+    """Rolling summary of the first `covered` conversation messages"""
+    covered: int
+    prefix_hash: str
+    summary: str
+
+
+class TokenCounter:
+    """Estimates chat tokens locally at about CHARS_PER_TOKEN characters per token
+
+    The estimate only has to keep histories near the budget, so it avoids a
+    tokenizer dependency and gives the same counts on every install.
+    """
+
+    def __init__(self, model: str):
+        """Initialize the counter for a model"""
+        self.model = model
+        self._count_text = lru_cache(maxsize=4096)(self._count_uncached)
+
+    @staticmethod
+    def _count_uncached(text: str) -> int:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+    def count_text(self, text: str) -> int:
+        """Count the tokens of a plain text"""
+        return self._count_text(text)
+
+    def count(self, messages: List[Message]) -> int:
+        """Count the tokens of a list of chat messages"""
+        return sum(self._count_text(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+
+class HistoryManager:
+    """Keeps chat histories within a token budget using rolling summaries
+
+    Leading system messages and the last ``keep_last_messages`` messages are
+    always sent verbatim. Once a history is over budget, older messages are
+    folded into a summary that is cached per conversation and only extended
+    with the messages that have fallen out of the verbatim window since the
+    last call, in batches of at least ``summary_batch`` messages.
+    """
+
+    def __init__(
+        self,
+        summarize: Summarizer,
+        model: str,
+        token_budget: int = 3000,
+        keep_last_messages: int = 8,
+        summary_batch: int = 6,
+        max_conversations: int = 1024
+    ):
+        """Initialize the history manager"""
+        self.summarize = summarize
+        self.token_budget = token_budget
+        self.keep_last_messages = keep_last_messages
+        self.summary_batch = summary_batch
+        self.max_conversations = max_conversations
+        self.counter = TokenCounter(model)
+
+        self._summaries: "OrderedDict[str, _SummaryState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def compact(self, messages: List[Message], conversation_id: Optional[str] = None) -> List[Message]:
+        """Return the messages to send for a history, summarizing old turns if it is over budget
+
+        The token counts before and after are stored in ``last_compaction``.
+        """
+        tokens_before = self.counter.count(messages)
+        if tokens_before <= self.token_budget:
+            self._record(tokens_before, tokens_before, len(messages), len(messages), 0)
+            return messages
+
+        # Leading system messages are instructions, never summarized
+        start = 0
+        while start < len(messages) and messages[start]["role"] == "system":
+            start += 1
+        system, conversation = messages[:start], messages[start:]
+
+        key = conversation_id or self._conversation_key(conversation)
+        state = self._cached_state(key, conversation)
+        covered = state.covered if state else 0
+        summary = state.summary if state else None
+
+        # Messages that have left the verbatim window but are not summarized yet
+        cutoff = max(len(conversation) - self.keep_last_messages, covered)
+        pending = conversation[covered:cutoff]
+        if pending:
+            compacted = self._assemble(system, summary, conversation[covered:])
+            if len(pending) >= self.summary_batch or self.counter.count(compacted) > self.token_budget:
+                summary = await self.summarize(summary, pending)
+                covered = cutoff
+                self._store(key, _SummaryState(covered, self._prefix_hash(conversation[:covered]), summary))
+
+        compacted = self._assemble(system, summary, conversation[covered:])
+        self._record(tokens_before, self.counter.count(compacted), len(messages), len(compacted), covered)
+        return compacted
+
+    @staticmethod
+    def _assemble(system: List[Message], summary: Optional[str], tail: List[Message]) -> List[Message]:
+        """Build the messages to send from the system prompt, summary and verbatim tail"""
+        if summary is None:
+            return system + tail
+        return system + [{"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}] + tail
+
+    def _cached_state(self, key: str, conversation: List[Message]) -> Optional[_SummaryState]:
+        """Get the cached summary for a conversation if it still matches the history's prefix"""
+        with self._lock:
+            state = self._summaries.get(key)
+            if state is not None:
+                self._summaries.move_to_end(key)
+        if state is None or state.covered > len(conversation):
+            return None
+        if self._prefix_hash(conversation[:state.covered]) != state.prefix_hash:
+            return None
+        return state
+
+    def _store(self, key: str, state: _SummaryState):
+        """Cache a conversation's summary, evicting the least recently used"""
+        with self._lock:
+            self._summaries[key] = state
+            self._summaries.move_to_end(key)
+            while len(self._summaries) > self.max_conversations:
+                self._summaries.popitem(last=False)
+
+    @staticmethod
+    def _record(tokens_before: int, tokens_after: int, messages_before: int, messages_after: int, summarized: int):
+        last_compaction.set(CompactionStats(
+            tokens_before=tokens_before,
+            tokens_after=tokens_after,
+            messages_before=messages_before,
+            messages_after=messages_after,
+            summarized_messages=summarized
+        ))
+
+    @staticmethod
+    def _prefix_hash(messages: List[Message]) -> str:
+        """Hash of a run of messages"""
+        digest = hashlib.sha256()
+        for message in messages:
+            digest.update(message["role"].encode())
+            digest.update(b"\0")
+            digest.update(message["content"].encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    @classmethod
+    def _conversation_key(cls, conversation: List[Message]) -> str:
+        """Identify a conversation without an explicit ID by its opening message"""
+        return cls._prefix_hash(conversation[:1])
@@ -0,0 +1,144 @@
+import os
+import time
+import uuid
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from datetime import datetime
+
+from app.models.materials import IngestionJob, IngestionJobStatus, MaterialDataset
+from app.services.material_ingest import IngestionStats
+from app.services.material_service import MaterialService
+
+
+class IngestionJobManager:
+    """Runs dataset ingestions in a bounded thread pool and tracks their progress"""
+
+    def __init__(self, material_service: MaterialService, max_concurrent: int = 2, retention_seconds: int = 3600):
+        """Initialize the job manager"""
+        self.material_service = material_service
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="ingest")
+        self._jobs: Dict[str, IngestionJob] = {}
+        self._finished_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, dataset_path: str, filename: str) -> Tuple[IngestionJob, Future]:
+        """Queue a dataset for ingestion
+
+        The job takes ownership of ``dataset_path`` and deletes it when done.
+        Returns the job and a future resolving to the ``MaterialDataset``.
+        """
+        self._prune()
+
+        job = IngestionJob(
+            id=str(uuid.uuid4()),
+            filename=filename,
+            created_at=datetime.now().isoformat()
+        )
+        with self._lock:
+            self._jobs[job.id] = job
+
+        try:
+            future = self._executor.submit(self._run, job, dataset_path)
+        except Exception:
+            os.unlink(dataset_path)
+            raise
+
+        return job, future
+
+    async def run(self, dataset_path: str, filename: str) -> MaterialDataset:
+        """Ingest a dataset through the pool and wait for the result"""
+        _, future = self.submit(dataset_path, filename)
+        return await asyncio.wrap_future(future)
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        """Get a snapshot of a job's state"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.copy(deep=True) if job else None
+
+    def shutdown(self):
+        """Cancel queued jobs and wait for running ones to finish"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _run(self, job: IngestionJob, dataset_path: str) -> MaterialDataset:
+        """Worker-thread body of a job"""
+        total_rows = self._count_data_rows(dataset_path)
+        with self._lock:
+            job.total_rows = total_rows
+            job.status = IngestionJobStatus.RUNNING
+            job.started_at = datetime.now().isoformat()
+
+        try:
+            dataset = self.material_service.ingest_dataset(
+                dataset_path,
+                progress_callback=lambda stats: self._update_progress(job, stats)
+            )
+        except Exception as e:
+            with self._lock:
+                job.status = IngestionJobStatus.FAILED
+                job.error = str(e)
+                job.eta_seconds = None
+                job.finished_at = datetime.now().isoformat()
+                self._finished_at[job.id] = time.monotonic()
+            raise
+        finally:
+            os.unlink(dataset_path)
+
+        report = dataset.report
+        with self._lock:
+            job.status = IngestionJobStatus.COMPLETED
+            job.rows_processed = report.total_rows
+            job.rows_accepted = report.accepted_rows
+            job.rows_rejected = report.rejected_rows
+            job.rows_per_second = report.rows_per_second
+            job.errors = report.rejected
+            job.eta_seconds = 0.0
+            job.metadata = dataset.metadata
+            job.finished_at = datetime.now().isoformat()
+            self._finished_at[job.id] = time.monotonic()
+
+        return dataset
+
+    def _update_progress(self, job: IngestionJob, stats: IngestionStats):
+        """Copy running stats into the job after each chunk"""
+        rate = stats.rows_per_second
+        with self._lock:
+            job.rows_processed = stats.total_rows
+            job.rows_accepted = stats.accepted_rows
+            job.rows_rejected = stats.rejected_rows
+            job.rows_per_second = round(rate, 1)
+            job.errors = list(stats.rejected)
+            if job.total_rows is not None and rate > 0:
+                job.eta_seconds = round(max(job.total_rows - stats.total_rows, 0) / rate, 1)
+
+    def _prune(self):
+        """Forget finished jobs older than the retention period"""
+        cutoff = time.monotonic() - self.retention_seconds
+        with self._lock:
+            for job_id, finished_at in list(self._finished_at.items()):
+                if finished_at < cutoff:
+                    del self._finished_at[job_id]
+                    self._jobs.pop(job_id, None)
+
+    @staticmethod
+    def _count_data_rows(dataset_path: str) -> Optional[int]:
+        """Estimate the number of data rows by counting newlines"""
+        try:
+            lines = 0
+            last = b"\n"
+            with open(dataset_path, "rb") as f:
+                while True:
+                    block = f.read(1024 * 1024)
+                    if not block:
+                        break
+                    lines += block.count(b"\n")
+                    last = block[-1:]
+            if last != b"\n":
+                lines += 1
+            # Don't count the header
+            return max(lines - 1, 0)
+        except OSError:
+            return None
@@ -0,0 +1,268 @@
+import time
+import random
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import openai
+
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class UpstreamUnavailableError(Exception):
+    """Raised when the LLM provider is unavailable: circuit open or retries exhausted"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether an OpenAI client error is transient"""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Delay requested by the provider in a Retry-After header, if any"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Fails fast after repeated upstream failures, probing again after a cool-down
+
+    Closed: calls go through. After ``failure_threshold`` consecutive
+    failures it opens and rejects calls for ``reset_seconds``; then one
+    probe call is let through (half-open) and its outcome closes or reopens
+    the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        """Initialize a closed breaker"""
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_in_flight = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        """Raise UpstreamUnavailableError if the call should not be made"""
+        state = self.state
+        if state == "open":
+            remaining = self.reset_seconds - (time.monotonic() - self.opened_at)
+            raise UpstreamUnavailableError("LLM provider is unavailable, try again later", retry_after=remaining)
+        if state == "half_open":
+            if self.probe_in_flight:
+                raise UpstreamUnavailableError("LLM provider is recovering, try again later", retry_after=1.0)
+            self.probe_in_flight = True
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    def release_probe(self):
+        """Let another probe through after one ended without an outcome (e.g. was cancelled)"""
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.probe_in_flight or self.consecutive_failures >= self.failure_threshold:
+            if self.opened_at is None or self.probe_in_flight:
+                self.times_opened += 1
+            self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+
+
+class TokenBucket:
+    """Per-minute budget that makes callers wait for capacity instead of exceeding it
+
+    Waiters are served in arrival order. The balance may go negative when a
+    call turns out to cost more than estimated; later callers wait it off.
+    """
+
+    def __init__(self, per_minute: float):
+        """Initialize a full bucket; a non-positive rate disables it"""
+        self.per_minute = per_minute
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.per_minute > 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.per_minute / 60.0)
+        self.updated_at = now
+
+    async def acquire(self, amount: float) -> float:
+        """Wait until `amount` is available and take it; returns the seconds waited"""
+        if not self.enabled:
+            return 0.0
+
+        # A single call larger than the whole budget only has to wait for a full bucket
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) * 60.0 / self.per_minute
+                waited += delay
+                await asyncio.sleep(delay)
+
+    def adjust(self, amount: float):
+        """Charge (or refund, if negative) the difference between estimated and actual use"""
+        if self.enabled:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+    def refund(self, amount: float):
+        """Give back an amount taken by `acquire` for a call that didn't happen or failed"""
+        self.adjust(-min(amount, self.capacity))
+
+
+class ResilientCaller:
+    """Wraps outbound LLM calls with rate limiting, retries and a circuit breaker"""
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0
+    ):
+        """Initialize the caller"""
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+        self.rate_limited_seconds = 0.0
+
+    async def call(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        estimated_tokens: int = 0,
+        actual_tokens: Optional[Callable[[T], Optional[int]]] = None
+    ) -> T:
+        """Call `fn`, retrying transient errors with jittered exponential backoff
+
+        Raises UpstreamUnavailableError when the circuit is open, retryable
+        errors persist or the provider asks for a longer wait than
+        ``max_delay``; other errors are raised unchanged.
+        """
+        self.calls += 1
+        attempt = 0
+
+        while True:
+            self.rate_limited_seconds += await self.request_bucket.acquire(1)
+            self.rate_limited_seconds += await self.token_bucket.acquire(estimated_tokens)
+
+            try:
+                self.breaker.before_call()
+            except UpstreamUnavailableError:
+                # Nothing was sent
+                self.request_bucket.refund(1)
+                self.token_bucket.refund(estimated_tokens)
+                self.rejected += 1
+                raise
+
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                self.token_bucket.refund(estimated_tokens)
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                # A failed attempt produced no completion; its request still counts
+                self.token_bucket.refund(estimated_tokens)
+                if not is_retryable(e):
+                    if isinstance(e, openai.APIStatusError):
+                        # The provider answered; the request itself was bad
+                        self.breaker.record_success()
+                    else:
+                        self.breaker.release_probe()
+                    raise
+                self.breaker.record_failure()
+                retry_after = _retry_after_seconds(e)
+
+                if attempt >= self.max_retries or self.breaker.state != "closed":
+                    self.failures += 1
+                    raise UpstreamUnavailableError(
+                        f"LLM provider failed after {attempt + 1} attempts: {str(e)}",
+                        retry_after=retry_after or (
+                            self.breaker.reset_seconds if self.breaker.state == "open" else None
+                        )
+                    ) from e
+
+                # Waiting longer than max_delay would hold the request; let the client retry instead
+                if retry_after is not None and retry_after > self.max_delay:
+                    self.failures += 1
+                    raise UpstreamUnavailableError(
+                        f"LLM provider asked to retry after {retry_after:g}s: {str(e)}",
+                        retry_after=retry_after
+                    ) from e
+
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                delay = max(delay, min(retry_after or 0.0, self.max_delay))
+                attempt += 1
+                self.retries += 1
+                await asyncio.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            if actual_tokens is not None:
+                used = actual_tokens(result)
+                if used is not None:
+                    self.token_bucket.adjust(used - estimated_tokens)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Call counters and breaker state"""
+        return {
+            "circuit_state": self.breaker.state,
+            "circuit_opened": self.breaker.times_opened,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "rate_limited_seconds": round(self.rate_limited_seconds, 3),
+            "request_budget": round(self.request_bucket.tokens, 1) if self.request_bucket.enabled else None,
+            "token_budget": round(self.token_bucket.tokens, 1) if self.token_bucket.enabled else None
+        }
@@ -0,0 +1,287 @@
+import threading
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# USD per million (prompt, completion) tokens, matched against the model name by longest prefix
+MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4": (30.00, 60.00),
+    "gpt-3.5-turbo": (0.50, 1.50)
+}
+
+
+@dataclass
+class RequestUsage:
+    """LLM usage accumulated while serving one HTTP request"""
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    llm_seconds: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+
+# Usage of the current request; set by the usage headers middleware, None outside it
+current_usage: ContextVar[Optional[RequestUsage]] = ContextVar("current_usage", default=None)
+
+
+class Histogram:
+    """Cumulative bucket counts with a running sum, in the Prometheus layout"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(upper bound, observations at or below it) pairs, ending with +Inf"""
+        total = 0
+        result = []
+        for bound, count in zip([str(bound) for bound in self.buckets] + ["+Inf"], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum_seconds": round(self.sum, 4),
+            "mean_seconds": round(self.sum / self.count, 4) if self.count else None,
+            "buckets": dict(self.cumulative())
+        }
+
+
+class _MethodStats:
+    """Aggregates for the upstream calls made on behalf of one service method"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.estimated_calls = 0
+        self.cost_usd = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # reason -> times the method fell back to extra calls
+        self.fallbacks: Dict[str, int] = {}
+        # lexicon outcome ("local", "partial", "none") -> requests
+        self.lexicon: Dict[str, int] = {}
+        self.models: Dict[str, int] = {}
+        self.latency = Histogram()
+        self.time_to_first_token = Histogram()
+
+
+class LLMTelemetry:
+    """Per-method latency, token, cost, retry and cache statistics for LLM calls
+
+    Every call is also added to the ``current_usage`` of the request it was
+    made for, if any.
+    """
+
+    def __init__(self, pricing: Optional[Dict[str, Sequence[float]]] = None):
+        """Initialize empty statistics, with pricing overrides merged over MODEL_PRICING"""
+        self.pricing = {**MODEL_PRICING, **{model: tuple(prices) for model, prices in (pricing or {}).items()}}
+        self._methods: Dict[str, _MethodStats] = {}
+        self._lock = threading.Lock()
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+        """Estimated cost in USD of a call, or None for a model without pricing"""
+        matches = [name for name in self.pricing if model.startswith(name)]
+        if not matches:
+            return None
+        prompt_price, completion_price = self.pricing[max(matches, key=len)]
+        return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+    def record_call(
+        self,
+        method: str,
+        model: str,
+        seconds: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        retries: int = 0,
+        error: bool = False,
+        time_to_first_token: Optional[float] = None,
+        estimated: bool = False
+    ):
+        """Record one upstream call; `estimated` marks token counts made locally instead of reported"""
+        cost = self.cost(model, prompt_tokens, completion_tokens) or 0.0
+
+        with self._lock:
+            stats = self._stats(method)
+            stats.calls += 1
+            stats.errors += int(error)
+            stats.retries += retries
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.estimated_calls += int(estimated)
+            stats.cost_usd += cost
+            stats.models[model] = stats.models.get(model, 0) + 1
+            stats.latency.observe(seconds)
+            if time_to_first_token is not None:
+                stats.time_to_first_token.observe(time_to_first_token)
+
+        usage = current_usage.get()
+        if usage is not None:
+            usage.calls += 1
+            usage.prompt_tokens += prompt_tokens
+            usage.completion_tokens += completion_tokens
+            usage.cost_usd += cost
+            usage.llm_seconds += seconds
+
+    def record_cache(self, method: str, hit: bool):
+        """Record whether a method's request was answered from a response cache"""
+        with self._lock:
+            stats = self._stats(method)
+            if hit:
+                stats.cache_hits += 1
+            else:
+                stats.cache_misses += 1
+
+        usage = current_usage.get()
+        if usage is not None:
+            if hit:
+                usage.cache_hits += 1
+            else:
+                usage.cache_misses += 1
+
+    def record_lexicon(self, method: str, outcome: str):
+        """Record how the local property lexicon handled a method's request"""
+        with self._lock:
+            stats = self._stats(method)
+            stats.lexicon[outcome] = stats.lexicon.get(outcome, 0) + 1
+
+    def record_fallback(self, method: str, reason: str):
+        """Record that a method fell back to extra upstream calls, and why"""
+        with self._lock:
+            stats = self._stats(method)
+            stats.fallbacks[reason] = stats.fallbacks.get(reason, 0) + 1
+
+    def _stats(self, method: str) -> _MethodStats:
+        """Get or create a method's aggregates (caller holds the lock)"""
+        stats = self._methods.get(method)
+        if stats is None:
+            stats = self._methods[method] = _MethodStats()
+        return stats
+
+    @staticmethod
+    def _method_snapshot(stats: _MethodStats) -> Dict[str, Any]:
+        """Aggregates of one method (caller holds the lock)"""
+        return {
+            "calls": stats.calls,
+            "errors": stats.errors,
+            "retries": stats.retries,
+            "prompt_tokens": stats.prompt_tokens,
+            "completion_tokens": stats.completion_tokens,
+            "estimated_token_calls": stats.estimated_calls,
+            "cost_usd": round(stats.cost_usd, 6),
+            "cache_hits": stats.cache_hits,
+            "cache_misses": stats.cache_misses,
+            "lexicon": dict(stats.lexicon),
+            "fallbacks": dict(stats.fallbacks),
+            "models": dict(stats.models),
+            "latency": stats.latency.snapshot(),
+            "time_to_first_token": stats.time_to_first_token.snapshot()
+        }
+
+    def method_snapshot(self, method: str) -> Dict[str, Any]:
+        """Aggregates of one method, empty if it hasn't been called"""
+        with self._lock:
+            return self._method_snapshot(self._methods.get(method) or _MethodStats())
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Aggregates per method and in total"""
+        with self._lock:
+            methods = {
+                method: self._method_snapshot(stats)
+                for method, stats in sorted(self._methods.items())
+            }
+
+        return {
+            "methods": methods,
+            "totals": {
+                "calls": sum(stats["calls"] for stats in methods.values()),
+                "prompt_tokens": sum(stats["prompt_tokens"] for stats in methods.values()),
+                "completion_tokens": sum(stats["completion_tokens"] for stats in methods.values()),
+                "cost_usd": round(sum(stats["cost_usd"] for stats in methods.values()), 6)
+            }
+        }
+
+    def prometheus(self) -> str:
+        """Aggregates in the Prometheus text exposition format"""
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            methods = sorted(self._methods.items())
+
+            metric("llm_calls_total", "counter", "Upstream LLM calls by method and outcome")
+            for method, stats in methods:
+                lines.append(f'llm_calls_total{{method="{method}",outcome="success"}} {stats.calls - stats.errors}')
+                lines.append(f'llm_calls_total{{method="{method}",outcome="error"}} {stats.errors}')
+
+            metric("llm_retries_total", "counter", "Retried upstream LLM attempts by method")
+            for method, stats in methods:
+                lines.append(f'llm_retries_total{{method="{method}"}} {stats.retries}')
+
+            metric("llm_tokens_total", "counter", "Tokens used by method and type")
+            for method, stats in methods:
+                lines.append(f'llm_tokens_total{{method="{method}",type="prompt"}} {stats.prompt_tokens}')
+                lines.append(f'llm_tokens_total{{method="{method}",type="completion"}} {stats.completion_tokens}')
+
+            metric("llm_cost_usd_total", "counter", "Estimated LLM cost in USD by method")
+            for method, stats in methods:
+                lines.append(f'llm_cost_usd_total{{method="{method}"}} {stats.cost_usd:.6f}')
+
+            metric("llm_cache_lookups_total", "counter", "Requests looked up in a response cache, by method and result")
+            for method, stats in methods:
+                lines.append(f'llm_cache_lookups_total{{method="{method}",result="hit"}} {stats.cache_hits}')
+                lines.append(f'llm_cache_lookups_total{{method="{method}",result="miss"}} {stats.cache_misses}')
+
+            metric("llm_lexicon_requests_total", "counter", "Requests handled by the local property lexicon, by method and outcome")
+            for method, stats in methods:
+                for outcome, count in sorted(stats.lexicon.items()):
+                    lines.append(f'llm_lexicon_requests_total{{method="{method}",outcome="{outcome}"}} {count}')
+
+            metric("llm_fallbacks_total", "counter", "Falls back to extra upstream calls by method and reason")
+            for method, stats in methods:
+                for reason, count in sorted(stats.fallbacks.items()):
+                    lines.append(f'llm_fallbacks_total{{method="{method}",reason="{reason}"}} {count}')
+
+            for name, attribute, help_text in (
+                ("llm_call_duration_seconds", "latency", "Wall time of upstream LLM calls by method"),
+                ("llm_time_to_first_token_seconds", "time_to_first_token", "Time to the first streamed token by method")
+            ):
+                metric(name, "histogram", help_text)
+                for method, stats in methods:
+                    histogram = getattr(stats, attribute)
+                    for bound, count in histogram.cumulative():
+                        lines.append(f'{name}_bucket{{method="{method}",le="{bound}"}} {count}')
+                    lines.append(f'{name}_sum{{method="{method}"}} {histogram.sum:.6f}')
+                    lines.append(f'{name}_count{{method="{method}"}} {histogram.count}')
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,323 @@
+import os
+import json
+import math
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+
+# Response headers kept in recordings; the rest describe the original connection
+RECORDED_HEADERS = ("content-type", "openai-model", "openai-processing-ms", "x-request-id")
+
+TRANSPORT_MODES = ("live", "record", "replay")
+LATENCY_MODES = ("recorded", "lognormal", "none")
+
+
+def request_key(method: str, path: str, body: bytes) -> str:
+    """Identify a request by its method, path and canonicalized JSON body"""
+    try:
+        canonical = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":")).encode()
+    except (TypeError, ValueError):
+        canonical = body
+    return hashlib.sha256(method.encode() + b" " + path.encode() + b"\n" + canonical).hexdigest()
+
+
+def _request_kind(body: bytes) -> Tuple[bool, Optional[str]]:
+    """Whether a completion request streams, and the response format it asks for"""
+    try:
+        payload = json.loads(body)
+    except (TypeError, ValueError):
+        return False, None
+    return bool(payload.get("stream")), (payload.get("response_format") or {}).get("type")
+
+
+class _RecordingStream(httpx.AsyncByteStream):
+    """Passes a response body through while noting when each chunk arrived"""
+
+    def __init__(self, inner: httpx.AsyncByteStream, started: float, on_complete):
+        self.inner = inner
+        self.started = started
+        self.on_complete = on_complete
+        self.chunks: List[Tuple[float, bytes]] = []
+        self.completed = False
+
+    async def __aiter__(self):
+        async for chunk in self.inner:
+            self.chunks.append((time.perf_counter() - self.started, chunk))
+            yield chunk
+        self._complete()
+
+    async def aclose(self):
+        await self.inner.aclose()
+        # Clients stop reading event streams at the terminating event, before the body ends
+        if self.chunks and self.chunks[-1][1].rstrip().endswith(b"[DONE]"):
+            self._complete()
+
+    def _complete(self):
+        """Hand over a fully read body once; partial bodies are not worth replaying"""
+        if not self.completed:
+            self.completed = True
+            self.on_complete(self.chunks)
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Forwards requests to a real transport and appends each exchange to a JSON lines file
+
+    Each line holds the request key and body, the status, the time until the
+    response headers arrived, and the response body with the arrival time of
+    each chunk, so replays can reproduce latency and streaming pace.
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, path: str):
+        """Initialize the recorder, creating the file's directory if needed"""
+        self.inner = inner
+        self.path = path
+        self.recorded = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        # Uncompressed bodies keep the recording readable and the chunks meaningful
+        request.headers["accept-encoding"] = "identity"
+
+        started = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        headers_after = time.perf_counter() - started
+
+        def write(chunks: List[Tuple[float, bytes]]):
+            content = b"".join(chunk for _, chunk in chunks)
+            offsets, end = [], 0
+            for arrived, chunk in chunks:
+                end += len(chunk)
+                offsets.append([round(arrived, 4), end])
+
+            record = {
+                "key": request_key(request.method, request.url.path, body),
+                "method": request.method,
+                "path": request.url.path,
+                "request": json.loads(body) if body else None,
+                "status": response.status_code,
+                "headers": {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+                "elapsed": round(headers_after, 4),
+                "body": content.decode("utf-8", errors="replace"),
+                "chunks": offsets
+            }
+            with self._lock:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+                self.recorded += 1
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_RecordingStream(response.stream, started, write),
+            extensions=response.extensions
+        )
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": "record", "path": self.path, "recorded": self.recorded}
+
+
+class _PacedStream(httpx.AsyncByteStream):
+    """Yields a recorded body in its original chunks, sleeping between them"""
+
+    def __init__(self, content: bytes, chunks: List[Tuple[float, int]]):
+        self.content = content
+        # (delay before the chunk, end offset of the chunk)
+        self.chunks = chunks
+
+    async def __aiter__(self):
+        start = 0
+        for delay, end in self.chunks:
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield self.content[start:end]
+            start = end
+        if start < len(self.content):
+            yield self.content[start:]
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Serves recorded responses without touching the network
+
+    Requests are matched to recordings by key; repeats of the same request
+    cycle through its recordings in order. Unmatched requests get a
+    recording of the same kind (streaming or not, same response format)
+    chosen by their key, or a 404 in strict mode.
+
+    Latency is the recorded time to the response headers, a log-normal
+    sample around ``latency_median``, or none; streamed chunks follow their
+    recorded pacing unless ``chunk_interval`` fixes it. Random draws are
+    seeded by the request key and repeat count, so a replay is deterministic
+    whatever the interleaving of concurrent requests.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        latency: str = "recorded",
+        latency_median: float = 0.8,
+        latency_sigma: float = 0.5,
+        chunk_interval: Optional[float] = None,
+        seed: int = 0,
+        strict: bool = False
+    ):
+        """Load the recordings"""
+        if latency not in LATENCY_MODES:
+            raise ValueError(f"Unknown replay latency mode: {latency}")
+
+        self.path = path
+        self.latency = latency
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.chunk_interval = chunk_interval
+        self.seed = seed
+        self.strict = strict
+
+        self._by_key: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_kind: Dict[Tuple[bool, Optional[str]], List[Dict[str, Any]]] = {}
+        self._served: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        self.matched = 0
+        self.substituted = 0
+        self.missed = 0
+
+        self._load()
+
+    def _load(self):
+        """Read the recordings, skipping lines that aren't valid JSON"""
+        if not os.path.exists(self.path):
+            print(f"Replay recordings not found at {self.path}")
+            return
+
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._by_key.setdefault(record["key"], []).append(record)
+                body = json.dumps(record.get("request")).encode()
+                self._by_kind.setdefault(_request_kind(body), []).append(record)
+
+        print(f"Loaded {sum(len(records) for records in self._by_key.values())} replay recordings from {self.path}")
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        key = request_key(request.method, request.url.path, body)
+
+        with self._lock:
+            occurrence = self._served.get(key, 0)
+            self._served[key] = occurrence + 1
+
+            records = self._by_key.get(key)
+            if records:
+                record = records[occurrence % len(records)]
+                self.matched += 1
+            elif not self.strict and self._by_kind.get(_request_kind(body)):
+                candidates = self._by_kind[_request_kind(body)]
+                record = candidates[(int(key[:8], 16) + occurrence) % len(candidates)]
+                self.substituted += 1
+            else:
+                self.missed += 1
+                record = None
+
+        if record is None:
+            return httpx.Response(
+                status_code=404,
+                json={"error": {"message": "No recorded response for this request", "type": "replay_miss"}}
+            )
+
+        rng = random.Random(f"{self.seed}:{key}:{occurrence}")
+        await asyncio.sleep(self._headers_delay(record, rng))
+
+        content = record["body"].encode("utf-8")
+        return httpx.Response(
+            status_code=record["status"],
+            headers=record["headers"],
+            stream=_PacedStream(content, self._chunk_delays(record, rng))
+        )
+
+    def _headers_delay(self, record: Dict[str, Any], rng: random.Random) -> float:
+        """Seconds to wait before returning the response headers"""
+        if self.latency == "recorded":
+            return record.get("elapsed", 0.0)
+        if self.latency == "lognormal":
+            return rng.lognormvariate(math.log(self.latency_median), self.latency_sigma)
+        return 0.0
+
+    def _chunk_delays(self, record: Dict[str, Any], rng: random.Random) -> List[Tuple[float, int]]:
+        """(delay, end offset) for each recorded chunk"""
+        chunks = record.get("chunks") or []
+        if self.latency == "none":
+            return [(0.0, end) for _, end in chunks]
+        if self.chunk_interval is not None:
+            # Jitter the fixed interval by up to half either way
+            return [
+                (0.0 if i == 0 else self.chunk_interval * rng.uniform(0.5, 1.5), end)
+                for i, (_, end) in enumerate(chunks)
+            ]
+
+        delays = []
+        previous = record.get("elapsed", 0.0)
+        for arrived, end in chunks:
+            delays.append((max(arrived - previous, 0.0), end))
+            previous = arrived
+        return delays
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": "replay",
+                "path": self.path,
+                "recordings": sum(len(records) for records in self._by_key.values()),
+                "matched": self.matched,
+                "substituted": self.substituted,
+                "missed": self.missed,
+                "latency": self.latency
+            }
+
+
+def create_llm_transport(
+    mode: str,
+    cassette_path: str,
+    max_connections: int = 20,
+    latency: str = "recorded",
+    latency_median: float = 0.8,
+    latency_sigma: float = 0.5,
+    chunk_interval: Optional[float] = None,
+    seed: int = 0,
+    strict: bool = False
+) -> Optional[httpx.AsyncBaseTransport]:
+    """Build the transport for an OpenAI client: None for live traffic, or a recorder or replayer
+
+    The latency, pacing, seed and strictness options only apply to replays.
+    """
+    if mode not in TRANSPORT_MODES:
+        raise ValueError(f"Unknown OpenAI transport mode: {mode}")
+    if mode == "record":
+        inner = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+        return RecordingTransport(inner, cassette_path)
+    if mode == "replay":
+        return ReplayTransport(
+            cassette_path,
+            latency=latency,
+            latency_median=latency_median,
+            latency_sigma=latency_sigma,
+            chunk_interval=chunk_interval,
+            seed=seed,
+            strict=strict
+        )
+    return None
@@ -0,0 +1,165 @@
+import time
+import pandas as pd
+from typing import Callable, Iterator, List, Tuple
+from pydantic import TypeAdapter, ValidationError
+
+from app.models.materials import Material, IngestionReport, RejectedRow
+
+
+# Columns every material dataset must provide
+REQUIRED_COLUMNS = ["Material", "Formula", "Cost", "Availability"]
+
+_materials_adapter = TypeAdapter(List[Material])
+
+
+class IngestionStats:
+    """Accumulates row counts, throughput and rejected rows across chunks"""
+
+    def __init__(self, max_reported_errors: int = 1000):
+        """Start timing a new ingestion"""
+        self.max_reported_errors = max_reported_errors
+        self.started_at = time.perf_counter()
+        self.total_rows = 0
+        self.accepted_rows = 0
+        self.rejected_rows = 0
+        self.rejected: List[RejectedRow] = []
+
+    def reject(self, rejected: List[Tuple[int, str]]):
+        """Record rejected (line, reason) pairs, keeping only the first few reasons"""
+        self.rejected_rows += len(rejected)
+        room = self.max_reported_errors - len(self.rejected)
+        for line, reason in rejected[:max(room, 0)]:
+            self.rejected.append(RejectedRow(line=line, reason=reason))
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = self.elapsed_seconds
+        return self.total_rows / elapsed if elapsed > 0 else 0.0
+
+    def report(self) -> IngestionReport:
+        """Build the final ingestion report"""
+        return IngestionReport(
+            total_rows=self.total_rows,
+            accepted_rows=self.accepted_rows,
+            rejected_rows=self.rejected_rows,
+            elapsed_seconds=round(self.elapsed_seconds, 3),
+            rows_per_second=round(self.rows_per_second, 1),
+            rejected=self.rejected
+        )
+
+
+def iter_csv_chunks(dataset_path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Read a dataset CSV in chunks of raw string columns, checking the header first"""
+    # Check the header on its own so a file without data rows is still rejected
+    header = pd.read_csv(dataset_path, nrows=0)
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in header.columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+
+    reader = pd.read_csv(
+        dataset_path,
+        chunksize=chunk_size,
+        dtype=str,
+        keep_default_na=False
+    )
+
+    with reader:
+        for chunk in reader:
+            yield chunk
+
+
+def validate_chunk(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[Tuple[int, str]]]:
+    """Validate and coerce a chunk column by column
+
+    Returns the valid rows (with a float ``Cost`` column) and the rejected
+    rows as (line, reason) pairs.
+    """
+    df = df[REQUIRED_COLUMNS].copy()
+    for col in ("Material", "Formula", "Availability"):
+        df[col] = df[col].str.strip()
+
+    raw_cost = df["Cost"]
+    df["Cost"] = pd.to_numeric(raw_cost.str.strip(), errors="coerce")
+
+    # Each row is reported with the first check it fails
+    checks = [
+        (df["Material"] == "", lambda row: "Missing material name"),
+        (df["Formula"] == "", lambda row: "Missing formula"),
+        (df["Availability"] == "", lambda row: "Missing availability"),
+        (df["Cost"].isna(), lambda row: f"Invalid cost '{raw_cost.loc[row]}'"),
+        (df["Cost"] < 0, lambda row: f"Negative cost {df['Cost'].loc[row]}"),
+    ]
+
+    rejected = []
+    bad = pd.Series(False, index=df.index)
+    for mask, reason in checks:
+        new_bad = mask & ~bad
+        for row in df.index[new_bad]:
+            rejected.append((_line_number(row), reason(row)))
+        bad |= new_bad
+
+    return df[~bad], rejected
+
+
+def build_materials(
+    df: pd.DataFrame,
+    extract_elements: Callable[[pd.Series], pd.Series]
+) -> Tuple[List[Material], List[Tuple[int, str]]]:
+    """Build and validate Material objects for a validated chunk
+
+    Formulas are parsed in one batch and the whole chunk is validated with a
+    single Pydantic call. The returned materials have ``id`` set to 0 and must
+    be assigned IDs by the caller.
+    """
+    rejected = []
+
+    elements = extract_elements(df["Formula"])
+    no_elements = elements.map(len) == 0
+    for row in df.index[no_elements]:
+        rejected.append((_line_number(row), f"Could not parse formula '{df['Formula'].loc[row]}'"))
+    df = df[~no_elements]
+    elements = elements[~no_elements]
+
+    lines = [_line_number(row) for row in df.index]
+    records = [
+        {
+            "id": 0,
+            "name": name,
+            "formula": formula,
+            "cost": cost,
+            "availability": availability,
+            "elements": element_list
+        }
+        for name, formula, cost, availability, element_list in zip(
+            df["Material"].tolist(),
+            df["Formula"].tolist(),
+            df["Cost"].tolist(),
+            df["Availability"].tolist(),
+            elements.tolist()
+        )
+    ]
+
+    try:
+        materials = _materials_adapter.validate_python(records)
+    except ValidationError as e:
+        # Drop the offending rows and validate the rest again
+        reasons = {}
+        for error in e.errors():
+            index, field = error["loc"][0], error["loc"][-1]
+            reasons.setdefault(index, f"{field}: {error['msg']}")
+        for index, reason in reasons.items():
+            rejected.append((lines[index], reason))
+        materials = _materials_adapter.validate_python(
+            [record for index, record in enumerate(records) if index not in reasons]
+        )
+
+    return materials, rejected
+
+
+def _line_number(row_index: int) -> int:
+    """Convert a 0-based data row index to a CSV line number (header is line 1)"""
+    return int(row_index) + 2
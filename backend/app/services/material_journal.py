@@ -0,0 +1,271 @@
+import os
+import json
+import time
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from app.models.materials import Material
+from app.services.material_store import MaterialStore
+from app.services.material_storage import MaterialStorage
+
+
+class JournalWriteError(Exception):
+    """Raised for new writes while the journal keeps failing to reach the disk"""
+    pass
+
+
+class JournaledMaterialStorage(MaterialStorage):
+    """Write-behind wrapper that logs mutations to an append-only journal
+
+    ``save_many`` and ``delete_many`` only queue a journal record and return.
+    A background thread appends queued records to the journal and fsyncs them
+    as a group, once ``fsync_batch_size`` records are waiting or
+    ``fsync_interval`` seconds have passed. Every ``compact_interval``
+    seconds the latest state of each journaled material is written to the
+    wrapped backend (the snapshot) and the journal is truncated. On load the
+    snapshot is read first and the journal replayed on top of it.
+
+    Failed journal writes are retried with exponential backoff. After
+    ``max_write_failures`` failures in a row, new writes raise
+    JournalWriteError until a retry succeeds, rather than being accepted
+    with nowhere to go.
+    """
+
+    def __init__(
+        self,
+        storage: MaterialStorage,
+        journal_path: str,
+        fsync_interval: float = 0.05,
+        fsync_batch_size: int = 256,
+        compact_interval: float = 60.0,
+        max_write_failures: int = 5,
+        retry_delay: float = 0.1,
+        max_retry_delay: float = 5.0
+    ):
+        """Initialize the journal; call load() to replay it and start the flusher"""
+        self.storage = storage
+        self.journal_path = journal_path
+        self.fsync_interval = fsync_interval
+        self.fsync_batch_size = fsync_batch_size
+        self.compact_interval = compact_interval
+        self.max_write_failures = max_write_failures
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+
+        # Records waiting to be written, and the latest state of every
+        # material journaled since the last compaction (None = deleted)
+        self._pending: List[str] = []
+        self._dirty: Dict[int, Optional[Material]] = {}
+        self._condition = threading.Condition()
+        # Serializes journal file writes, truncation and compaction
+        self._io_lock = threading.Lock()
+        self._closed = False
+        # Consecutive failed journal writes and the last error
+        self._write_failures = 0
+        self.last_error: Optional[str] = None
+        self._flusher: Optional[threading.Thread] = None
+        self._file = None
+
+    def load(self, store: MaterialStore) -> int:
+        """Load the snapshot, replay the journal on top of it and start the flusher"""
+        next_id = self.storage.load(store)
+        replayed = self._replay(store)
+
+        for material_id, material in replayed.items():
+            if material is not None:
+                next_id = max(next_id, material_id + 1)
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.journal_path)), exist_ok=True)
+        self._file = open(self.journal_path, "ab")
+
+        # Fold the replayed records into the snapshot so the journal starts empty
+        if replayed:
+            print(f"Replayed {len(replayed)} journaled material changes from {self.journal_path}")
+            self._apply(replayed)
+        self._truncate()
+
+        self._flusher = threading.Thread(target=self._run, name="material-journal", daemon=True)
+        self._flusher.start()
+        return next_id
+
+    def save_many(self, materials: Iterable[Material]):
+        """Queue materials to be journaled (raises JournalWriteError while the journal is failing)"""
+        with self._condition:
+            self._check_writable()
+            for material in materials:
+                self._pending.append(json.dumps({"op": "put", "material": material.dict()}))
+                self._dirty[material.id] = material
+            self._notify()
+
+    def save_bulk(self, materials: Iterable[Material]):
+        """Write freshly created materials straight to the snapshot, bypassing the journal
+
+        Only safe for IDs that have no journaled changes, such as those
+        assigned by a dataset ingestion.
+        """
+        self.storage.save_bulk(materials)
+
+    def delete_many(self, material_ids: Iterable[int]):
+        """Queue deletions to be journaled (raises JournalWriteError while the journal is failing)"""
+        with self._condition:
+            self._check_writable()
+            for material_id in material_ids:
+                self._pending.append(json.dumps({"op": "delete", "id": material_id}))
+                self._dirty[material_id] = None
+            self._notify()
+
+    def flush(self):
+        """Write and fsync every queued record (blocking)"""
+        with self._condition:
+            records = self._pending
+            self._pending = []
+        self._write(records)
+
+    def close(self):
+        """Stop the flusher, compact the journal and close the wrapped backend"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._flusher is not None:
+            self._flusher.join()
+
+        if self._file is not None:
+            self.flush()
+            self._compact()
+            self._file.close()
+            self._file = None
+
+        self.storage.close()
+
+    @property
+    def failing(self) -> bool:
+        """Whether new writes are being refused"""
+        return self._write_failures >= self.max_write_failures
+
+    def _check_writable(self):
+        """Refuse writes nobody can persist (caller holds the condition)"""
+        if self.failing:
+            raise JournalWriteError(f"Material journal is not writable: {self.last_error}")
+
+    def _notify(self):
+        """Wake the flusher early once a full batch is waiting (caller holds the condition)"""
+        if len(self._pending) >= self.fsync_batch_size:
+            self._condition.notify()
+
+    def _run(self):
+        """Flusher thread: group commits and periodic compaction"""
+        last_compaction = time.monotonic()
+
+        while True:
+            with self._condition:
+                if not self._closed and len(self._pending) < self.fsync_batch_size:
+                    self._condition.wait(self.fsync_interval)
+                if self._closed:
+                    return
+                records = self._pending
+                self._pending = []
+
+            try:
+                self._write(records)
+            except Exception as e:
+                # Keep the records for the next attempt and back off before retrying
+                with self._condition:
+                    self._pending = records + self._pending
+                    self._write_failures += 1
+                    self.last_error = str(e)
+                    if self._write_failures == self.max_write_failures:
+                        print(f"Error writing material journal, refusing new writes until it recovers: {str(e)}")
+                    self._backoff()
+                continue
+
+            if self._write_failures:
+                with self._condition:
+                    if self.failing:
+                        print("Material journal writes recovered")
+                    self._write_failures = 0
+                    self.last_error = None
+
+            if time.monotonic() - last_compaction >= self.compact_interval:
+                try:
+                    self._compact()
+                except Exception as e:
+                    print(f"Error compacting material journal: {str(e)}")
+                last_compaction = time.monotonic()
+
+    def _backoff(self):
+        """Wait before retrying a failed write, waking early on close (caller holds the condition)"""
+        delay = min(self.retry_delay * 2 ** (self._write_failures - 1), self.max_retry_delay)
+        deadline = time.monotonic() + delay
+        while not self._closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            self._condition.wait(remaining)
+
+    def _write(self, records: List[str]):
+        """Append records to the journal and fsync them as one group"""
+        if not records:
+            return
+        with self._io_lock:
+            self._file.write(("\n".join(records) + "\n").encode())
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _compact(self):
+        """Apply journaled changes to the snapshot and truncate the journal
+
+        Every journaled change, written or still pending, is applied before the
+        file is emptied; pending records are appended afterwards and replaying
+        them over the snapshot is harmless.
+        """
+        with self._io_lock:
+            with self._condition:
+                dirty = self._dirty
+                self._dirty = {}
+            if not dirty:
+                return
+
+            try:
+                self._apply(dirty)
+            except Exception:
+                # Keep the journal and retry on the next compaction; newer changes win
+                with self._condition:
+                    self._dirty = {**dirty, **self._dirty}
+                raise
+            self._truncate()
+
+    def _apply(self, changes: Dict[int, Optional[Material]]):
+        """Write the latest state of each changed material to the wrapped backend"""
+        self.storage.save_many(material for material in changes.values() if material is not None)
+        self.storage.delete_many(material_id for material_id, material in changes.items() if material is None)
+
+    def _truncate(self):
+        """Empty the journal file (caller holds the I/O lock, or the flusher isn't running)"""
+        self._file.truncate(0)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _replay(self, store: MaterialStore) -> Dict[int, Optional[Material]]:
+        """Apply the journal to the store and return the latest state per material"""
+        changes: Dict[int, Optional[Material]] = {}
+        if not os.path.exists(self.journal_path):
+            return changes
+
+        with open(self.journal_path, "r") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    if record["op"] == "put":
+                        material = Material(**record["material"])
+                        store.add(material)
+                        changes[material.id] = material
+                    elif record["op"] == "delete":
+                        store.remove(record["id"])
+                        changes[record["id"]] = None
+                except Exception as e:
+                    # A torn final record from a crash mid-write is expected; skip it
+                    print(f"Skipping journal record {line_number}: {str(e)}")
+
+        return changes
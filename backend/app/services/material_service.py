@@ -3,7 +3,10 @@ import json
 import pandas as pd
 import csv
 import uuid
-from typing import List, Dict, Any, Optional
+import shutil
+import asyncio
+import threading
+from typing import List, Dict, Any, Optional, Callable, Iterator, Tuple
 from pathlib import Path
 from datetime import datetime
 
@@ -14,15 +17,31 @@ from app.models.materials import (
     MaterialDataset,
     MaterialDesignGoal,
     MaterialDesignResult,
-    MaterialProperty
+    MaterialDesignSummary,
+    MaterialProperty,
+    SimilarMaterial
 )
+from app.core.config import settings
+from app.core.pagination import encode_cursor, decode_cursor
 from app.services.openai_service import OpenAIService
+from app.services.material_store import MaterialStore
+from app.services.material_storage import create_material_storage
+from app.services.formula_parser import formula_elements, parse_formulas
+from app.services.composition_index import CompositionIndex
+from app.services.design_repository import DesignRepository
+from app.services.material_ingest import IngestionStats, iter_csv_chunks, validate_chunk, build_materials
 
 
 class MaterialService:
     """Service for handling materials and datasets"""
     
-    def __init__(self, openai_service: OpenAIService, upload_dir: str):
+    def __init__(
+        self,
+        openai_service: OpenAIService,
+        upload_dir: str,
+        storage_backend: str = "json",
+        journal: bool = False
+    ):
         """Initialize the material service"""
         self.openai_service = openai_service
         self.upload_dir = upload_dir
@@ -35,190 +54,345 @@ class MaterialService:
         os.makedirs(self.datasets_dir, exist_ok=True)
         os.makedirs(self.designs_dir, exist_ok=True)
         
-        # Initialize materials database (in-memory for now)
-        self.materials_db = []
-        self.next_id = 1
+        # Initialize materials database (indexed, in-memory) and its persistence backend.
+        # The lock guards the store, the similarity index and ID allocation, which ingestion
+        # jobs touch from worker threads; they persist their chunks without holding it.
+        self._lock = threading.RLock()
+        self.store = MaterialStore()
+        self.storage = create_material_storage(storage_backend, upload_dir, journal=journal)
         
         # Load any existing materials
-        self._load_materials()
+        self.next_id = self.storage.load(self.store)
+        
+        # Composition fingerprints for nearest-neighbour search
+        self.similarity_index = CompositionIndex()
+        self.similarity_index.add_many(self.store.iter_fields())
+        
+        # Design results, indexed by ID, creation time, goal type and goal hash
+        self.designs = DesignRepository(self.designs_dir)
+    
+    def close(self):
+        """Flush pending writes and release the storage backend"""
+        self.storage.close()
+    
+    async def get_materials(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        cost_min: Optional[float] = None,
+        cost_max: Optional[float] = None,
+        availability: Optional[str] = None
+    ) -> List[Material]:
+        """Get a list of materials, optionally filtered by cost range and availability"""
+        with self._lock:
+            return self.store.query(
+                cost_min=cost_min,
+                cost_max=cost_max,
+                availability=availability,
+                skip=skip,
+                limit=limit
+            )
+    
+    async def get_materials_page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        cost_min: Optional[float] = None,
+        cost_max: Optional[float] = None,
+        availability: Optional[str] = None
+    ) -> Tuple[List[Material], Optional[str]]:
+        """Get a page of materials after an opaque cursor, plus the cursor for the next page"""
+        after_id = self._cursor_position(cursor)
+        
+        with self._lock:
+            materials = self.store.scan(
+                after_id=after_id,
+                limit=limit,
+                cost_min=cost_min,
+                cost_max=cost_max,
+                availability=availability
+            )
+        
+        return materials, self.next_cursor(materials, limit)
+    
+    @staticmethod
+    def _cursor_position(cursor: Optional[str]) -> Optional[int]:
+        """ID a material cursor points after, None for the start (raises ValueError if invalid)"""
+        if not cursor:
+            return None
+        after_id = decode_cursor(cursor).get("after")
+        if not isinstance(after_id, int):
+            raise ValueError("Invalid cursor")
+        return after_id
     
-    def _load_materials(self):
-        """Load materials from the materials directory"""
-        for material_file in Path(self.materials_dir).glob("*.json"):
-            try:
-                with open(material_file, "r") as f:
-                    material_data = json.load(f)
-                    
-                    # Make sure the ID is set
-                    if "id" not in material_data:
-                        material_data["id"] = self.next_id
-                        self.next_id += 1
-                    else:
-                        self.next_id = max(self.next_id, material_data["id"] + 1)
-                    
-                    material = Material(**material_data)
-                    self.materials_db.append(material)
-            except Exception as e:
-                # Log error but continue
-                print(f"Error loading material {material_file}: {str(e)}")
+    @staticmethod
+    def next_cursor(materials: List[Material], limit: int) -> Optional[str]:
+        """Cursor following the last material of a full page, None if the page is the last"""
+        if not materials or len(materials) < limit:
+            return None
+        return encode_cursor({"after": materials[-1].id})
     
-    async def get_materials(self, skip: int = 0, limit: int = 100) -> List[Material]:
-        """Get a list of materials"""
-        return self.materials_db[skip:skip + limit]
+    def iter_materials(
+        self,
+        cursor: Optional[str] = None,
+        cost_min: Optional[float] = None,
+        cost_max: Optional[float] = None,
+        availability: Optional[str] = None,
+        batch_size: int = 1000
+    ) -> Iterator[Material]:
+        """Iterate over every matching material in ID order
+
+        The cursor is checked right away (raising ValueError if invalid);
+        the returned iterator blocks while reading, so consume it off the
+        event loop. The lock is only held for one batch at a time, so
+        writers are not starved while a long export is streaming.
+        """
+        after_id = self._cursor_position(cursor)
+        
+        def batches(after_id: Optional[int]) -> Iterator[Material]:
+            while True:
+                with self._lock:
+                    batch = self.store.scan(
+                        after_id=after_id,
+                        limit=batch_size,
+                        cost_min=cost_min,
+                        cost_max=cost_max,
+                        availability=availability
+                    )
+                yield from batch
+                if len(batch) < batch_size:
+                    return
+                after_id = batch[-1].id
+        
+        return batches(after_id)
     
     async def create_material(self, material: MaterialCreate) -> Material:
         """Create a new material"""
-        # Create a Material object
-        material_id = self.next_id
-        self.next_id += 1
-        
         # Parse the formula to extract elements
         elements = self._extract_elements_from_formula(material.formula)
         
-        new_material = Material(
-            id=material_id,
-            name=material.name,
-            formula=material.formula,
-            cost=material.cost,
-            availability=material.availability,
-            elements=elements
-        )
-        
-        # Add to database
-        self.materials_db.append(new_material)
-        
-        # Save to file
-        material_path = Path(self.materials_dir) / f"{material_id}.json"
-        with open(material_path, "w") as f:
-            json.dump(new_material.dict(), f, indent=2)
+        with self._lock:
+            # Create a Material object
+            material_id = self.next_id
+            self.next_id += 1
+            
+            new_material = Material(
+                id=material_id,
+                name=material.name,
+                formula=material.formula,
+                cost=material.cost,
+                availability=material.availability,
+                elements=elements
+            )
+            
+            # Persist first, so a failed write leaves nothing behind in memory
+            self.storage.save(new_material)
+            
+            # Add to database
+            self.store.add(new_material)
+            self.similarity_index.add(material_id, new_material.formula, new_material.cost, new_material.availability)
         
         return new_material
     
     async def get_material(self, material_id: int) -> Optional[Material]:
         """Get a specific material by ID"""
-        for material in self.materials_db:
-            if material.id == material_id:
-                return material
-        return None
+        with self._lock:
+            return self.store.get(material_id)
     
     async def update_material(self, material_id: int, material_update: MaterialUpdate) -> Optional[Material]:
         """Update a material"""
-        for i, material in enumerate(self.materials_db):
-            if material.id == material_id:
-                # Update the material
-                update_data = material_update.dict(exclude_unset=True)
-                
-                # If the formula is updated, re-extract elements
-                if "formula" in update_data:
-                    update_data["elements"] = self._extract_elements_from_formula(update_data["formula"])
-                
-                updated_material = Material(
-                    **{**material.dict(), **update_data}
-                )
-                
-                # Update in database
-                self.materials_db[i] = updated_material
-                
-                # Save to file
-                material_path = Path(self.materials_dir) / f"{material_id}.json"
-                with open(material_path, "w") as f:
-                    json.dump(updated_material.dict(), f, indent=2)
-                
-                return updated_material
+        # Update the material
+        update_data = material_update.dict(exclude_unset=True)
+        
+        # If the formula is updated, re-extract elements
+        if "formula" in update_data:
+            update_data["elements"] = self._extract_elements_from_formula(update_data["formula"])
+        
+        with self._lock:
+            material = self.store.get(material_id)
+            if material is None:
+                return None
+            
+            updated_material = Material(
+                **{**material.dict(), **update_data}
+            )
+            
+            # Persist first, so a failed write leaves nothing behind in memory
+            self.storage.save(updated_material)
+            
+            # Update in database (re-indexes cost and availability)
+            self.store.add(updated_material)
+            self.similarity_index.add(
+                material_id, updated_material.formula, updated_material.cost, updated_material.availability
+            )
         
-        return None
+        return updated_material
     
     async def delete_material(self, material_id: int) -> bool:
         """Delete a material"""
-        for i, material in enumerate(self.materials_db):
-            if material.id == material_id:
-                # Remove from database
-                del self.materials_db[i]
-                
-                # Remove file
-                material_path = Path(self.materials_dir) / f"{material_id}.json"
-                if material_path.exists():
-                    material_path.unlink()
-                
-                return True
+        with self._lock:
+            if material_id not in self.store:
+                return False
+            
+            # Remove from storage first, so a failed write leaves the material in place
+            self.storage.delete(material_id)
+            
+            # Remove from database
+            self.store.remove(material_id)
+            self.similarity_index.remove(material_id)
         
-        return False
+        return True
+    
+    async def find_similar(
+        self,
+        material_id: int,
+        k: int = 10,
+        metric: str = "cosine",
+        cost_min: Optional[float] = None,
+        cost_max: Optional[float] = None,
+        availability: Optional[str] = None
+    ) -> Optional[List[SimilarMaterial]]:
+        """Find the materials with the most similar composition to a stored material"""
+        with self._lock:
+            material = self.store.get(material_id)
+            if material is None:
+                return None
+            return self._find_similar(material.formula, k, metric, cost_min, cost_max, availability, exclude_id=material_id)
+    
+    async def find_similar_to_formula(
+        self,
+        formula: str,
+        k: int = 10,
+        metric: str = "cosine",
+        cost_min: Optional[float] = None,
+        cost_max: Optional[float] = None,
+        availability: Optional[str] = None
+    ) -> List[SimilarMaterial]:
+        """Find the materials with the most similar composition to a formula"""
+        with self._lock:
+            return self._find_similar(formula, k, metric, cost_min, cost_max, availability)
+    
+    def _find_similar(
+        self,
+        formula: str,
+        k: int,
+        metric: str,
+        cost_min: Optional[float],
+        cost_max: Optional[float],
+        availability: Optional[str],
+        exclude_id: Optional[int] = None
+    ) -> List[SimilarMaterial]:
+        """Query the composition index and hydrate the hits (caller holds the lock)"""
+        neighbours = self.similarity_index.query(
+            formula,
+            k=k,
+            metric=metric,
+            cost_min=cost_min,
+            cost_max=cost_max,
+            availability=availability,
+            exclude_id=exclude_id
+        )
+        return [
+            SimilarMaterial(material=self.store.get(neighbour_id), distance=distance)
+            for neighbour_id, distance in neighbours
+        ]
     
     async def process_dataset(self, dataset_path: str) -> MaterialDataset:
-        """Process a material dataset CSV file"""
+        """Process a material dataset CSV file in a worker thread"""
+        return await asyncio.to_thread(self.ingest_dataset, dataset_path)
+    
+    def ingest_dataset(
+        self,
+        dataset_path: str,
+        progress_callback: Optional[Callable[[IngestionStats], None]] = None
+    ) -> MaterialDataset:
+        """Process a material dataset CSV file in chunks (blocking)
+
+        ``progress_callback`` is called with the running stats after each chunk.
+        """
         try:
-            # Read the CSV file
-            df = pd.read_csv(dataset_path)
-            
-            # Validate required columns
-            required_columns = ["Material", "Formula", "Cost", "Availability"]
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
-            
-            # Process materials
+            stats = IngestionStats(max_reported_errors=settings.INGEST_MAX_REPORTED_ERRORS)
             materials = []
             
-            for _, row in df.iterrows():
-                # Extract elements from formula
-                elements = self._extract_elements_from_formula(row["Formula"])
+            for chunk in iter_csv_chunks(dataset_path, settings.INGEST_CHUNK_SIZE):
+                stats.total_rows += len(chunk)
+                
+                # Column-wise validation and coercion
+                valid, rejected = validate_chunk(chunk)
+                stats.reject(rejected)
                 
-                # Create material
-                material_id = self.next_id
-                self.next_id += 1
+                # Batch formula parsing and Pydantic validation
+                chunk_materials, rejected = build_materials(valid, self._extract_elements_batch)
+                stats.reject(rejected)
                 
-                material = Material(
-                    id=material_id,
-                    name=row["Material"],
-                    formula=row["Formula"],
-                    cost=float(row["Cost"]),
-                    availability=row["Availability"],
-                    elements=elements
+                with self._lock:
+                    # Reserve a block of IDs for the accepted rows
+                    first_id = self.next_id
+                    self.next_id += len(chunk_materials)
+                
+                for offset, material in enumerate(chunk_materials):
+                    material.id = first_id + offset
+                
+                # Persist with one bulk write per chunk, without blocking requests. The IDs
+                # aren't visible yet, so no request can change these materials meanwhile.
+                self.storage.save_bulk(chunk_materials)
+                fingerprints = self.similarity_index.prepare(
+                    (material.id, material.formula, material.cost, material.availability)
+                    for material in chunk_materials
                 )
                 
-                # Add to database
-                self.materials_db.append(material)
+                with self._lock:
+                    # Add to the in-memory indexes
+                    self.store.add_many(chunk_materials)
+                    self.similarity_index.add_prepared(fingerprints)
                 
-                # Save to file
-                material_path = Path(self.materials_dir) / f"{material_id}.json"
-                with open(material_path, "w") as f:
-                    json.dump(material.dict(), f, indent=2)
+                stats.accepted_rows += len(chunk_materials)
+                materials.extend(chunk_materials)
                 
-                materials.append(material)
+                if progress_callback:
+                    progress_callback(stats)
             
-            # Save the dataset
+            # Save a copy of the dataset as uploaded
             dataset_id = str(uuid.uuid4())
-            dataset_path = Path(self.datasets_dir) / f"{dataset_id}.csv"
-            df.to_csv(dataset_path, index=False)
+            saved_path = Path(self.datasets_dir) / f"{dataset_id}.csv"
+            shutil.copyfile(dataset_path, saved_path)
+            
+            report = stats.report()
             
             # Create metadata
             metadata = {
                 "id": dataset_id,
-                "filename": os.path.basename(dataset_path),
+                "filename": os.path.basename(saved_path),
                 "num_materials": len(materials),
                 "created_at": datetime.now().isoformat()
             }
             
             return MaterialDataset(
                 materials=materials,
-                metadata=metadata
+                metadata=metadata,
+                report=report
             )
         
         except Exception as e:
             raise Exception(f"Error processing dataset: {str(e)}")
     
     async def design_material(self, goal: MaterialDesignGoal) -> MaterialDesignResult:
-        """Design a material based on specified goals and constraints"""
+        """Design a material based on specified goals and constraints
+
+        An identical goal that was designed before returns the stored result.
+        """
         try:
+            # Reuse the result of an identical goal
+            existing = self.designs.find_by_goal(goal)
+            if existing is not None:
+                return existing
+            
             # Generate a unique ID for this design
             design_id = str(uuid.uuid4())
             
             # In a real application, this would call MatterGen
             # For this example, we'll simulate it with some placeholder data
             
-            # Save the design
-            design_path = Path(self.designs_dir) / f"{design_id}.json"
-            
             # Generate Colab code
             colab_code = self._generate_colab_code(goal)
             
@@ -232,41 +406,50 @@ class MaterialService:
                 created_at=datetime.now().isoformat()
             )
             
-            # Save to file
-            with open(design_path, "w") as f:
-                json.dump(result.dict(), f, indent=2)
-            
-            return result
+            # Save the design, unless an identical goal was stored meanwhile
+            return self.designs.add_if_absent(result)
         
         except Exception as e:
             raise Exception(f"Error designing material: {str(e)}")
     
-    def _extract_elements_from_formula(self, formula: str) -> List[str]:
-        """Extract elements from a chemical formula"""
-        # Simple parser for chemical formulas
-        # In a real application, this would be more sophisticated
-        
-        elements = []
-        current_element = ""
-        
-        for char in formula:
-            if char.isupper():
-                if current_element:
-                    elements.append(current_element)
-                current_element = char
-            elif char.islower():
-                current_element += char
-            elif char.isdigit() or char in "()[]{}":
-                # Skip numbers and brackets
-                if current_element and current_element not in elements:
-                    elements.append(current_element)
-                    current_element = ""
+    async def get_design(self, design_id: str) -> Optional[MaterialDesignResult]:
+        """Get a stored design result by ID"""
+        return self.designs.get(design_id)
+    
+    async def list_designs(
+        self,
+        goal_type: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[MaterialDesignSummary], Optional[str]]:
+        """List design summaries newest first, plus the cursor for the next page"""
+        before = None
+        if cursor:
+            position = decode_cursor(cursor)
+            created_at, design_id = position.get("created_at"), position.get("id")
+            if not isinstance(created_at, str) or not isinstance(design_id, str):
+                raise ValueError("Invalid cursor")
+            before = (created_at, design_id)
         
-        # Add the last element
-        if current_element and current_element not in elements:
-            elements.append(current_element)
+        designs = self.designs.list(goal_type=goal_type, before=before, limit=limit)
         
-        return elements
+        next_cursor = None
+        if designs and len(designs) == limit:
+            last = designs[-1]
+            next_cursor = encode_cursor({"created_at": last.created_at, "id": last.design_id})
+        return designs, next_cursor
+    
+    def _extract_elements_from_formula(self, formula: str) -> List[str]:
+        """Extract elements from a chemical formula (raises FormulaParseError if invalid)"""
+        return formula_elements(formula)
+    
+    def _extract_elements_batch(self, formulas: pd.Series) -> pd.Series:
+        """Extract elements for a Series of formulas, parsing each unique formula once
+
+        Unparseable formulas map to an empty list.
+        """
+        compositions = parse_formulas(formulas)
+        return compositions.map(lambda composition: list(composition) if composition else [])
     
     def _generate_colab_code(self, goal: MaterialDesignGoal) -> str:
         """Generate Colab code for a material design goal"""
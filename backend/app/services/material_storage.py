@@ -0,0 +1,231 @@
+import os
+import json
+import sqlite3
+import threading
+from typing import Iterable, List
+from pathlib import Path
+
+from app.core.config import settings
+from app.models.materials import Material
+from app.services.material_store import MaterialStore
+
+
+class MaterialStorage:
+    """Base class for material persistence backends"""
+
+    def load(self, store: MaterialStore) -> int:
+        """Load all persisted materials into the store and return the next free ID"""
+        raise NotImplementedError
+
+    def save(self, material: Material):
+        """Persist a single material"""
+        self.save_many([material])
+
+    def save_many(self, materials: Iterable[Material]):
+        """Persist several materials"""
+        raise NotImplementedError
+
+    def save_bulk(self, materials: Iterable[Material]):
+        """Persist a large batch of newly created materials"""
+        self.save_many(materials)
+
+    def delete(self, material_id: int):
+        """Remove a persisted material"""
+        self.delete_many([material_id])
+
+    def delete_many(self, material_ids: Iterable[int]):
+        """Remove several persisted materials"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the backend"""
+        pass
+
+
+class JsonMaterialStorage(MaterialStorage):
+    """Stores one JSON file per material, suitable for small installs"""
+
+    def __init__(self, materials_dir: str):
+        """Initialize the JSON storage"""
+        self.materials_dir = materials_dir
+        os.makedirs(self.materials_dir, exist_ok=True)
+
+    def load(self, store: MaterialStore) -> int:
+        """Load materials from the materials directory"""
+        next_id = 1
+        materials = []
+
+        for material_file in Path(self.materials_dir).glob("*.json"):
+            try:
+                with open(material_file, "r") as f:
+                    material_data = json.load(f)
+
+                # Make sure the ID is set
+                if "id" not in material_data:
+                    material_data["id"] = next_id
+                    next_id += 1
+                else:
+                    next_id = max(next_id, material_data["id"] + 1)
+
+                materials.append(Material(**material_data))
+            except Exception as e:
+                # Log error but continue
+                print(f"Error loading material {material_file}: {str(e)}")
+
+        store.add_many(materials)
+        return next_id
+
+    def save_many(self, materials: Iterable[Material]):
+        """Write each material to its own JSON file"""
+        for material in materials:
+            material_path = Path(self.materials_dir) / f"{material.id}.json"
+            with open(material_path, "w") as f:
+                json.dump(material.dict(), f, indent=2)
+
+    def delete_many(self, material_ids: Iterable[int]):
+        """Remove the JSON files for the given materials"""
+        for material_id in material_ids:
+            material_path = Path(self.materials_dir) / f"{material_id}.json"
+            if material_path.exists():
+                material_path.unlink()
+
+
+class SqliteMaterialStorage(MaterialStorage):
+    """Stores materials in a single SQLite database in WAL mode"""
+
+    def __init__(self, db_path: str, legacy_json_dir: str = None):
+        """Initialize the SQLite storage, migrating legacy JSON files once if present"""
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+        if legacy_json_dir:
+            self._migrate_from_json(legacy_json_dir)
+
+    def _create_schema(self):
+        """Create tables and indexes if they don't exist"""
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS materials (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    formula TEXT NOT NULL,
+                    cost REAL NOT NULL,
+                    availability TEXT NOT NULL,
+                    elements TEXT NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_materials_formula ON materials (formula)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_materials_cost ON materials (cost)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_materials_availability ON materials (availability)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def _migrate_from_json(self, json_dir: str):
+        """Import the one-file-per-material JSON directory, once"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+        if row is not None or not os.path.isdir(json_dir):
+            return
+
+        legacy_store = MaterialStore()
+        JsonMaterialStorage(json_dir).load(legacy_store)
+        materials = legacy_store.all()
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO materials (id, name, formula, cost, availability, elements) VALUES (?, ?, ?, ?, ?, ?)",
+                [self._to_row(material) for material in materials]
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)", (str(len(materials)),))
+
+        if materials:
+            print(f"Migrated {len(materials)} materials from {json_dir} to {self.db_path}")
+
+    @staticmethod
+    def _to_row(material: Material) -> tuple:
+        """Convert a material to a database row"""
+        return (
+            material.id,
+            material.name,
+            material.formula,
+            material.cost,
+            material.availability,
+            json.dumps(material.elements)
+        )
+
+    def load(self, store: MaterialStore) -> int:
+        """Load raw rows into the store, they are hydrated into Material objects on access"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT id, name, formula, cost, availability, elements FROM materials ORDER BY id"
+            )
+            while True:
+                rows = cursor.fetchmany(10000)
+                if not rows:
+                    break
+                store.add_rows(rows)
+
+            max_id = self._conn.execute("SELECT MAX(id) FROM materials").fetchone()[0]
+
+        return (max_id or 0) + 1
+
+    def save_many(self, materials: Iterable[Material]):
+        """Write materials in a single transaction"""
+        rows = [self._to_row(material) for material in materials]
+        if not rows:
+            return
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO materials (id, name, formula, cost, availability, elements) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def delete_many(self, material_ids: Iterable[int]):
+        """Delete materials in a single transaction"""
+        params: List[tuple] = [(material_id,) for material_id in material_ids]
+        if not params:
+            return
+
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM materials WHERE id = ?", params)
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+
+def create_material_storage(backend: str, upload_dir: str, journal: bool = False) -> MaterialStorage:
+    """Create the configured material storage backend, optionally behind a write-behind journal"""
+    materials_dir = os.path.join(upload_dir, "materials")
+
+    if backend == "json":
+        storage = JsonMaterialStorage(materials_dir)
+    elif backend == "sqlite":
+        storage = SqliteMaterialStorage(
+            os.path.join(upload_dir, "materials.db"),
+            legacy_json_dir=materials_dir
+        )
+    else:
+        raise ValueError(f"Unknown material storage backend: {backend}")
+
+    if journal:
+        from app.services.material_journal import JournaledMaterialStorage
+
+        storage = JournaledMaterialStorage(
+            storage,
+            os.path.join(upload_dir, "materials.journal"),
+            fsync_interval=settings.MATERIAL_JOURNAL_FSYNC_INTERVAL,
+            fsync_batch_size=settings.MATERIAL_JOURNAL_FSYNC_BATCH_SIZE,
+            compact_interval=settings.MATERIAL_JOURNAL_COMPACT_INTERVAL
+        )
+
+    return storage
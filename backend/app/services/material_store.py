@@ -0,0 +1,257 @@
+import bisect
+import heapq
+import json
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from app.models.materials import Material
+
+
+# Raw persisted row: (id, name, formula, cost, availability, elements as JSON)
+MaterialRow = Tuple[int, str, str, float, str, str]
+
+
+class MaterialStore:
+    """In-memory material store with a primary id index and secondary indexes"""
+
+    def __init__(self):
+        """Initialize an empty store"""
+        # Primary index: id -> material, or a raw row that is hydrated on first access
+        self._by_id: Dict[int, Union[Material, MaterialRow]] = {}
+
+        # All ids in ascending order, for stable listing and keyset pagination
+        self._sorted_ids: List[int] = []
+
+        # Secondary index on cost, kept sorted as (cost, id) pairs for range queries
+        self._cost_index: List[Tuple[float, int]] = []
+
+        # Secondary index on availability: normalized value -> ids in ascending order
+        self._availability_index: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, material_id: int) -> bool:
+        return material_id in self._by_id
+
+    @staticmethod
+    def _availability_key(availability: str) -> str:
+        """Normalize an availability value for indexing"""
+        return availability.strip().lower()
+
+    def _hydrate(self, material_id: int) -> Material:
+        """Return the material for an ID, turning a raw row into a Material if needed"""
+        entry = self._by_id[material_id]
+        if isinstance(entry, Material):
+            return entry
+
+        material = Material(
+            id=entry[0],
+            name=entry[1],
+            formula=entry[2],
+            cost=entry[3],
+            availability=entry[4],
+            elements=json.loads(entry[5])
+        )
+        self._by_id[material_id] = material
+        return material
+
+    def get(self, material_id: int) -> Optional[Material]:
+        """Get a material by ID"""
+        if material_id not in self._by_id:
+            return None
+        return self._hydrate(material_id)
+
+    def add(self, material: Material):
+        """Add or replace a material, keeping all indexes in sync"""
+        self.remove(material.id)
+        self._by_id[material.id] = material
+        self._index(material.id, material.cost, material.availability)
+
+    def add_many(self, materials: Iterable[Material]):
+        """Add several materials at once, merging them into the sorted indexes in one pass"""
+        self._add_entries((material, material.id, material.cost, material.availability) for material in materials)
+
+    def add_rows(self, rows: Iterable[MaterialRow]):
+        """Add raw persisted rows without validating them into Material objects yet"""
+        self._add_entries((row, row[0], row[3], row[4]) for row in rows)
+
+    def _add_entries(self, entries: Iterable[Tuple[Union[Material, MaterialRow], int, float, str]]):
+        """Bulk insert entries, replacing existing IDs"""
+        new_entries = []
+        new_by_availability: Dict[str, List[int]] = {}
+        for entry, material_id, cost, availability in entries:
+            if material_id in self._by_id:
+                self.remove(material_id)
+                self._index(material_id, cost, availability)
+            else:
+                new_entries.append((cost, material_id))
+                new_by_availability.setdefault(self._availability_key(availability), []).append(material_id)
+
+            self._by_id[material_id] = entry
+
+        if new_entries:
+            # Sort only the new entries, then merge them into each index in linear time
+            self._merge_sorted(self._cost_index, sorted(new_entries))
+            self._merge_sorted(self._sorted_ids, sorted(material_id for _, material_id in new_entries))
+            for key, ids in new_by_availability.items():
+                self._merge_sorted(self._availability_index.setdefault(key, []), sorted(ids))
+
+    @staticmethod
+    def _merge_sorted(target: list, items: list):
+        """Merge sorted items into a sorted list"""
+        if not items:
+            return
+        # New IDs are normally all above the current maximum, so a merge is rarely needed
+        if not target or items[0] > target[-1]:
+            target.extend(items)
+        else:
+            target[:] = list(heapq.merge(target, items))
+
+    def remove(self, material_id: int) -> Optional[Material]:
+        """Remove a material by ID and return it, if present"""
+        if material_id not in self._by_id:
+            return None
+
+        material = self._hydrate(material_id)
+        del self._by_id[material_id]
+        self._unindex(material.id, material.cost, material.availability)
+        return material
+
+    def all(self) -> List[Material]:
+        """Get all materials in insertion order"""
+        return [self._hydrate(material_id) for material_id in list(self._by_id)]
+
+    @staticmethod
+    def _fields(entry: Union[Material, MaterialRow]) -> Tuple[int, str, float, str]:
+        """Get (id, formula, cost, availability) from a material or a raw row"""
+        if isinstance(entry, Material):
+            return entry.id, entry.formula, entry.cost, entry.availability
+        return entry[0], entry[2], entry[3], entry[4]
+
+    def iter_fields(self) -> Iterator[Tuple[int, str, float, str]]:
+        """Iterate (id, formula, cost, availability) without hydrating raw rows"""
+        for entry in self._by_id.values():
+            yield self._fields(entry)
+
+    def scan(
+        self,
+        after_id: Optional[int] = None,
+        limit: int = 100,
+        cost_min: Optional[float] = None,
+        cost_max: Optional[float] = None,
+        availability: Optional[str] = None
+    ) -> List[Material]:
+        """Get up to ``limit`` matching materials with an ID above ``after_id``, in ID order
+
+        This is the keyset-pagination counterpart of ``query``: the cost of a
+        page does not grow with how deep into the listing it is.
+        """
+        availability_key = None if availability is None else self._availability_key(availability)
+        position = 0 if after_id is None else bisect.bisect_right(self._sorted_ids, after_id)
+
+        results = []
+        while position < len(self._sorted_ids) and len(results) < limit:
+            material_id = self._sorted_ids[position]
+            position += 1
+
+            _, _, cost, entry_availability = self._fields(self._by_id[material_id])
+            if cost_min is not None and cost < cost_min:
+                continue
+            if cost_max is not None and cost > cost_max:
+                continue
+            if availability_key is not None and self._availability_key(entry_availability) != availability_key:
+                continue
+            results.append(self._hydrate(material_id))
+
+        return results
+
+    def query(
+        self,
+        cost_min: Optional[float] = None,
+        cost_max: Optional[float] = None,
+        availability: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[Material]:
+        """Query materials in ID order using the secondary indexes
+
+        Availability filters read the ID-ordered availability index directly.
+        A cost range is either sorted into ID order, when it is small, or
+        checked against the ID-ordered candidates until the page is full,
+        whichever is expected to touch fewer entries.
+        """
+        end = skip + limit
+
+        # ID-ordered candidates: everything, or the materials with the requested availability
+        availability_key = None
+        candidate_ids = self._sorted_ids
+        if availability is not None:
+            availability_key = self._availability_key(availability)
+            candidate_ids = self._availability_index.get(availability_key, [])
+
+        if cost_min is None and cost_max is None:
+            return [self._hydrate(material_id) for material_id in candidate_ids[skip:end]]
+
+        lo = 0 if cost_min is None else bisect.bisect_left(self._cost_index, (cost_min, float("-inf")))
+        hi = len(self._cost_index) if cost_max is None else bisect.bisect_right(self._cost_index, (cost_max, float("inf")))
+        in_range = hi - lo
+        if in_range <= 0 or not candidate_ids:
+            return []
+
+        # Sorting the range costs about r log r; a walk over the candidates needs
+        # about end * candidates / r steps if cost and ID are independent
+        if in_range * in_range.bit_length() <= end * len(candidate_ids) / in_range:
+            ids = [material_id for _, material_id in self._cost_index[lo:hi]]
+            if availability_key is not None:
+                ids = [
+                    material_id for material_id in ids
+                    if self._availability_key(self._fields(self._by_id[material_id])[3]) == availability_key
+                ]
+            ordered_ids = sorted(ids)[skip:end]
+        else:
+            ordered_ids = []
+            matched = 0
+            for material_id in candidate_ids:
+                cost = self._fields(self._by_id[material_id])[2]
+                if (cost_min is not None and cost < cost_min) or (cost_max is not None and cost > cost_max):
+                    continue
+                matched += 1
+                if matched > skip:
+                    ordered_ids.append(material_id)
+                    if matched == end:
+                        break
+
+        return [self._hydrate(material_id) for material_id in ordered_ids]
+
+    def clear(self):
+        """Remove every material from the store"""
+        self._by_id.clear()
+        self._sorted_ids.clear()
+        self._cost_index.clear()
+        self._availability_index.clear()
+
+    def _index(self, material_id: int, cost: float, availability: str):
+        """Add a material to the secondary indexes"""
+        bisect.insort(self._sorted_ids, material_id)
+        bisect.insort(self._cost_index, (cost, material_id))
+        key = self._availability_key(availability)
+        bisect.insort(self._availability_index.setdefault(key, []), material_id)
+
+    def _unindex(self, material_id: int, cost: float, availability: str):
+        """Remove a material from the secondary indexes"""
+        position = bisect.bisect_left(self._sorted_ids, material_id)
+        if position < len(self._sorted_ids) and self._sorted_ids[position] == material_id:
+            del self._sorted_ids[position]
+
+        position = bisect.bisect_left(self._cost_index, (cost, material_id))
+        if position < len(self._cost_index) and self._cost_index[position] == (cost, material_id):
+            del self._cost_index[position]
+
+        key = self._availability_key(availability)
+        ids = self._availability_index.get(key)
+        if ids is not None:
+            position = bisect.bisect_left(ids, material_id)
+            if position < len(ids) and ids[position] == material_id:
+                del ids[position]
+            if not ids:
+                del self._availability_index[key]
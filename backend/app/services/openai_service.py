@@ -1,37 +1,246 @@
 import os
 import json
-from typing import List, Dict, Any, Optional
+import time
+import asyncio
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple, Union
+import httpx
 import openai
-from openai import OpenAI
+import numpy as np
+from openai import AsyncOpenAI
+from pydantic import ValidationError
 
+from app.services.response_cache import ResponseCache
+from app.services.semantic_cache import SemanticCache, quantities
+from app.services.property_lexicon import PropertyLexicon, LexiconResult
+from app.services.llm_telemetry import LLMTelemetry
+from app.services.history_manager import HistoryManager
+from app.services.llm_resilience import ResilientCaller, UpstreamUnavailableError
 from app.models.chat import (
+    MessageRole,
     ChatMessage,
     ChatHistory,
     AssistantResponse,
     PropertyInterpretation,
+    ChatToMatterGenRequest,
     ChatToMatterGenResponse
 )
 
 
+# Completion tokens assumed per call until the real usage is known
+EXPECTED_COMPLETION_TOKENS = 500
+
+# Characters of the user's side of a conversation embedded for the semantic cache
+SEMANTIC_CACHE_TEXT_CHARS = 2000
+
+# Audience levels property guidance is written for; anything else falls back to the first
+USER_LEVELS = ("beginner", "intermediate", "advanced")
+
+# Appended to the system prompt to get the answer and its parameters in one response
+SINGLE_PASS_EXTRACTION_PROMPT = """
+        Respond with a JSON object with exactly these fields:
+        - "text": your answer to the user, written as you would without JSON
+        - "mattergen_params": an object of the material properties and parameters that should be used for MatterGen
+        - "interpretations": an array of objects with "property_name", "technical_value" (number or string),
+          "unit", "confidence" (0 to 1), "source_text" and "explanation"
+        """
+
+
+def normalize_user_level(user_level: Optional[str]) -> str:
+    """Map a user level to one of USER_LEVELS, ignoring case and surrounding whitespace"""
+    level = (user_level or "").strip().lower()
+    return level if level in USER_LEVELS else USER_LEVELS[0]
+
+
 class OpenAIService:
     """Service for interacting with OpenAI API"""
     
-    def __init__(self, api_key: str, model: str = "gpt-4o"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gpt-4o",
+        max_concurrency: int = 8,
+        timeout: float = 60.0,
+        max_connections: int = 20,
+        response_cache: Optional[ResponseCache] = None,
+        single_pass_extraction: bool = True,
+        history_token_budget: int = 3000,
+        history_keep_last_messages: int = 8,
+        history_summary_batch: int = 6,
+        resilient_caller: Optional[ResilientCaller] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        property_lexicon: Optional[PropertyLexicon] = None,
+        telemetry: Optional[LLMTelemetry] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
         """Initialize the OpenAI service"""
         self.api_key = api_key
         self.model = model
-        self.client = OpenAI(api_key=api_key)
+        self.timeout = timeout
+        self.single_pass_extraction = single_pass_extraction
+        
+        # One pooled HTTP client shared by every request, so connections are reused.
+        # A custom transport (recording or replaying traffic) replaces the network.
+        self.transport = transport
+        self.http_client = httpx.AsyncClient(
+            transport=transport,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            ),
+            timeout=httpx.Timeout(timeout, connect=10.0)
+        )
+        # Retries are handled by the resilient caller, not the client
+        self.client = AsyncOpenAI(api_key=api_key, http_client=self.http_client, timeout=timeout, max_retries=0)
+        
+        # Retries, circuit breaker and rate limits shared by every outbound call
+        self.caller = resilient_caller or ResilientCaller()
+        
+        # Caps the number of completions in flight across all requests
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        
+        # Cache for responses that only depend on a few small inputs
+        self.response_cache = response_cache or ResponseCache()
+        
+        # Interpretations reused for similarly worded conversations (None disables it)
+        self.semantic_cache = semantic_cache
+        
+        # Resolves common layman property descriptions locally (None disables it)
+        self.property_lexicon = property_lexicon
+        
+        # Keeps long chat histories within a token budget with rolling summaries
+        self.history_manager = HistoryManager(
+            summarize=self._summarize_history,
+            model=model,
+            token_budget=history_token_budget,
+            keep_last_messages=history_keep_last_messages,
+            summary_batch=history_summary_batch
+        )
+        
+        # Latency, time to first token, token, cost and cache statistics per method
+        self.telemetry = telemetry or LLMTelemetry()
+    
+    async def close(self):
+        """Close the pooled HTTP client and the response cache"""
+        await self.client.close()
+        self.response_cache.close()
+    
+    async def _create_completion(self, method: str, **kwargs):
+        """Create a chat completion through the resilient caller, recording it under `method`
+
+        Each attempt waits for a free concurrency slot; the slot is released
+        while backing off between retries.
+        """
+        attempts = 0
+        
+        async def attempt():
+            nonlocal attempts
+            attempts += 1
+            async with self._semaphore:
+                return await self.client.chat.completions.create(
+                    model=self.model,
+                    timeout=self.timeout,
+                    **kwargs
+                )
+        
+        started = time.perf_counter()
+        try:
+            response = await self.caller.call(
+                attempt,
+                estimated_tokens=self._estimate_tokens(kwargs["messages"]),
+                actual_tokens=lambda response: response.usage.total_tokens if response.usage else None
+            )
+        except Exception:
+            self.telemetry.record_call(method, self.model, time.perf_counter() - started, retries=max(attempts - 1, 0), error=True)
+            raise
+        
+        usage = response.usage
+        self.telemetry.record_call(
+            method,
+            response.model or self.model,
+            time.perf_counter() - started,
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0,
+            retries=attempts - 1
+        )
+        return response
+    
+    async def _stream_completion(self, method: str, **kwargs) -> AsyncIterator[str]:
+        """Stream a chat completion as text deltas, holding a concurrency slot until it ends
+
+        Opening the stream is retried like any other call; errors after the
+        first token are not. Each attempt waits for a free concurrency slot,
+        released while backing off between retries and kept by the attempt
+        that opens the stream. Streams report no usage, so the call is
+        recorded under `method` with locally counted tokens.
+        """
+        attempts = 0
+        holding_slot = False
+        
+        async def open_stream():
+            nonlocal attempts, holding_slot
+            attempts += 1
+            await self._semaphore.acquire()
+            try:
+                stream = await self.client.chat.completions.create(
+                    model=self.model,
+                    timeout=self.timeout,
+                    stream=True,
+                    **kwargs
+                )
+            except BaseException:
+                self._semaphore.release()
+                raise
+            holding_slot = True
+            return stream
+        
+        started = time.perf_counter()
+        first_token_at = None
+        parts = []
+        error = False
+        try:
+            stream = await self.caller.call(
+                open_stream,
+                estimated_tokens=self._estimate_tokens(kwargs["messages"])
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        except Exception:
+            error = True
+            raise
+        finally:
+            if holding_slot:
+                self._semaphore.release()
+            counter = self.history_manager.counter
+            self.telemetry.record_call(
+                method,
+                self.model,
+                time.perf_counter() - started,
+                prompt_tokens=counter.count(kwargs["messages"]),
+                completion_tokens=counter.count_text("".join(parts)) if parts else 0,
+                retries=max(attempts - 1, 0),
+                error=error,
+                time_to_first_token=first_token_at - started if first_token_at is not None else None,
+                estimated=True
+            )
+    
+    def _estimate_tokens(self, messages: List[Dict[str, str]]) -> int:
+        """Estimate the tokens a completion will use, for the tokens-per-minute budget"""
+        return self.history_manager.counter.count(messages) + EXPECTED_COMPLETION_TOKENS
     
     async def process_query(self, query: str, context: Optional[Dict[str, Any]] = None) -> AssistantResponse:
         """Process a user query and return a response"""
-        messages = [
-            {"role": "system", "content": self._get_system_prompt(context)},
-            {"role": "user", "content": query}
-        ]
+        messages = self._query_messages(query, context)
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            if self.single_pass_extraction and context and context.get("extract_params", False):
+                return await self._process_query_single_pass(messages)
+            
+            response = await self._create_completion(
+                "process_query",
                 messages=messages,
                 temperature=0.7,
             )
@@ -43,32 +252,7 @@ class OpenAIService:
             interpretations = None
             
             if context and context.get("extract_params", False):
-                # Additional call to extract structured parameters
-                extraction_messages = messages + [
-                    {"role": "assistant", "content": assistant_message},
-                    {"role": "user", "content": "Based on our conversation, extract the material properties and parameters that should be used for MatterGen. Return as JSON with 'mattergen_params' and 'interpretations' fields."}
-                ]
-                
-                extraction_response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=extraction_messages,
-                    temperature=0.2,
-                    response_format={"type": "json_object"}
-                )
-                
-                try:
-                    extracted_content = json.loads(extraction_response.choices[0].message.content)
-                    mattergen_params = extracted_content.get("mattergen_params")
-                    
-                    # Convert interpretations to PropertyInterpretation objects
-                    if "interpretations" in extracted_content:
-                        interpretations = [
-                            PropertyInterpretation(**interp) 
-                            for interp in extracted_content.get("interpretations", [])
-                        ]
-                except json.JSONDecodeError:
-                    # If parsing fails, just continue without the structured data
-                    pass
+                mattergen_params, interpretations = await self._extract_params(messages, assistant_message)
             
             return AssistantResponse(
                 text=assistant_message,
@@ -76,10 +260,145 @@ class OpenAIService:
                 mattergen_params=mattergen_params
             )
         
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
             # Handle errors (log them, etc.)
             raise Exception(f"Error calling OpenAI API: {str(e)}")
     
+    async def stream_query(
+        self,
+        query: str,
+        context: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Tuple[str, Union[str, AssistantResponse]]]:
+        """Stream a response to a user query
+
+        Yields ("token", text) as tokens arrive, then one ("final", AssistantResponse)
+        carrying the full text and, if requested, the extracted parameters.
+        """
+        messages = self._query_messages(query, context)
+        
+        try:
+            parts = []
+            async for token in self._stream_completion("stream_query", messages=messages, temperature=0.7):
+                parts.append(token)
+                yield "token", token
+            
+            assistant_message = "".join(parts)
+            
+            mattergen_params = None
+            interpretations = None
+            
+            if context and context.get("extract_params", False):
+                mattergen_params, interpretations = await self._extract_params(messages, assistant_message)
+            
+            yield "final", AssistantResponse(
+                text=assistant_message,
+                interpretations=interpretations,
+                mattergen_params=mattergen_params
+            )
+        
+        except UpstreamUnavailableError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error calling OpenAI API: {str(e)}")
+    
+    async def _process_query_single_pass(self, messages: List[Dict[str, str]]) -> AssistantResponse:
+        """Answer a query and extract its MatterGen parameters with one completion
+
+        Falls back to a separate extraction call when the structured fields
+        don't validate, and to the plain two-call path when the response
+        isn't a JSON object with a text answer. Fallbacks are counted in the
+        telemetry by reason.
+        """
+        structured_messages = [
+            {"role": "system", "content": messages[0]["content"] + SINGLE_PASS_EXTRACTION_PROMPT}
+        ] + messages[1:]
+        
+        response = await self._create_completion(
+            "process_query",
+            messages=structured_messages,
+            temperature=0.7,
+            response_format={"type": "json_object"}
+        )
+        
+        try:
+            content = json.loads(response.choices[0].message.content)
+        except (TypeError, json.JSONDecodeError):
+            content = None
+        
+        if not isinstance(content, dict) or not isinstance(content.get("text"), str) or not content["text"].strip():
+            self.telemetry.record_fallback("process_query", "unusable_answer")
+            response = await self._create_completion("process_query", messages=messages, temperature=0.7)
+            assistant_message = response.choices[0].message.content
+            mattergen_params, interpretations = await self._extract_params(messages, assistant_message)
+            return AssistantResponse(
+                text=assistant_message,
+                interpretations=interpretations,
+                mattergen_params=mattergen_params
+            )
+        
+        try:
+            return AssistantResponse(
+                text=content["text"],
+                interpretations=content.get("interpretations"),
+                mattergen_params=content.get("mattergen_params")
+            )
+        except ValidationError:
+            # Keep the answer, extract the parameters separately
+            self.telemetry.record_fallback("process_query", "invalid_fields")
+            mattergen_params, interpretations = await self._extract_params(messages, content["text"])
+            return AssistantResponse(
+                text=content["text"],
+                interpretations=interpretations,
+                mattergen_params=mattergen_params
+            )
+    
+    def _query_messages(self, query: str, context: Optional[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """Build the messages for a user query"""
+        return [
+            {"role": "system", "content": self._get_system_prompt(context)},
+            {"role": "user", "content": query}
+        ]
+    
+    async def _extract_params(
+        self,
+        messages: List[Dict[str, str]],
+        assistant_message: str
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[List[PropertyInterpretation]]]:
+        """Extract MatterGen parameters and interpretations from an answered query"""
+        mattergen_params = None
+        interpretations = None
+        
+        # Additional call to extract structured parameters
+        extraction_messages = messages + [
+            {"role": "assistant", "content": assistant_message},
+            {"role": "user", "content": "Based on our conversation, extract the material properties and parameters that should be used for MatterGen. Return as JSON with 'mattergen_params' and 'interpretations' fields."}
+        ]
+        
+        extraction_response = await self._create_completion(
+            "extract_params",
+            messages=extraction_messages,
+            temperature=0.2,
+            response_format={"type": "json_object"}
+        )
+        
+        try:
+            extracted_content = json.loads(extraction_response.choices[0].message.content)
+            mattergen_params = extracted_content.get("mattergen_params")
+            
+            # Convert interpretations to PropertyInterpretation objects
+            if "interpretations" in extracted_content:
+                interpretations = [
+                    PropertyInterpretation(**interp) 
+                    for interp in extracted_content.get("interpretations", [])
+                ]
+        except json.JSONDecodeError:
+            # If parsing fails, just continue without the structured data
+            pass
+        
+        return mattergen_params, interpretations
+    
     async def interpret_chat_for_mattergen(
         self, 
         chat_history: ChatHistory,
@@ -88,6 +407,12 @@ class OpenAIService:
     ) -> ChatToMatterGenResponse:
         """Interpret chat history and convert to MatterGen parameters"""
         
+        resolved, local, cache_entry = self._interpret_locally(
+            "interpret_chat_for_mattergen", chat_history, current_goal, current_property
+        )
+        if resolved is not None:
+            return resolved
+        
         # Prepare the prompt
         system_prompt = f"""
         You are an expert in materials science and computational materials design.
@@ -106,15 +431,201 @@ class OpenAIService:
         - suggested_mattergen_params: key-value map of parameters for MatterGen
         - explanation: brief explanation of your reasoning
         """
+        system_prompt += self._resolved_prompt(local.interpretations if local else [])
+        
+        try:
+            result = await self._interpretation_completion("interpret_chat_for_mattergen", system_prompt, chat_history)
+            interpretation = self._interpretation_response(result, local)
+            
+            if cache_entry is not None:
+                self.semantic_cache.add(*cache_entry, interpretation.json())
+            
+            return interpretation
+            
+        except UpstreamUnavailableError:
+            raise
+        except Exception as e:
+            # Handle errors
+            raise Exception(f"Error interpreting chat for MatterGen: {str(e)}")
+    
+    async def interpret_properties(
+        self,
+        chat_history: ChatHistory,
+        current_goal: str,
+        properties: List[str]
+    ) -> Dict[str, Union[ChatToMatterGenResponse, Exception]]:
+        """Interpret one chat history for several properties with a single completion
+        
+        Properties resolved locally are left out of the call. Returns a result
+        or an error per property.
+        """
+        results: Dict[str, Union[ChatToMatterGenResponse, Exception]] = {}
+        pending: Dict[str, Tuple[Optional[LexiconResult], Optional[Tuple[Tuple[str, ...], np.ndarray]]]] = {}
+        for prop in properties:
+            resolved, local, cache_entry = self._interpret_locally("interpret_properties", chat_history, current_goal, prop)
+            if resolved is not None:
+                results[prop] = resolved
+            else:
+                pending[prop] = (local, cache_entry)
+        
+        if not pending:
+            return results
+        
+        property_list = ", ".join(f"'{prop}'" for prop in pending)
+        system_prompt = f"""
+        You are an expert in materials science and computational materials design.
+        Your task is to interpret a conversation about designing a {current_goal} 
+        and extract meaningful material property parameters for the MatterGen AI system.
+        
+        The conversation covers these properties: {property_list}.
+        
+        For each property, extract:
+        1. Specific numerical values for material properties mentioned
+        2. Translate layman descriptions like "hard as diamond" to technical parameters
+        3. Provide confidence scores for your interpretations
+        
+        Format your response as JSON with a "properties" object keyed by the property names above,
+        each value having:
+        - interpretations: array of property interpretations
+        - suggested_mattergen_params: key-value map of parameters for MatterGen
+        - explanation: brief explanation of your reasoning
+        """
+        system_prompt += self._resolved_prompt([
+            interp for local, _ in pending.values() if local is not None for interp in local.interpretations
+        ])
+        
+        try:
+            result = await self._interpretation_completion("interpret_properties", system_prompt, chat_history)
+            by_property = result.get("properties", {})
+        except UpstreamUnavailableError as e:
+            return {**results, **{prop: e for prop in pending}}
+        except Exception as e:
+            error = Exception(f"Error interpreting chat for MatterGen: {str(e)}")
+            return {**results, **{prop: error for prop in pending}}
+        
+        for prop, (local, cache_entry) in pending.items():
+            try:
+                if prop not in by_property:
+                    raise ValueError(f"No interpretation returned for '{prop}'")
+                interpretation = self._interpretation_response(by_property[prop], local)
+                if cache_entry is not None:
+                    self.semantic_cache.add(*cache_entry, interpretation.json())
+                results[prop] = interpretation
+            except Exception as e:
+                results[prop] = Exception(f"Error interpreting chat for MatterGen: {str(e)}")
+        
+        return results
+    
+    async def interpret_batch(
+        self,
+        requests: List[ChatToMatterGenRequest],
+        merge: bool = False,
+        max_concurrency: int = 4
+    ) -> List[Union[ChatToMatterGenResponse, Exception]]:
+        """Interpret several requests concurrently, at most `max_concurrency` completions at a time
+        
+        With `merge`, requests sharing a chat history and goal are answered by
+        one completion. Returns a result or an error per request, in order.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        results: List[Union[ChatToMatterGenResponse, Exception]] = [None] * len(requests)
+        
+        # Requests answered together: one completion per group
+        groups: Dict[Any, List[int]] = {}
+        for index, request in enumerate(requests):
+            key = (request.chat_history.json(), request.current_goal) if merge else index
+            groups.setdefault(key, []).append(index)
+        
+        async def run(indexes: List[int]):
+            first = requests[indexes[0]]
+            async with semaphore:
+                if len(indexes) == 1:
+                    try:
+                        results[indexes[0]] = await self.interpret_chat_for_mattergen(
+                            first.chat_history, first.current_goal, first.current_property
+                        )
+                    except Exception as e:
+                        results[indexes[0]] = e
+                    return
+                
+                by_property = await self.interpret_properties(
+                    first.chat_history,
+                    first.current_goal,
+                    list(dict.fromkeys(requests[index].current_property for index in indexes))
+                )
+                for index in indexes:
+                    results[index] = by_property[requests[index].current_property]
+        
+        await asyncio.gather(*(run(indexes) for indexes in groups.values()))
+        return results
+    
+    def _interpret_locally(
+        self,
+        method: str,
+        chat_history: ChatHistory,
+        current_goal: str,
+        current_property: str
+    ) -> Tuple[Optional[ChatToMatterGenResponse], Optional[LexiconResult], Optional[Tuple[Tuple[str, ...], np.ndarray]]]:
+        """Try the lexicon, then the semantic cache
+        
+        Returns the response if either resolved the request, plus the lexicon's
+        partial result and the cache key and vector for storing the LLM's answer.
+        """
+        user_texts = [message.content for message in chat_history.messages if message.role == MessageRole.USER]
+        
+        # Fixed-vocabulary descriptions ("hard as diamond") are translated without the LLM
+        local = None
+        if self.property_lexicon is not None:
+            local = self.property_lexicon.analyze(user_texts, current_property)
+            self.telemetry.record_lexicon(method, local.outcome)
+            if local.complete:
+                return ChatToMatterGenResponse(
+                    interpretations=local.interpretations,
+                    suggested_mattergen_params=local.params(),
+                    explanation="Translated from reference material values: " + "; ".join(
+                        interp.explanation for interp in local.interpretations
+                    )
+                ), local, None
+        
+        # A similar conversation about the same goal and property may already be interpreted
+        cache_entry = None
+        if self.semantic_cache is not None:
+            user_text = " ".join(user_texts)[-SEMANTIC_CACHE_TEXT_CHARS:]
+            cache_entry = (
+                self._semantic_cache_key(current_goal, current_property, user_text),
+                self.semantic_cache.embed(user_text)
+            )
+            cached = self.semantic_cache.lookup(*cache_entry)
+            if cached is not None:
+                self.telemetry.record_cache(method, hit=True)
+                return ChatToMatterGenResponse.parse_raw(cached), local, cache_entry
         
+        self.telemetry.record_cache(method, hit=False)
+        return None, local, cache_entry
+    
+    @staticmethod
+    def _semantic_cache_key(current_goal: str, current_property: str, user_text: str) -> Tuple[str, ...]:
+        """Exact part of a semantic cache lookup: goal, property and every quantity mentioned"""
+        return (current_goal.strip().lower(), current_property.strip().lower()) + quantities(user_text)
+    
+    @staticmethod
+    def _resolved_prompt(interpretations: List[PropertyInterpretation]) -> str:
+        """Tell the model which parameters the lexicon already resolved"""
+        if not interpretations:
+            return ""
+        return "\n        These parameters are already resolved; include them unchanged and focus on the rest:\n" + "\n".join(
+            f"        - {interp.property_name}: {interp.technical_value} {interp.unit}" for interp in interpretations
+        )
+    
+    async def _interpretation_completion(self, method: str, system_prompt: str, chat_history: ChatHistory) -> Dict[str, Any]:
+        """Ask the model to extract parameters from a conversation and parse its JSON answer"""
         # Convert chat history to format expected by OpenAI
         messages = [
             {"role": "system", "content": system_prompt}
         ]
         
-        # Add chat history messages
-        for msg in chat_history.messages:
-            messages.append({"role": msg.role, "content": msg.content})
+        # Add chat history messages, compacted to the token budget
+        messages.extend(await self._history_messages(chat_history))
         
         # Add final instruction
         messages.append({
@@ -122,47 +633,48 @@ class OpenAIService:
             "content": "Based on this conversation, extract the material property parameters that should be used for MatterGen."
         })
         
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.3,
-                response_format={"type": "json_object"}
-            )
-            
-            response_content = response.choices[0].message.content
-            
-            # Parse JSON response
-            result = json.loads(response_content)
-            
-            # Convert interpretations to PropertyInterpretation objects
-            interpretations = [
-                PropertyInterpretation(**interp) 
-                for interp in result.get("interpretations", [])
+        response = await self._create_completion(
+            method,
+            messages=messages,
+            temperature=0.3,
+            response_format={"type": "json_object"}
+        )
+        
+        # Parse JSON response
+        return json.loads(response.choices[0].message.content)
+    
+    @staticmethod
+    def _interpretation_response(result: Dict[str, Any], local: Optional[LexiconResult]) -> ChatToMatterGenResponse:
+        """Build the response from the model's JSON, with locally resolved values taking precedence"""
+        # Convert interpretations to PropertyInterpretation objects
+        interpretations = [
+            PropertyInterpretation(**interp) 
+            for interp in result.get("interpretations", [])
+        ]
+        mattergen_params = result.get("suggested_mattergen_params", {})
+        
+        if local is not None and local.interpretations:
+            resolved = {interp.property_name for interp in local.interpretations}
+            interpretations = local.interpretations + [
+                interp for interp in interpretations if interp.property_name not in resolved
             ]
-            
-            return ChatToMatterGenResponse(
-                interpretations=interpretations,
-                suggested_mattergen_params=result.get("suggested_mattergen_params", {}),
-                explanation=result.get("explanation", "")
-            )
-            
-        except Exception as e:
-            # Handle errors
-            raise Exception(f"Error interpreting chat for MatterGen: {str(e)}")
+            mattergen_params = {**mattergen_params, **local.params()}
+        
+        return ChatToMatterGenResponse(
+            interpretations=interpretations,
+            suggested_mattergen_params=mattergen_params,
+            explanation=result.get("explanation", "")
+        )
     
     async def continue_conversation(self, history: ChatHistory) -> List[ChatMessage]:
         """Continue a conversation based on chat history"""
         
-        # Convert chat history to format expected by OpenAI
-        messages = []
-        
-        for msg in history.messages:
-            messages.append({"role": msg.role, "content": msg.content})
-        
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            # Convert chat history to format expected by OpenAI, compacted to the token budget
+            messages = await self._history_messages(history)
+            
+            response = await self._create_completion(
+                "continue_conversation",
                 messages=messages,
                 temperature=0.7,
             )
@@ -174,12 +686,96 @@ class OpenAIService:
             
             return [new_message]
             
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
             # Handle errors
             raise Exception(f"Error continuing conversation: {str(e)}")
     
+    async def stream_conversation(self, history: ChatHistory) -> AsyncIterator[Tuple[str, Union[str, ChatMessage]]]:
+        """Stream the continuation of a conversation
+
+        Yields ("token", text) as tokens arrive, then one ("final", ChatMessage).
+        """
+        try:
+            messages = await self._history_messages(history)
+            
+            parts = []
+            async for token in self._stream_completion("stream_conversation", messages=messages, temperature=0.7):
+                parts.append(token)
+                yield "token", token
+            
+            yield "final", ChatMessage(role="assistant", content="".join(parts))
+        
+        except UpstreamUnavailableError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error continuing conversation: {str(e)}")
+    
+    async def _history_messages(self, history: ChatHistory) -> List[Dict[str, str]]:
+        """Convert a chat history to OpenAI messages, summarizing old turns if it is over budget"""
+        messages = [{"role": msg.role, "content": msg.content} for msg in history.messages]
+        return await self.history_manager.compact(
+            messages,
+            conversation_id=history.metadata.get("conversation_id")
+        )
+    
+    async def _summarize_history(self, summary: Optional[str], messages: List[Dict[str, str]]) -> str:
+        """Fold older chat messages into the running summary of a conversation"""
+        transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+        
+        response = await self._create_completion(
+            "summarize_history",
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You maintain a running summary of a conversation about designing a material. "
+                               "Update the summary with the new messages. Keep every material, property value, "
+                               "unit, constraint and decision; drop pleasantries. Reply with the summary only."
+                },
+                {
+                    "role": "user",
+                    "content": f"Current summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"
+                }
+            ],
+            temperature=0.2,
+        )
+        
+        return response.choices[0].message.content
+    
     async def get_property_guidance(self, property_name: str, user_level: str = "beginner") -> AssistantResponse:
-        """Get guidance for explaining a specific material property"""
+        """Get guidance for explaining a specific material property
+
+        Responses are cached per model, property and level; identical
+        requests in flight at the same time share one upstream call. Unknown
+        levels are treated as "beginner".
+        """
+        user_level = normalize_user_level(user_level)
+        key = self._guidance_cache_key(property_name, user_level)
+        loaded = False
+        
+        async def load() -> str:
+            nonlocal loaded
+            loaded = True
+            return await self._fetch_property_guidance(property_name, user_level)
+        
+        cached = await self.response_cache.get_or_load(key, load)
+        self.telemetry.record_cache("get_property_guidance", hit=not loaded)
+        return AssistantResponse.parse_raw(cached)
+    
+    def invalidate_property_guidance(self, property_name: Optional[str] = None) -> int:
+        """Drop cached guidance for one property, or for all properties"""
+        prefix = "guidance:"
+        if property_name is not None:
+            prefix = self._guidance_cache_key(property_name, "")
+        return self.response_cache.invalidate(prefix)
+    
+    def _guidance_cache_key(self, property_name: str, user_level: str) -> str:
+        """Cache key for property guidance, ignoring case and surrounding whitespace"""
+        return f"guidance:{self.model}:{property_name.strip().lower()}:{user_level.strip().lower()}"
+    
+    async def _fetch_property_guidance(self, property_name: str, user_level: str) -> str:
+        """Ask the model for property guidance and return the response as JSON"""
         
         # Prepare the prompt
         system_prompt = f"""
@@ -199,16 +795,18 @@ class OpenAIService:
         ]
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = await self._create_completion(
+                "get_property_guidance",
                 messages=messages,
                 temperature=0.5,
             )
             
             assistant_message = response.choices[0].message.content
             
-            return AssistantResponse(text=assistant_message)
+            return AssistantResponse(text=assistant_message).json()
             
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
             # Handle errors
             raise Exception(f"Error getting property guidance: {str(e)}")
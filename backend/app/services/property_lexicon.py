@@ -0,0 +1,317 @@
+import re
+import threading
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.chat import PropertyInterpretation
+
+
+# Outcome of the lexicon for the current request: "local", "partial" or "none"
+last_lexicon_outcome: ContextVar[Optional[str]] = ContextVar("last_lexicon_outcome", default=None)
+
+PROPERTY_UNITS = {
+    "hardness": "GPa",
+    "bulk_modulus": "GPa",
+    "shear_modulus": "GPa",
+    "density": "g/cm³",
+    "band_gap": "eV",
+    "thermal_stability": "°C"
+}
+
+# Room-temperature reference values: Vickers hardness, moduli, density, band gap
+# and melting point (as a proxy for thermal stability)
+REFERENCE_MATERIALS: Dict[str, Dict[str, float]] = {
+    "diamond": {"hardness": 100.0, "bulk_modulus": 443.0, "shear_modulus": 535.0, "density": 3.51, "band_gap": 5.47},
+    "steel": {"hardness": 2.0, "bulk_modulus": 160.0, "shear_modulus": 79.0, "density": 7.85, "band_gap": 0.0, "thermal_stability": 1370.0},
+    "iron": {"hardness": 0.6, "bulk_modulus": 170.0, "shear_modulus": 82.0, "density": 7.87, "band_gap": 0.0, "thermal_stability": 1538.0},
+    "aluminum": {"hardness": 0.17, "bulk_modulus": 76.0, "shear_modulus": 26.0, "density": 2.70, "band_gap": 0.0, "thermal_stability": 660.0},
+    "copper": {"hardness": 0.37, "bulk_modulus": 140.0, "shear_modulus": 48.0, "density": 8.96, "band_gap": 0.0, "thermal_stability": 1085.0},
+    "titanium": {"hardness": 0.97, "bulk_modulus": 110.0, "shear_modulus": 44.0, "density": 4.51, "band_gap": 0.0, "thermal_stability": 1668.0},
+    "gold": {"hardness": 0.22, "bulk_modulus": 180.0, "shear_modulus": 27.0, "density": 19.3, "band_gap": 0.0, "thermal_stability": 1064.0},
+    "silver": {"hardness": 0.25, "bulk_modulus": 100.0, "shear_modulus": 30.0, "density": 10.49, "band_gap": 0.0, "thermal_stability": 962.0},
+    "lead": {"hardness": 0.05, "bulk_modulus": 46.0, "shear_modulus": 5.6, "density": 11.34, "band_gap": 0.0, "thermal_stability": 327.0},
+    "tungsten": {"hardness": 3.4, "bulk_modulus": 310.0, "shear_modulus": 161.0, "density": 19.25, "band_gap": 0.0, "thermal_stability": 3422.0},
+    "silicon": {"hardness": 11.0, "bulk_modulus": 98.0, "shear_modulus": 51.0, "density": 2.33, "band_gap": 1.12, "thermal_stability": 1414.0},
+    "gallium arsenide": {"hardness": 7.0, "bulk_modulus": 75.0, "shear_modulus": 33.0, "density": 5.32, "band_gap": 1.42, "thermal_stability": 1238.0},
+    "quartz": {"hardness": 12.0, "bulk_modulus": 37.0, "shear_modulus": 44.0, "density": 2.65, "band_gap": 9.0, "thermal_stability": 1670.0},
+    "sapphire": {"hardness": 15.0, "bulk_modulus": 250.0, "shear_modulus": 160.0, "density": 3.98, "band_gap": 8.8, "thermal_stability": 2072.0},
+    "glass": {"hardness": 5.5, "bulk_modulus": 37.0, "shear_modulus": 31.0, "density": 2.5, "band_gap": 9.0},
+    "concrete": {"bulk_modulus": 17.0, "shear_modulus": 12.5, "density": 2.4},
+    "rubber": {"bulk_modulus": 2.0, "shear_modulus": 0.0006, "density": 1.1},
+    "wood": {"density": 0.6},
+    "plastic": {"density": 1.0}
+}
+
+REFERENCE_ALIASES = {
+    "aluminium": "aluminum",
+    "stainless steel": "steel",
+    "gaas": "gallium arsenide",
+    "alumina": "sapphire",
+    "ceramic": "sapphire",
+    "ceramics": "sapphire",
+    "silica": "quartz",
+    "diamonds": "diamond"
+}
+
+# Property cues: pattern -> (candidate properties, direction of the cue: +1 more, -1 less, 0 neutral)
+PROPERTY_CUES: List[Tuple[str, Tuple[str, ...], int]] = [
+    (r"band ?gap", ("band_gap",), 0),
+    (r"conduct\w*|metallic", ("band_gap",), -1),
+    (r"insulat\w*", ("band_gap",), 1),
+    (r"heat[- ]resistant|withstand\w* (?:high )?(?:heat|temperatures?)|thermal(?:ly)? stab\w*|melt\w*", ("thermal_stability",), 1),
+    (r"densit(?:y|ies)", ("density",), 0),
+    (r"heav(?:y|ier|iest)|dens(?:e|er|est)", ("density",), 1),
+    (r"light(?:er|est)|light[- ]?weight|light(?= (?:as|like)\b)", ("density",), -1),
+    (r"stiff(?:ness|er|est)?|rigid(?:ity)?|incompressible", ("bulk_modulus", "shear_modulus"), 1),
+    (r"compress\w*|squash\w*", ("bulk_modulus",), 0),
+    (r"bend\w*|twist\w*|shear", ("shear_modulus",), 0),
+    (r"hard(?:ness|er|est)?", ("hardness", "bulk_modulus", "shear_modulus"), 1),
+    (r"soft(?:er|est)?", ("hardness", "bulk_modulus", "shear_modulus"), -1),
+    (r"strong(?:er|est)?|strength|tough(?:er|est|ness)?|durable", ("bulk_modulus", "shear_modulus", "hardness"), 1)
+]
+
+# Typical values for qualitative requests ("very hard", "lightweight") without a reference
+QUALITATIVE_VALUES = {
+    "hardness": {1: 30.0, -1: 1.0},
+    "bulk_modulus": {1: 200.0, -1: 30.0},
+    "shear_modulus": {1: 150.0, -1: 20.0},
+    "density": {1: 8.0, -1: 2.0},
+    "band_gap": {1: 4.0, -1: 0.0},
+    "thermal_stability": {1: 800.0, -1: 200.0}
+}
+
+# Units of explicit values -> (property, factor to the canonical unit, offset)
+UNIT_PATTERNS: List[Tuple[str, Optional[str], float, float]] = [
+    (r"ev", "band_gap", 1.0, 0.0),
+    (r"gpa", None, 1.0, 0.0),
+    (r"mpa", None, 0.001, 0.0),
+    (r"g ?/ ?(?:cm3|cm³|cc)", "density", 1.0, 0.0),
+    (r"kg ?/ ?(?:m3|m³)", "density", 0.001, 0.0),
+    (r"°c|degrees? c(?:elsius)?|c\b", "thermal_stability", 1.0, 0.0),
+    (r"k(?:elvin)?\b", "thermal_stability", 1.0, -273.15)
+]
+
+# How much a comparative ("harder than steel") moves away from the reference
+COMPARATIVE_FACTOR = 1.25
+
+CONFIDENCE_EXPLICIT = 0.95
+CONFIDENCE_REFERENCE = 0.9
+CONFIDENCE_IMPLIED_REFERENCE = 0.85
+CONFIDENCE_COMPARATIVE = 0.8
+CONFIDENCE_QUALITATIVE = 0.6
+
+# Sentence and clause boundaries; a period between digits is a decimal point
+_CLAUSE_SPLIT = re.compile(r"(?:(?<!\d)\.|\.(?!\d)|[;!?\n])+|,|\b(?:and|but|while|although)\b")
+# "between X and Y": the "and" joins a range instead of separating clauses
+_BETWEEN_AND = re.compile(r"(\bbetween\b[^,;!?\n]*?)\band\b")
+_RANGE = re.compile(r"\bbetween\b")
+_NEGATION = re.compile(r"\b(?:not|no|never|without|nothing|neither|nor)\b|n't\b")
+_LESS = re.compile(r"\bless\b")
+_THAN = re.compile(r"\bthan\b")
+# A number followed by something unit-shaped: a ratio ("5 w/mk"), percent, degrees or a common unit symbol.
+# Bare numbers ("2 samples", "in 2024") are not property values.
+_UNIT_LIKE = re.compile(
+    r"(?<![\w.])-?\d+(?:\.\d+)?\s*"
+    r"(?:%|°|[a-zµ]+ ?/ ?[a-z0-9³²·]+|(?:[kmgtµn]?(?:pa|w|j|v|hz|ohm|ω)|mah|wh|ppm|[nµmc]m)\b)"
+)
+
+
+def _alternation(names) -> str:
+    """Regex alternation of names, longest first so multi-word names win"""
+    return "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+
+
+_REFERENCE = re.compile(
+    r"\b(" + _alternation(list(REFERENCE_MATERIALS) + list(REFERENCE_ALIASES)) + r")\b"
+)
+_CUES = [(re.compile(r"\b(?:" + pattern + r")\b"), properties, direction) for pattern, properties, direction in PROPERTY_CUES]
+_UNITS = [
+    (re.compile(r"(-?\d+(?:\.\d+)?)\s*(?:" + pattern + r")"), prop, factor, offset)
+    for pattern, prop, factor, offset in UNIT_PATTERNS
+]
+
+
+@dataclass
+class LexiconResult:
+    """Interpretations the lexicon resolved, and the clauses it could not"""
+    interpretations: List[PropertyInterpretation] = field(default_factory=list)
+    unresolved: List[str] = field(default_factory=list)
+    # The property the request is about
+    current_property: Optional[str] = None
+
+    @property
+    def complete(self) -> bool:
+        """Whether the request was resolved locally: the current property resolved and nothing left over"""
+        return not self.unresolved and any(
+            interp.property_name == self.current_property for interp in self.interpretations
+        )
+
+    @property
+    def outcome(self) -> str:
+        """How the request was handled: local if complete, partial if anything was resolved, else none"""
+        if self.complete:
+            return "local"
+        return "partial" if self.interpretations else "none"
+
+    def params(self) -> Dict[str, Any]:
+        """MatterGen parameters from the resolved interpretations"""
+        return {interp.property_name: interp.technical_value for interp in self.interpretations}
+
+
+class PropertyLexicon:
+    """Translates layman property descriptions to technical values without an LLM
+
+    Each user clause is matched against compiled patterns for explicit values
+    with units, property cues ("hard", "lightweight", "conductive"),
+    comparatives ("lighter than") and reference materials ("diamond").
+    Matches at or above ``min_confidence`` are resolved; negated, ambiguous,
+    range or low-confidence clauses are left for the LLM.
+    """
+
+    def __init__(self, min_confidence: float = 0.8):
+        """Initialize the lexicon"""
+        self.min_confidence = min_confidence
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.local = 0
+        self.partial = 0
+
+    def analyze(self, texts: List[str], current_property: str) -> LexiconResult:
+        """Resolve the property mentions in a conversation's user messages
+
+        Later mentions of a property override earlier ones. The result is only
+        complete if `current_property` itself was resolved; other properties
+        resolved along the way are context for the LLM.
+        """
+        current = re.sub(r"[\s-]+", "_", current_property.strip().lower())
+        resolved: Dict[str, PropertyInterpretation] = {}
+        unresolved: List[str] = []
+
+        for text in texts:
+            for clause in _CLAUSE_SPLIT.split(_BETWEEN_AND.sub(r"\1to", text.lower())):
+                clause = clause.strip()
+                if not clause:
+                    continue
+                interpretation, relevant = self._interpret_clause(clause, current)
+                if interpretation is not None and interpretation.confidence >= self.min_confidence:
+                    resolved.pop(interpretation.property_name, None)
+                    resolved[interpretation.property_name] = interpretation
+                elif relevant:
+                    unresolved.append(clause)
+
+        result = LexiconResult(interpretations=list(resolved.values()), unresolved=unresolved, current_property=current)
+        self._record(result)
+        return result
+
+    def _interpret_clause(self, clause: str, current: str) -> Tuple[Optional[PropertyInterpretation], bool]:
+        """Interpret one clause; returns the interpretation (if any) and whether the clause mentions a property"""
+        cues = [(match, properties, direction) for pattern, properties, direction in _CUES for match in pattern.finditer(clause)]
+        references = {REFERENCE_ALIASES.get(name, name) for name in _REFERENCE.findall(clause)}
+        explicit = [(match, prop, factor, offset) for pattern, prop, factor, offset in _UNITS for match in pattern.finditer(clause)]
+        relevant = bool(cues or references or explicit or _UNIT_LIKE.search(clause))
+
+        # Negations and ranges need more than a single value
+        if not relevant or _NEGATION.search(clause) or _RANGE.search(clause):
+            return None, relevant
+
+        # Several candidate properties for one clause: pick the one being discussed, else the first
+        cue_properties = {properties for _, properties, _ in cues}
+        if len(cue_properties) > 1 or len(references) > 1 or len(explicit) > 1:
+            return None, True
+        properties = next(iter(cue_properties)) if cue_properties else None
+        direction = next((d for _, _, d in cues if d != 0), 0)
+
+        if explicit:
+            match, prop, factor, offset = explicit[0]
+            prop = prop or self._pick(properties, current)
+            if prop is None:
+                return None, True
+            value = round(float(match.group(1)) * factor + offset, 4)
+            return self._interpretation(
+                prop, value, CONFIDENCE_EXPLICIT, clause,
+                f"Explicit value of {value} {PROPERTY_UNITS[prop]} for {prop.replace('_', ' ')}"
+            ), True
+
+        if references:
+            reference = next(iter(references))
+            values = REFERENCE_MATERIALS[reference]
+            candidates = tuple(p for p in (properties or (current,)) if p in values)
+            if not candidates:
+                return None, True
+            prop = self._pick(candidates, current)
+
+            value = values[prop]
+            if _THAN.search(clause):
+                if direction == 0 or value == 0:
+                    return None, True
+                if _LESS.search(clause):
+                    direction = -direction
+                value = round(value * COMPARATIVE_FACTOR ** direction, 4)
+                comparison = "above" if direction > 0 else "below"
+                return self._interpretation(
+                    prop, value, CONFIDENCE_COMPARATIVE, clause,
+                    f"Somewhat {comparison} the {prop.replace('_', ' ')} of {reference} ({values[prop]} {PROPERTY_UNITS[prop]})"
+                ), True
+
+            confidence = CONFIDENCE_REFERENCE if properties else CONFIDENCE_IMPLIED_REFERENCE
+            return self._interpretation(
+                prop, value, confidence, clause,
+                f"The {prop.replace('_', ' ')} of {reference} is about {value} {PROPERTY_UNITS[prop]}"
+            ), True
+
+        if properties and direction != 0:
+            prop = self._pick(properties, current)
+            if prop is None or _THAN.search(clause):
+                return None, True
+            if _LESS.search(clause):
+                direction = -direction
+            value = QUALITATIVE_VALUES[prop][direction]
+            level = "high" if direction > 0 else "low"
+            return self._interpretation(
+                prop, value, CONFIDENCE_QUALITATIVE, clause,
+                f"A typical {level} {prop.replace('_', ' ')} is about {value} {PROPERTY_UNITS[prop]}"
+            ), True
+
+        return None, True
+
+    @staticmethod
+    def _pick(candidates: Optional[Tuple[str, ...]], current: str) -> Optional[str]:
+        """Choose a property among candidates, preferring the one under discussion"""
+        if not candidates:
+            return current if current in PROPERTY_UNITS else None
+        return current if current in candidates else candidates[0]
+
+    @staticmethod
+    def _interpretation(prop: str, value: float, confidence: float, clause: str, explanation: str) -> PropertyInterpretation:
+        return PropertyInterpretation(
+            property_name=prop,
+            technical_value=value,
+            unit=PROPERTY_UNITS[prop],
+            confidence=confidence,
+            source_text=clause,
+            explanation=explanation
+        )
+
+    def _record(self, result: LexiconResult):
+        """Count the outcome of one request"""
+        outcome = result.outcome
+        with self._lock:
+            self.requests += 1
+            if outcome == "local":
+                self.local += 1
+            elif outcome == "partial":
+                self.partial += 1
+        last_lexicon_outcome.set(outcome)
+
+    def stats(self) -> Dict[str, Any]:
+        """Fraction of requests resolved without the LLM"""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "handled_locally": self.local,
+                "partially_handled": self.partial,
+                "fell_back": self.requests - self.local - self.partial,
+                "local_fraction": round(self.local / self.requests, 4) if self.requests else 0.0,
+                "min_confidence": self.min_confidence
+            }
@@ -0,0 +1,271 @@
+import os
+import time
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class _LoadAbandoned(Exception):
+    """Set on an in-flight load whose caller was cancelled, so a waiter takes over"""
+    pass
+
+
+class ResponseCache:
+    """LRU cache of string responses with a TTL, backed by SQLite
+
+    The most recently used entries are kept in memory; every entry is also
+    written to disk so the cache survives restarts. The disk table holds at
+    most ``max_disk_entries`` rows, dropping those closest to expiry first.
+    Concurrent loads of the same key are coalesced into a single call of the
+    loader. ``get_or_load`` reads and writes the disk in worker threads, so
+    SQLite never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        max_entries: int = 1024,
+        ttl_seconds: float = 86400.0,
+        max_disk_entries: int = 100000
+    ):
+        """Initialize the cache, warming memory from disk if a database path is given"""
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        # Rows written since the disk table was last trimmed
+        self._disk_writes = 0
+
+        # key -> (expires_at, value), least recently used first
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Guards the memory tier and counters; the disk has its own lock so slow
+        # queries in worker threads don't hold up memory lookups on the event loop
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+        self._conn = None
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            with self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS response_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS response_cache_expires_at ON response_cache (expires_at)"
+                )
+            self._warm()
+
+    def _warm(self):
+        """Drop expired rows and load the freshest ones into memory"""
+        now = time.time()
+        with self._db_lock, self._conn:
+            self._trim(now)
+            rows = self._conn.execute(
+                "SELECT key, value, expires_at FROM response_cache ORDER BY expires_at DESC LIMIT ?",
+                (self.max_entries,)
+            ).fetchall()
+        with self._lock:
+            for key, value, expires_at in reversed(rows):
+                self._entries[key] = (expires_at, value)
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached value, or None if it is missing or expired"""
+        value = self._lookup_memory(key)
+        if value is None:
+            value = self._lookup_disk(key)
+        if value is None:
+            self.misses += 1
+        return value
+
+    def _lookup_memory(self, key: str) -> Optional[str]:
+        """Look a key up in memory, counting hits only"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+            return None
+
+    def _lookup_disk(self, key: str) -> Optional[str]:
+        """Look up a key evicted from memory on disk, counting hits only"""
+        now = time.time()
+        with self._db_lock:
+            if self._conn is None:
+                return None
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ? AND expires_at > ?",
+                (key, now)
+            ).fetchone()
+        if row is None:
+            return None
+
+        with self._lock:
+            self._remember(key, row[1], row[0])
+            self.hits += 1
+            self.disk_hits += 1
+        return row[0]
+
+    def set(self, key: str, value: str):
+        """Cache a value for the configured TTL"""
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, value)
+        self._write(key, value, expires_at)
+
+    def _write(self, key: str, value: str, expires_at: float):
+        """Write an entry to disk, if there is one"""
+        with self._db_lock:
+            if self._conn is None:
+                return
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, expires_at)
+                )
+                self._disk_writes += 1
+                # Trimming costs a count, so only do it every so often; the cap may be
+                # exceeded by that many rows in between
+                if self._disk_writes >= max(self.max_disk_entries // 10, 1):
+                    self._trim(time.time())
+
+    def _trim(self, now: float):
+        """Drop expired rows, then the rows closest to expiry beyond the cap (caller holds the disk lock)"""
+        self._disk_writes = 0
+        self._conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+        count = self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+        if count > self.max_disk_entries:
+            self._conn.execute(
+                "DELETE FROM response_cache WHERE key IN "
+                "(SELECT key FROM response_cache ORDER BY expires_at ASC LIMIT ?)",
+                (count - self.max_disk_entries,)
+            )
+
+    def _remember(self, key: str, expires_at: float, value: str):
+        """Put an entry in memory, evicting the least recently used (caller holds the lock)"""
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[str]]) -> str:
+        """Get a cached value, calling the loader once on a miss
+
+        Callers arriving while a load for the same key is in flight wait for
+        that load instead of starting their own; the load counts as a miss and
+        the waiters as coalesced, not as hits. If the caller running the load
+        is cancelled, one of the waiters starts the load again rather than all
+        of them failing.
+        """
+        while True:
+            value = self._lookup_memory(key)
+            if value is not None:
+                return value
+
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                try:
+                    return await asyncio.shield(future)
+                except _LoadAbandoned:
+                    continue
+
+            if self._conn is None:
+                break
+            value = await asyncio.to_thread(self._lookup_disk, key)
+            if value is not None:
+                return value
+            # Another caller may have started the load while the disk was read
+            if key not in self._inflight:
+                break
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.set_exception(_LoadAbandoned())
+            # Mark the exception as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+        # Waiters get the value without waiting for the disk write
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, value)
+        future.set_result(value)
+        if self._conn is not None:
+            await asyncio.to_thread(self._write, key, value, expires_at)
+        return value
+
+    def invalidate(self, prefix: str = "") -> int:
+        """Remove every entry whose key starts with prefix; returns the number removed"""
+        with self._lock:
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            for key in keys:
+                del self._entries[key]
+            removed = len(keys)
+
+        with self._db_lock:
+            if self._conn is not None:
+                pattern = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                with self._conn:
+                    cursor = self._conn.execute(
+                        "DELETE FROM response_cache WHERE key LIKE ? ESCAPE '\\'",
+                        (pattern,)
+                    )
+                removed = max(removed, cursor.rowcount)
+
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and sizes
+
+        Requests that waited for another caller's load are counted as
+        ``coalesced``, separately from hits and misses.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "inflight": len(self._inflight),
+                "max_disk_entries": self.max_disk_entries
+            }
+        with self._db_lock:
+            if self._conn is not None:
+                stats["disk_entries"] = self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+        return stats
+
+    def close(self):
+        """Close the backing database"""
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
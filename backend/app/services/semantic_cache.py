@@ -0,0 +1,240 @@
+import re
+import zlib
+import threading
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Similarity of the closest cached entry for the lookup made during the current request
+last_semantic_lookup: ContextVar[Optional[Tuple[bool, float]]] = ContextVar("last_semantic_lookup", default=None)
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+# A number with the unit or word right after it, if any ("1.5 eV", "300K", "2 g/cm3")
+_QUANTITY = re.compile(r"(?<![\w.])(-?\d+(?:\.\d+)?(?:e[-+]?\d+)?)\s*([a-z%\u00b0\u00b5][a-z0-9%/\u00b0\u00b5^]*)?")
+
+# Filler words that change the wording but not the request; negations are deliberately kept
+STOP_WORDS = frozenset("""
+    a an the i me my we our you it its is are be been was should would could can will
+    want need like as of to for and so that this with please very really super just some
+""".split())
+
+
+def quantities(text: str) -> Tuple[str, ...]:
+    """Numbers in a text with their units, normalized and sorted ("1.50 eV" -> "1.5 ev")
+
+    Embeddings barely tell "1.5 eV" from "3.5 eV", so these are matched
+    exactly by making them part of the cache key.
+    """
+    found = set()
+    for number, unit in _QUANTITY.findall(text.lower()):
+        try:
+            value = float(number)
+        except ValueError:
+            continue
+        found.add(f"{value:g} {unit}".strip())
+    return tuple(sorted(found))
+
+
+class HashedNgramVectorizer:
+    """Embeds text as L2-normalized hashed character n-gram counts
+
+    Runs locally with no vocabulary to fit: filler words are dropped, each
+    n-gram is hashed into one of ``dim`` buckets with a hash-derived sign, and
+    counts are log-scaled so repeated words don't dominate.
+    """
+
+    def __init__(self, dim: int = 2048, min_n: int = 3, max_n: int = 5):
+        """Initialize the vectorizer"""
+        self.dim = dim
+        self.min_n = min_n
+        self.max_n = max_n
+
+    def transform(self, text: str) -> np.ndarray:
+        """Embed a text as a unit-length float32 vector (all zeros for empty text)"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        words = [word for word in _NON_WORD.sub(" ", text.lower()).split() if word not in STOP_WORDS]
+        normalized = " " + " ".join(words) + " "
+
+        counts: Dict[int, int] = {}
+        for n in range(self.min_n, self.max_n + 1):
+            for i in range(len(normalized) - n + 1):
+                digest = zlib.crc32(normalized[i:i + n].encode())
+                # Top bit picks the sign, the rest the bucket
+                bucket = (digest & 0x7FFFFFFF) % self.dim
+                counts[bucket] = counts.get(bucket, 0) + (1 if digest & 0x80000000 else -1)
+
+        if not counts:
+            return vector
+
+        buckets = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        vector[buckets] = np.sign(values) * np.log1p(np.abs(values))
+
+        norm = float(np.linalg.norm(vector))
+        if norm > 0:
+            vector /= norm
+        return vector
+
+
+class _Partition:
+    """Bounded ring of cached vectors and responses for one goal/property
+
+    Storage starts at one row and doubles up to ``capacity``, so it never
+    holds more than twice the rows in use; after that the oldest entry is
+    overwritten.
+    """
+
+    def __init__(self, capacity: int, dim: int):
+        self.capacity = capacity
+        self.vectors = np.zeros((1, dim), dtype=np.float32)
+        self.responses: List[Optional[str]] = []
+        self.size = 0
+        self.next = 0
+
+    def add(self, vector: np.ndarray, response: str):
+        """Store an entry, overwriting the oldest once full"""
+        if self.size < self.capacity:
+            if self.size == len(self.vectors):
+                grown = np.zeros((min(2 * self.size, self.capacity), self.vectors.shape[1]), dtype=np.float32)
+                grown[:self.size] = self.vectors
+                self.vectors = grown
+            self.vectors[self.size] = vector
+            self.responses.append(response)
+            self.size += 1
+            return
+
+        self.vectors[self.next] = vector
+        self.responses[self.next] = response
+        self.next = (self.next + 1) % self.capacity
+
+    def nearest(self, vector: np.ndarray) -> Tuple[Optional[str], float]:
+        """Most similar stored response and its cosine similarity"""
+        if self.size == 0:
+            return None, 0.0
+        similarities = self.vectors[:self.size] @ vector
+        best = int(np.argmax(similarities))
+        return self.responses[best], float(similarities[best])
+
+
+class SemanticCache:
+    """Reuses responses for differently worded but similar requests
+
+    Entries are partitioned by an exact key (such as goal, property and the
+    quantities mentioned) and matched within a partition by cosine
+    similarity of their embedded text. Once the partitions hold more than
+    ``max_entries`` entries in total, the least recently used partitions
+    are dropped.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.85,
+        max_entries_per_key: int = 512,
+        dim: int = 2048,
+        window: int = 1000,
+        max_entries: int = 4096
+    ):
+        """Initialize an empty cache"""
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_entries_per_key = min(max_entries_per_key, max_entries)
+        self.vectorizer = HashedNgramVectorizer(dim=dim)
+
+        # Least recently used first
+        self._partitions: "OrderedDict[Tuple[str, ...], _Partition]" = OrderedDict()
+        self._entries = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evicted_keys = 0
+        # Best similarity per lookup, as a 10-bin histogram over [0, 1] and a recent window
+        self._histogram = [0] * 10
+        self._recent = deque(maxlen=window)
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed a text for lookup and storage"""
+        return self.vectorizer.transform(text)
+
+    def lookup(self, key: Tuple[str, ...], vector: np.ndarray) -> Optional[str]:
+        """Get the cached response closest to a vector if it passes the threshold"""
+        with self._lock:
+            partition = self._partitions.get(key)
+            response, similarity = partition.nearest(vector) if partition else (None, 0.0)
+            if partition is not None:
+                self._partitions.move_to_end(key)
+
+            hit = response is not None and similarity >= self.threshold
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+            similarity = min(max(similarity, 0.0), 1.0)
+            self._histogram[min(int(similarity * 10), 9)] += 1
+            self._recent.append(similarity)
+
+        last_semantic_lookup.set((hit, similarity))
+        return response if hit else None
+
+    def add(self, key: Tuple[str, ...], vector: np.ndarray, response: str):
+        """Cache a response under a key and vector"""
+        if not vector.any():
+            return
+        with self._lock:
+            partition = self._partitions.get(key)
+            if partition is None:
+                partition = _Partition(self.max_entries_per_key, self.vectorizer.dim)
+                self._partitions[key] = partition
+            self._partitions.move_to_end(key)
+
+            size = partition.size
+            partition.add(vector, response)
+            self._entries += partition.size - size
+
+            # The partition just used is last and within the cap on its own, so it is never dropped
+            while self._entries > self.max_entries:
+                _, evicted = self._partitions.popitem(last=False)
+                self._entries -= evicted.size
+                self.evicted_keys += 1
+
+    def clear(self) -> int:
+        """Drop every cached entry; returns the number removed"""
+        with self._lock:
+            removed = self._entries
+            self._partitions.clear()
+            self._entries = 0
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate, sizes and the distribution of best-match similarities"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            recent = sorted(self._recent)
+
+            def percentile(p: float) -> Optional[float]:
+                if not recent:
+                    return None
+                return round(recent[min(int(p * len(recent)), len(recent) - 1)], 4)
+
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "threshold": self.threshold,
+                "keys": len(self._partitions),
+                "entries": self._entries,
+                "max_entries": self.max_entries,
+                "evicted_keys": self.evicted_keys,
+                "memory_bytes": sum(partition.vectors.nbytes for partition in self._partitions.values()),
+                "similarity_histogram": {
+                    f"{i / 10:.1f}-{(i + 1) / 10:.1f}": count for i, count in enumerate(self._histogram)
+                },
+                "similarity_p50": percentile(0.5),
+                "similarity_p90": percentile(0.9),
+                "similarity_p99": percentile(0.99)
+            }
@@ -0,0 +1,298 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+import weakref
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.models.chat import ChatMessage, ChatSession
+
+
+class _Session:
+    """In-memory state of one chat session"""
+
+    __slots__ = ("session_id", "created_at", "metadata", "messages", "size", "last_access", "lock")
+
+    def __init__(
+        self,
+        session_id: str,
+        created_at: str,
+        metadata: Dict[str, Any],
+        last_access: float,
+        lock: Optional[asyncio.Lock] = None
+    ):
+        self.session_id = session_id
+        self.created_at = created_at
+        self.metadata = metadata
+        self.messages: List[ChatMessage] = []
+        self.size = 0
+        self.last_access = last_access
+        self.lock = lock if lock is not None else asyncio.Lock()
+
+
+class SessionStore:
+    """Chat sessions with append-only message logs, an idle TTL and a memory cap
+
+    Sessions live in memory, least recently used first. With a database path
+    every session and message is also written to SQLite, so sessions evicted
+    by the memory cap or lost on restart are reloaded on demand; without one,
+    evicted sessions are gone. Sessions idle for longer than the TTL expire
+    everywhere. Turn locks are also kept by session ID for as long as anyone
+    holds them, so a session reloaded after eviction gets the same lock.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        idle_ttl_seconds: float = 86400.0,
+        max_memory_bytes: int = 64 * 1024 * 1024,
+        prune_interval_seconds: float = 60.0
+    ):
+        """Initialize the session store"""
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_memory_bytes = max_memory_bytes
+        self.prune_interval_seconds = prune_interval_seconds
+
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._memory_bytes = 0
+        self._last_prune = time.monotonic()
+        self._lock = threading.RLock()
+
+        self._conn = None
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._create_schema()
+
+    def _create_schema(self):
+        """Create tables if they don't exist"""
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id TEXT PRIMARY KEY,
+                    created_at TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS session_messages (
+                    session_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    PRIMARY KEY (session_id, seq)
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_access ON sessions (last_access)")
+
+    def create(self, metadata: Optional[Dict[str, Any]] = None) -> str:
+        """Start a new session and return its ID"""
+        session = _Session(
+            session_id=uuid.uuid4().hex,
+            created_at=datetime.now().isoformat(),
+            metadata=metadata or {},
+            last_access=time.time()
+        )
+
+        with self._lock:
+            self._prune_if_due()
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT INTO sessions (id, created_at, metadata, last_access) VALUES (?, ?, ?, ?)",
+                        (session.session_id, session.created_at, json.dumps(session.metadata), session.last_access)
+                    )
+            self._remember(session)
+
+        return session.session_id
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        """Get a session with its full message log"""
+        with self._lock:
+            session = self._load(session_id)
+            if session is None:
+                return None
+            return ChatSession(
+                session_id=session.session_id,
+                created_at=session.created_at,
+                metadata=session.metadata,
+                messages=list(session.messages)
+            )
+
+    def messages(self, session_id: str) -> Optional[List[ChatMessage]]:
+        """Get a copy of a session's message log"""
+        with self._lock:
+            session = self._load(session_id)
+            return list(session.messages) if session is not None else None
+
+    def append(self, session_id: str, messages: Iterable[ChatMessage]) -> bool:
+        """Append messages to a session's log; returns False if the session doesn't exist"""
+        messages = list(messages)
+        with self._lock:
+            session = self._load(session_id)
+            if session is None:
+                return False
+
+            if self._conn is not None:
+                first_seq = len(session.messages)
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT INTO session_messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                        [
+                            (session_id, first_seq + offset, message.role.value, message.content)
+                            for offset, message in enumerate(messages)
+                        ]
+                    )
+                    self._conn.execute(
+                        "UPDATE sessions SET last_access = ? WHERE id = ?",
+                        (session.last_access, session_id)
+                    )
+
+            added = sum(len(message.content) for message in messages)
+            session.messages.extend(messages)
+            session.size += added
+            self._memory_bytes += added
+            self._evict_over_cap(keep=session_id)
+            return True
+
+    def lock(self, session_id: str) -> Optional[asyncio.Lock]:
+        """Lock that serializes turns of a session, or None if it doesn't exist"""
+        with self._lock:
+            session = self._load(session_id)
+            return session.lock if session is not None else None
+
+    def delete(self, session_id: str) -> bool:
+        """Delete a session; returns False if it didn't exist"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._memory_bytes -= session.size
+
+            existed = session is not None
+            if self._conn is not None:
+                with self._conn:
+                    cursor = self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                    self._conn.execute("DELETE FROM session_messages WHERE session_id = ?", (session_id,))
+                existed = existed or cursor.rowcount > 0
+            return existed
+
+    def stats(self) -> Dict[str, Any]:
+        """Session counts and memory use"""
+        with self._lock:
+            stats = {
+                "sessions_in_memory": len(self._sessions),
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "idle_ttl_seconds": self.idle_ttl_seconds
+            }
+            if self._conn is not None:
+                stats["sessions_on_disk"] = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            return stats
+
+    def close(self):
+        """Close the backing database"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _load(self, session_id: str) -> Optional[_Session]:
+        """Get a live session from memory or disk and mark it used (caller holds the lock)"""
+        self._prune_if_due()
+        now = time.time()
+
+        session = self._sessions.get(session_id)
+        if session is not None:
+            if now - session.last_access > self.idle_ttl_seconds:
+                self.delete(session_id)
+                return None
+            session.last_access = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+        if self._conn is None:
+            return None
+
+        row = self._conn.execute(
+            "SELECT created_at, metadata, last_access FROM sessions WHERE id = ?",
+            (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        if now - row[2] > self.idle_ttl_seconds:
+            self.delete(session_id)
+            return None
+
+        session = _Session(session_id, row[0], json.loads(row[1]), now, self._locks.get(session_id))
+        for role, content in self._conn.execute(
+            "SELECT role, content FROM session_messages WHERE session_id = ? ORDER BY seq",
+            (session_id,)
+        ):
+            session.messages.append(ChatMessage(role=role, content=content))
+            session.size += len(content)
+        self._remember(session)
+        return session
+
+    def _remember(self, session: _Session):
+        """Keep a session in memory (caller holds the lock)"""
+        self._sessions[session.session_id] = session
+        self._locks[session.session_id] = session.lock
+        self._memory_bytes += session.size
+        self._evict_over_cap(keep=session.session_id)
+
+    def _evict_over_cap(self, keep: str):
+        """Drop least recently used sessions until memory use is under the cap (caller holds the lock)"""
+        while self._memory_bytes > self.max_memory_bytes and len(self._sessions) > 1:
+            session_id, session = next(iter(self._sessions.items()))
+            if session_id == keep:
+                break
+            del self._sessions[session_id]
+            self._memory_bytes -= session.size
+            # The last access is only persisted on writes; keep it current for the TTL
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute(
+                        "UPDATE sessions SET last_access = ? WHERE id = ?",
+                        (session.last_access, session_id)
+                    )
+
+    def _prune_if_due(self):
+        """Expire idle sessions, at most once per prune interval (caller holds the lock)"""
+        now = time.monotonic()
+        if now - self._last_prune < self.prune_interval_seconds:
+            return
+        self._last_prune = now
+
+        cutoff = time.time() - self.idle_ttl_seconds
+        # Sessions are in least recently used order, so stop at the first live one
+        for session_id, session in list(self._sessions.items()):
+            if session.last_access > cutoff:
+                break
+            del self._sessions[session_id]
+            self._memory_bytes -= session.size
+
+        if self._conn is not None:
+            with self._conn:
+                # Reads only update the in-memory access time; persist it before expiring rows
+                self._conn.executemany(
+                    "UPDATE sessions SET last_access = ? WHERE id = ?",
+                    [(session.last_access, session_id) for session_id, session in self._sessions.items()]
+                )
+                self._conn.execute(
+                    "DELETE FROM session_messages WHERE session_id IN (SELECT id FROM sessions WHERE last_access <= ?)",
+                    (cutoff,)
+                )
+                self._conn.execute("DELETE FROM sessions WHERE last_access <= ?", (cutoff,))
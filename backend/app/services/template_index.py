@@ -0,0 +1,295 @@
+import re
+import math
+import bisect
+import threading
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.models.templates import DesignTemplate
+
+
+# Weight of a term occurrence by the field it occurs in
+FIELD_WEIGHTS = {
+    "display_name": 3.0,
+    "suggested_elements": 2.0,
+    "description": 1.0,
+    "property_explanations": 1.0,
+    "prompts": 0.5
+}
+
+# Score multiplier for vocabulary terms reached by prefix expansion rather than typed in full
+PREFIX_WEIGHT = 0.7
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with plural endings stripped"""
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def normalize_element(symbol: str) -> str:
+    """Element symbol in its usual capitalization ("li" -> "Li")"""
+    symbol = symbol.strip()
+    return symbol[:1].upper() + symbol[1:].lower()
+
+
+class TemplateSearchIndex:
+    """Inverted index over the searchable text of design templates
+
+    Term frequencies are weighted by field (a word in the display name counts
+    more than one in a prompt) and ranked with BM25. The last query word can
+    also match longer vocabulary terms, for typeahead. Suggested elements
+    and categories are kept in separate maps for exact filtering.
+
+    Each template owns a row; postings map rows to frequencies and are
+    turned into arrays on first use, so a query scores every matching
+    template with a few vectorized operations. Updates only touch the
+    postings of the terms involved. Searches and updates are serialized by
+    a lock.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_prefix_terms: int = 32, initial_capacity: int = 1024):
+        """Initialize an empty index"""
+        self.k1 = k1
+        self.b = b
+        self.max_prefix_terms = max_prefix_terms
+
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._posting_arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._vocabulary: List[str] = []
+
+        # Per-row data, valid for rows below self._size
+        self._ids: List[Optional[str]] = [None] * initial_capacity
+        self._lengths = np.zeros(initial_capacity, dtype=np.float64)
+        self._row_terms: List[Dict[str, float]] = [{}] * initial_capacity
+        self._row_elements: List[Set[str]] = [set()] * initial_capacity
+        self._row_categories: List[Optional[str]] = [None] * initial_capacity
+        self._names: List[str] = [""] * initial_capacity
+        self._total_length = 0.0
+
+        self._row_of: Dict[str, int] = {}
+        self._free_rows: List[int] = []
+        self._size = 0
+
+        self._elements: Dict[str, Set[int]] = {}
+        self._categories: Dict[str, Set[int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def update(self, templates: Iterable[DesignTemplate]):
+        """Add or replace templates"""
+        with self._lock:
+            for template in templates:
+                self._remove(template.id)
+                self._add(template)
+
+    def remove(self, template_ids: Iterable[str]):
+        """Remove templates from the index"""
+        with self._lock:
+            for template_id in template_ids:
+                self._remove(template_id)
+
+    def _add(self, template: DesignTemplate):
+        terms: Dict[str, float] = {}
+        fields = {
+            "display_name": [template.display_name],
+            "suggested_elements": template.suggested_elements,
+            "description": [template.description],
+            # Property keys such as "band_gap" are searchable too
+            "property_explanations": [f"{key} {text}" for key, text in template.property_explanations.items()],
+            "prompts": list(template.prompts.values())
+        }
+        for field, texts in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            for text in texts:
+                for token in tokenize(text):
+                    terms[token] = terms.get(token, 0.0) + weight
+
+        row = self._allocate_row()
+        self._row_of[template.id] = row
+        self._ids[row] = template.id
+
+        for term, frequency in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                bisect.insort(self._vocabulary, term)
+            postings[row] = frequency
+            self._posting_arrays.pop(term, None)
+
+        length = sum(terms.values())
+        self._row_terms[row] = terms
+        self._lengths[row] = length
+        self._total_length += length
+
+        elements = {normalize_element(element) for element in template.suggested_elements if element.strip()}
+        self._row_elements[row] = elements
+        for element in elements:
+            self._elements.setdefault(element, set()).add(row)
+
+        self._row_categories[row] = template.category
+        self._categories.setdefault(template.category, set()).add(row)
+        self._names[row] = template.display_name.lower()
+
+    def _remove(self, template_id: str):
+        row = self._row_of.pop(template_id, None)
+        if row is None:
+            return
+
+        for term in self._row_terms[row]:
+            postings = self._postings[term]
+            del postings[row]
+            self._posting_arrays.pop(term, None)
+            if not postings:
+                del self._postings[term]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, term)]
+
+        for element in self._row_elements[row]:
+            holders = self._elements[element]
+            holders.discard(row)
+            if not holders:
+                del self._elements[element]
+
+        holders = self._categories[self._row_categories[row]]
+        holders.discard(row)
+        if not holders:
+            del self._categories[self._row_categories[row]]
+
+        self._total_length -= self._lengths[row]
+        self._lengths[row] = 0.0
+        self._ids[row] = None
+        self._row_terms[row] = {}
+        self._row_elements[row] = set()
+        self._row_categories[row] = None
+        self._names[row] = ""
+        self._free_rows.append(row)
+
+    def _allocate_row(self) -> int:
+        """Get a free row, growing the per-row data if needed"""
+        if self._free_rows:
+            return self._free_rows.pop()
+
+        capacity = len(self._ids)
+        if self._size == capacity:
+            self._lengths = np.concatenate([self._lengths, np.zeros(capacity, dtype=np.float64)])
+            self._ids.extend([None] * capacity)
+            self._row_terms.extend([{}] * capacity)
+            self._row_elements.extend([set()] * capacity)
+            self._row_categories.extend([None] * capacity)
+            self._names.extend([""] * capacity)
+
+        row = self._size
+        self._size += 1
+        return row
+
+    def search(
+        self,
+        query: str = "",
+        elements: Optional[Iterable[str]] = None,
+        category: Optional[str] = None,
+        prefix: bool = True,
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> Tuple[int, List[Tuple[str, float]]]:
+        """Rank templates for a query; returns the number of matches and a page of (template ID, score) pairs
+
+        Templates must contain every given element and be in the given
+        category, if any. With no query words, every template passing the
+        filters matches, ordered by display name with a score of 0.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        wanted_elements = {normalize_element(element) for element in elements or [] if element.strip()}
+        end = None if limit is None else offset + limit
+
+        with self._lock:
+            allowed = self._filter(wanted_elements, category)
+            if allowed is not None and not allowed:
+                return 0, []
+
+            if not tokens:
+                rows = allowed if allowed is not None else self._row_of.values()
+                ordered = sorted(rows, key=self._names.__getitem__)
+                return len(ordered), [(self._ids[row], 0.0) for row in ordered[offset:end]]
+
+            size = self._size
+            scores = np.zeros(size, dtype=np.float64)
+            doc_count = len(self._row_of)
+            average_length = self._total_length / doc_count if doc_count else 1.0
+            norms = self.k1 * (1 - self.b + self.b * self._lengths[:size] / average_length)
+
+            for term, weight in self._expand(tokens, prefix):
+                arrays = self._arrays(term)
+                if arrays is None:
+                    continue
+                rows, frequencies = arrays
+                idf = math.log(1 + (doc_count - len(rows) + 0.5) / (len(rows) + 0.5))
+                scores[rows] += weight * idf * frequencies * (self.k1 + 1) / (frequencies + norms[rows])
+
+            if allowed is not None:
+                mask = np.zeros(size, dtype=bool)
+                mask[list(allowed)] = True
+                scores[~mask] = 0.0
+
+            matched = np.flatnonzero(scores > 0)
+            # Best score first, earlier rows first among equals
+            ordered = matched[np.lexsort((matched, -scores[matched]))][offset:end]
+            return len(matched), [(self._ids[row], float(scores[row])) for row in ordered]
+
+    def _arrays(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Rows and frequencies of a term's postings as arrays (caller holds the lock)"""
+        arrays = self._posting_arrays.get(term)
+        if arrays is None:
+            postings = self._postings.get(term)
+            if not postings:
+                return None
+            arrays = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float64, count=len(postings))
+            )
+            self._posting_arrays[term] = arrays
+        return arrays
+
+    def _filter(self, elements: Set[str], category: Optional[str]) -> Optional[Set[int]]:
+        """Rows passing the filters, or None when no filter is given (caller holds the lock)"""
+        sets = [self._elements.get(element, set()) for element in elements]
+        if category:
+            sets.append(self._categories.get(category, set()))
+        if not sets:
+            return None
+
+        sets.sort(key=len)
+        allowed = set(sets[0])
+        for rows in sets[1:]:
+            allowed &= rows
+        return allowed
+
+    def _expand(self, tokens: List[str], prefix: bool) -> List[Tuple[str, float]]:
+        """Query terms with their weights, extending the last word to the terms it begins (caller holds the lock)"""
+        expanded = [(token, 1.0) for token in tokens]
+        if not prefix:
+            return expanded
+
+        last = tokens[-1]
+        start = bisect.bisect_left(self._vocabulary, last)
+        for term in self._vocabulary[start:start + self.max_prefix_terms + 1]:
+            if not term.startswith(last):
+                break
+            if term != last and term not in tokens:
+                expanded.append((term, PREFIX_WEIGHT))
+        return expanded
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "templates": len(self._row_of),
+                "terms": len(self._postings),
+                "elements": len(self._elements)
+            }
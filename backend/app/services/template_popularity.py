@@ -0,0 +1,193 @@
+import os
+import json
+import math
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+# How much one event of each kind counts towards a template's popularity
+EVENT_WEIGHTS = {
+    "view": 1.0,
+    "design": 3.0
+}
+
+# Rescale counters once the growth factor of new increments exceeds e^50
+_MAX_EXPONENT = 50.0
+
+
+class DecayedSpaceSaving:
+    """Space-Saving heavy-hitter sketch with exponentially decaying counts
+
+    At most ``capacity`` keys are tracked. An untracked key takes over the
+    counter of the smallest one, inheriting its count as the error bound, so
+    any key whose decayed count exceeds the total over capacity is
+    guaranteed to be tracked.
+
+    Decay uses forward decay: an increment at time t is stored as
+    weight * e^(lambda (t - landmark)), so counters never need updating as
+    time passes, and dividing by e^(lambda (now - landmark)) gives the
+    decayed counts. Counters are rescaled to a new landmark before the
+    stored values grow too large. Not thread-safe.
+    """
+
+    def __init__(self, capacity: int = 256, half_life: float = 7 * 24 * 3600.0, landmark: Optional[float] = None):
+        """Initialize an empty sketch; `half_life` is in seconds"""
+        self.capacity = capacity
+        self.half_life = half_life
+        self.decay_rate = math.log(2) / half_life
+        self.landmark = time.time() if landmark is None else landmark
+        # key -> [scaled count, scaled error]
+        self.counters: Dict[str, List[float]] = {}
+
+    def __len__(self) -> int:
+        return len(self.counters)
+
+    def add(self, key: str, weight: float = 1.0, now: Optional[float] = None):
+        """Count an occurrence of a key"""
+        now = time.time() if now is None else now
+        exponent = self.decay_rate * (now - self.landmark)
+        if exponent > _MAX_EXPONENT:
+            self._rescale(now)
+            exponent = 0.0
+        increment = weight * math.exp(exponent)
+
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += increment
+        elif len(self.counters) < self.capacity:
+            self.counters[key] = [increment, 0.0]
+        else:
+            smallest = min(self.counters, key=lambda tracked: self.counters[tracked][0])
+            floor = self.counters.pop(smallest)[0]
+            self.counters[key] = [floor + increment, floor]
+
+    def top(self, k: Optional[int] = None, now: Optional[float] = None) -> List[Tuple[str, float, float]]:
+        """The k keys with the highest counts, as (key, decayed count, error bound), highest first"""
+        now = time.time() if now is None else now
+        scale = math.exp(-self.decay_rate * (now - self.landmark))
+        ranked = sorted(self.counters.items(), key=lambda item: (-item[1][0], item[0]))
+        return [(key, count * scale, error * scale) for key, (count, error) in ranked[:k]]
+
+    def _rescale(self, now: float):
+        """Move the landmark to `now`, shrinking every counter to match"""
+        scale = math.exp(-self.decay_rate * (now - self.landmark))
+        for counter in self.counters.values():
+            counter[0] *= scale
+            counter[1] *= scale
+        self.landmark = now
+
+    def to_dict(self) -> Dict:
+        return {"landmark": self.landmark, "half_life": self.half_life, "counters": self.counters}
+
+    @classmethod
+    def from_dict(cls, data: Dict, capacity: int, half_life: float, now: Optional[float] = None) -> "DecayedSpaceSaving":
+        """Restore a sketch, decaying its counts to `now` under the half-life they were saved with"""
+        now = time.time() if now is None else now
+        saved = cls(capacity, data["half_life"], data["landmark"])
+        saved.counters = data["counters"]
+        sketch = cls(capacity, half_life, now)
+        # The largest counters survive a reduced capacity
+        for key, count, error in saved.top(capacity, now):
+            sketch.counters[key] = [count, error]
+        return sketch
+
+
+class TemplatePopularityTracker:
+    """Counts template usage in a decayed heavy-hitter sketch and keeps a ranked top list
+
+    ``record`` only updates the sketch under a lock. A background thread
+    recomputes the top list every ``refresh_interval`` seconds, so readers
+    get the last ranking without sorting, and writes the sketch to disk
+    every ``flush_interval`` seconds when it has changed.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        capacity: int = 256,
+        half_life: float = 7 * 24 * 3600.0,
+        flush_interval: float = 60.0,
+        refresh_interval: float = 5.0
+    ):
+        """Load the saved counts, if any, and start the background thread"""
+        self.path = path
+        self.capacity = capacity
+        self.half_life = half_life
+        self.flush_interval = flush_interval
+        self.refresh_interval = refresh_interval
+
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        self.sketch = self._load()
+        self._top: List[Tuple[str, float, float]] = []
+        self.refresh()
+
+        self._thread = threading.Thread(target=self._run, name="template-popularity", daemon=True)
+        self._thread.start()
+
+    def record(self, template_id: str, kind: str = "view"):
+        """Count one use of a template"""
+        with self._lock:
+            self.sketch.add(template_id, EVENT_WEIGHTS.get(kind, 1.0))
+            self._dirty = True
+
+    def top(self, k: int) -> List[Tuple[str, float, float]]:
+        """The k most used templates from the last refresh, as (template ID, decayed count, error bound)"""
+        return self._top[:k]
+
+    def refresh(self):
+        """Recompute the ranked top list"""
+        with self._lock:
+            ranked = self.sketch.top()
+        self._top = ranked
+
+    def flush(self):
+        """Write the sketch to disk if it changed since the last write"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self.sketch.to_dict())
+            self._dirty = False
+
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # Write to a temporary file first so a crash never leaves a truncated file
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w") as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
+        except Exception:
+            with self._lock:
+                self._dirty = True
+            raise
+
+    def close(self):
+        """Stop the background thread and write the final counts"""
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+
+    def _load(self) -> DecayedSpaceSaving:
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    return DecayedSpaceSaving.from_dict(json.load(f), self.capacity, self.half_life)
+            except Exception as e:
+                # Log error and start counting afresh
+                print(f"Error loading template popularity from {self.path}: {str(e)}")
+        return DecayedSpaceSaving(self.capacity, self.half_life)
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while not self._stop.wait(self.refresh_interval):
+            self.refresh()
+            if time.monotonic() - last_flush >= self.flush_interval:
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"Error saving template popularity to {self.path}: {str(e)}")
+                last_flush = time.monotonic()
+
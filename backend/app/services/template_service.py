@@ -1,24 +1,85 @@
 import os
 import json
-from typing import List, Dict, Any, Optional
+import hashlib
+import threading
+from collections import Counter, deque
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
 from pathlib import Path
 
-from app.models.templates import DesignTemplate, TemplateResponse
+from app.models.templates import DesignTemplate, TemplateResponse, TemplateSearchHit, TemplateSearchResponse
+from app.services.template_index import TemplateSearchIndex
+from app.services.template_popularity import TemplatePopularityTracker
+from app.services.template_watcher import DirectoryWatcher
 
 
 class TemplateService:
-    """Service for handling material design templates"""
+    """Service for handling material design templates
     
-    def __init__(self, templates_dir: str):
-        """Initialize the template service"""
+    Templates are read from JSON files once at startup and then reloaded
+    file by file as they change. Each reload swaps in new cache objects, so
+    readers always see a consistent snapshot, and bumps ``cache_version``.
+    """
+    
+    def __init__(
+        self,
+        templates_dir: str,
+        watch: bool = False,
+        poll_interval: float = 2.0,
+        popularity: Optional[TemplatePopularityTracker] = None
+    ):
+        """Initialize the template service, optionally watching the templates for changes
+        
+        Popular templates are ranked by the given usage tracker, if any.
+        """
         self.templates_dir = templates_dir
+        self.popularity = popularity
+        self.templates_path = Path(templates_dir) / "material_templates"
         self.templates_cache = {}
         self.categories_cache = set()
+        self.cache_version = 0
+        
+        # Per file: (mtime, size) when last read, and the template ID it defines
+        self._file_state: Dict[str, Tuple[int, int]] = {}
+        self._file_ids: Dict[str, str] = {}
+        self._id_files: Dict[str, str] = {}
+        # Files skipped because another file defines the same template ID, with that ID
+        self._duplicates: Dict[str, str] = {}
+        # Files whose latest version failed to load, with the error; their last good version is kept
+        self.load_errors: Dict[str, str] = {}
+        self._category_counts: Counter = Counter()
+        self._hashes: Dict[str, int] = {}
+        self._fingerprint = 0
+        self._reload_lock = threading.Lock()
+        self.search_index = TemplateSearchIndex()
+        
         self._load_templates()
+        
+        self.watcher = None
+        if watch:
+            self.watcher = DirectoryWatcher(str(self.templates_path), self.refresh, poll_interval=poll_interval)
+            self.watcher.start()
+    
+    def close(self):
+        """Stop watching the templates directory and save the usage counts"""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+        if self.popularity is not None:
+            self.popularity.close()
+    
+    @property
+    def etag(self) -> str:
+        """Entity tag for the current set of templates, the same in every worker with the same files"""
+        return f'"{self._fingerprint:016x}"'
+    
+    def template_etag(self, template_id: str) -> Optional[str]:
+        """Entity tag for one template"""
+        digest = self._hashes.get(template_id)
+        return f'"{digest:016x}"' if digest is not None else None
     
     def _load_templates(self):
         """Load all templates from the templates directory"""
-        templates_path = Path(self.templates_dir) / "material_templates"
+        templates_path = self.templates_path
         
         # Create templates directory if it doesn't exist
         os.makedirs(templates_path, exist_ok=True)
@@ -28,16 +89,137 @@ class TemplateService:
             self._create_default_templates(templates_path)
         
         # Load all templates
-        for template_file in templates_path.glob("*.json"):
-            try:
-                with open(template_file, "r") as f:
-                    template_data = json.load(f)
-                    template = DesignTemplate(**template_data)
-                    self.templates_cache[template.id] = template
-                    self.categories_cache.add(template.category)
-            except Exception as e:
-                # Log error but continue
-                print(f"Error loading template {template_file}: {str(e)}")
+        self.refresh()
+    
+    def refresh(self, names: Optional[Iterable[str]] = None) -> bool:
+        """Re-read template files that changed since they were last read
+        
+        Checks the given file names, or every file in the directory if None.
+        A file defining an ID that another file already defines is reported
+        in ``load_errors`` and skipped until that ID is free again. Returns
+        whether the cache changed.
+        """
+        with self._reload_lock:
+            current: Dict[str, Tuple[int, int]] = {}
+            if names is None:
+                with os.scandir(self.templates_path) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(".json") and entry.is_file():
+                            stat = entry.stat()
+                            current[entry.name] = (stat.st_mtime_ns, stat.st_size)
+                candidates = set(current) | set(self._file_state)
+            else:
+                candidates = {name for name in names if name.endswith(".json")}
+            
+            updates: Dict[str, DesignTemplate] = {}
+            removals: Set[str] = set()
+            queue = deque(sorted(candidates))
+            
+            def release(template_id: str):
+                """Drop an ID whose file no longer defines it, and retry files that wanted it"""
+                del self._id_files[template_id]
+                removals.add(template_id)
+                for waiting, wanted in list(self._duplicates.items()):
+                    if wanted == template_id:
+                        del self._duplicates[waiting]
+                        self._file_state.pop(waiting, None)
+                        queue.append(waiting)
+            
+            while queue:
+                name = queue.popleft()
+                state = current[name] if name in current else self._stat(name)
+                if state == self._file_state.get(name):
+                    continue
+                
+                if state is None:
+                    # File deleted or renamed away
+                    del self._file_state[name]
+                    self.load_errors.pop(name, None)
+                    self._duplicates.pop(name, None)
+                    old_id = self._file_ids.pop(name, None)
+                    if old_id is not None and self._id_files.get(old_id) == name:
+                        release(old_id)
+                    continue
+                
+                self._file_state[name] = state
+                try:
+                    with open(self.templates_path / name, "r") as f:
+                        template = DesignTemplate(**json.load(f))
+                except Exception as e:
+                    # Log error but keep the last good version
+                    print(f"Error loading template {self.templates_path / name}: {str(e)}")
+                    self.load_errors[name] = str(e)
+                    continue
+                
+                self._duplicates.pop(name, None)
+                owner = self._id_files.get(template.id)
+                if owner is not None and owner != name:
+                    # Log error but keep the last good version, and the first file's template
+                    error = f"Duplicate template ID '{template.id}', already defined in {owner}"
+                    print(f"Error loading template {self.templates_path / name}: {error}")
+                    self.load_errors[name] = error
+                    self._duplicates[name] = template.id
+                    continue
+                
+                self.load_errors.pop(name, None)
+                old_id = self._file_ids.get(name)
+                if old_id is not None and old_id != template.id and self._id_files.get(old_id) == name:
+                    release(old_id)
+                self._file_ids[name] = template.id
+                updates[template.id] = template
+                removals.discard(template.id)
+                self._id_files[template.id] = name
+            
+            if not updates and not removals:
+                return False
+            
+            self._swap(updates, removals)
+            return True
+    
+    def _stat(self, name: str) -> Optional[Tuple[int, int]]:
+        """(mtime, size) of a template file, or None if it doesn't exist"""
+        try:
+            stat = os.stat(self.templates_path / name)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def _swap(self, updates: Dict[str, DesignTemplate], removals: Set[str]):
+        """Publish new cache objects with templates replaced and removed (caller holds the reload lock)"""
+        templates = dict(self.templates_cache)
+        hashes = dict(self._hashes)
+        fingerprint = self._fingerprint
+        
+        for template_id in removals:
+            old = templates.pop(template_id, None)
+            if old is not None:
+                self._category_counts[old.category] -= 1
+                fingerprint ^= hashes.pop(template_id)
+        
+        for template_id, template in updates.items():
+            old = templates.get(template_id)
+            if old is not None:
+                self._category_counts[old.category] -= 1
+                fingerprint ^= hashes[template_id]
+            templates[template_id] = template
+            self._category_counts[template.category] += 1
+            digest = int(hashlib.sha1(template.json().encode()).hexdigest()[:16], 16)
+            hashes[template_id] = digest
+            fingerprint ^= digest
+        
+        categories = {category for category, count in self._category_counts.items() if count > 0}
+        
+        # The index is updated first; searches drop hits missing from the cache they read afterwards
+        self.search_index.remove(removals)
+        self.search_index.update(updates.values())
+        
+        # Readers hold references to the old objects, so they never see a half-applied reload.
+        # The entity tags change last: a tag read before the data can be stale but never ahead of it.
+        self.templates_cache = templates
+        self.categories_cache = categories
+        self._hashes = hashes
+        self._fingerprint = fingerprint
+        self.cache_version += 1
     
     def _create_default_templates(self, templates_path: Path):
         """Create default templates if none exist"""
@@ -268,6 +450,27 @@ class TemplateService:
             categories=list(self.categories_cache)
         )
     
+    async def search_templates(
+        self,
+        query: str = "",
+        elements: Optional[List[str]] = None,
+        category: Optional[str] = None,
+        prefix: bool = True,
+        skip: int = 0,
+        limit: int = 20
+    ) -> TemplateSearchResponse:
+        """Search templates by words and suggested elements, best matches first"""
+        total, page = self.search_index.search(query, elements, category, prefix, skip, limit)
+        templates = self.templates_cache
+        
+        # Hits from a reload that is still being applied are left out, and not counted
+        results = [
+            TemplateSearchHit(template=templates[template_id], score=round(score, 4))
+            for template_id, score in page
+            if template_id in templates
+        ]
+        return TemplateSearchResponse(results=results, total=total - (len(page) - len(results)))
+    
     async def get_template(self, template_id: str) -> Optional[DesignTemplate]:
         """Get a specific template by ID"""
         return self.templates_cache.get(template_id)
@@ -276,11 +479,33 @@ class TemplateService:
         """Get a list of all template categories"""
         return list(self.categories_cache)
     
+    def record_template_use(self, template_id: str, kind: str = "view") -> bool:
+        """Count a use of a template ("view" or "design"); unknown IDs are ignored"""
+        if self.popularity is None or template_id not in self.templates_cache:
+            return False
+        self.popularity.record(template_id, kind)
+        return True
+    
     async def get_popular_templates(self, limit: int = 5) -> List[DesignTemplate]:
-        """Get the most popular templates"""
-        # In a real application, this would be based on usage statistics
-        # For now, return the first few templates
-        return list(self.templates_cache.values())[:limit]
+        """Get the most popular templates, by recent usage"""
+        templates = self.templates_cache
+        popular = []
+        if self.popularity is not None:
+            # Ask for extra entries in case some templates were removed since they were counted
+            for template_id, _, _ in self.popularity.top(2 * limit):
+                if template_id in templates:
+                    popular.append(templates[template_id])
+                if len(popular) == limit:
+                    return popular
+        
+        # Fill up with unused templates until there is enough usage data
+        chosen = {template.id for template in popular}
+        for template in templates.values():
+            if len(popular) == limit:
+                break
+            if template.id not in chosen:
+                popular.append(template)
+        return popular
     
     async def get_template_examples(self, template_id: str) -> List[dict]:
         """Get examples for a specific template"""
@@ -0,0 +1,151 @@
+import os
+import select
+import struct
+import threading
+import ctypes
+import ctypes.util
+from typing import Callable, Optional, Set
+
+
+# inotify event masks (see inotify(7))
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Called with the names of changed files, or None when the whole directory must be rescanned
+ChangeCallback = Callable[[Optional[Set[str]]], None]
+
+
+class _Inotify:
+    """Minimal inotify binding through ctypes, watching one directory"""
+
+    def __init__(self, path: str):
+        """Start watching a directory; raises OSError if inotify is unavailable"""
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available on this platform")
+
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {path}")
+
+    def read(self, timeout: float) -> Optional[Set[str]]:
+        """Wait up to `timeout` seconds for events; returns the changed names, or None on queue overflow"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        names = set()
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            if mask & IN_Q_OVERFLOW:
+                return None
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name:
+                names.add(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class DirectoryWatcher:
+    """Reports changes to the files of a directory from a background thread
+
+    Uses inotify where available, batching events that arrive within
+    ``debounce`` seconds of each other. Elsewhere, or if inotify can't be
+    set up, it asks for a full rescan every ``poll_interval`` seconds, which
+    the callback answers by comparing file modification times.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        on_change: ChangeCallback,
+        poll_interval: float = 2.0,
+        debounce: float = 0.1,
+        use_inotify: bool = True
+    ):
+        """Initialize the watcher; call start() to begin watching"""
+        self.path = path
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.use_inotify = use_inotify
+        self.mode: Optional[str] = None
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the watcher thread"""
+        inotify = None
+        if self.use_inotify:
+            try:
+                inotify = _Inotify(self.path)
+            except (OSError, AttributeError) as e:
+                print(f"inotify unavailable for {self.path}, polling every {self.poll_interval}s instead: {str(e)}")
+
+        self.mode = "inotify" if inotify is not None else "polling"
+        target = self._run_inotify if inotify is not None else self._run_polling
+        args = (inotify,) if inotify is not None else ()
+        self._thread = threading.Thread(target=target, args=args, name="template-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the watcher thread and wait for it to exit"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run_inotify(self, inotify: _Inotify):
+        try:
+            while not self._stop.is_set():
+                names = inotify.read(timeout=0.5)
+                if names is not None and not names:
+                    continue
+
+                # Editors save in several steps; collect the whole burst before reloading
+                while names is not None:
+                    more = inotify.read(timeout=self.debounce)
+                    if more is None:
+                        names = None
+                    elif not more:
+                        break
+                    else:
+                        names |= more
+
+                self._notify(names)
+        finally:
+            inotify.close()
+
+    def _run_polling(self):
+        while not self._stop.wait(self.poll_interval):
+            self._notify(None)
+
+    def _notify(self, names: Optional[Set[str]]):
+        """Invoke the callback, keeping the thread alive if it fails"""
+        try:
+            self.on_change(names)
+        except Exception as e:
+            print(f"Error handling changes in {self.path}: {str(e)}")
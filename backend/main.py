@@ -1,11 +1,17 @@
 import os
-from fastapi import FastAPI, HTTPException
+import math
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
-from app.routers import materials, chat, templates, colab_code
+from app.routers import materials, chat, templates, colab_code, metrics
 from app.core.config import settings
+from app.core.dependencies import shutdown_services
+from app.core.uploads import UploadSizeLimitMiddleware
+from app.core.usage import LLMUsageHeadersMiddleware
+from app.services.llm_resilience import UpstreamUnavailableError
 
 # Load environment variables
 load_dotenv()
@@ -19,8 +25,9 @@ async def lifespan(app: FastAPI):
     # Startup
     print("Starting up EasyMatter API...")
     yield
-    # Shutdown
+    # Shutdown: finish ingestions, then flush and compact the material journal
     print("Shutting down EasyMatter API...")
+    await shutdown_services()
 
 # Create FastAPI app
 app = FastAPI(
@@ -39,11 +46,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Reject oversized uploads before their bodies are parsed
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_size=settings.MAX_UPLOAD_SIZE,
+    paths=["/api/materials/upload-dataset", "/api/colab-code/dataset-to-colab"],
+)
+
+# Report each request's LLM calls, tokens and cost in X-LLM-* headers
+if settings.LLM_USAGE_HEADERS:
+    app.add_middleware(LLMUsageHeadersMiddleware)
+
+@app.exception_handler(UpstreamUnavailableError)
+async def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailableError):
+    """Report an unavailable LLM provider as 503 instead of 500"""
+    headers = {}
+    if exc.retry_after is not None:
+        headers["Retry-After"] = str(max(math.ceil(exc.retry_after), 1))
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers=headers)
+
 # Include routers
 app.include_router(materials.router, prefix="/api/materials", tags=["materials"])
 app.include_router(chat.router, prefix="/api/chat", tags=["chat"])
 app.include_router(templates.router, prefix="/api/templates", tags=["templates"])
 app.include_router(colab_code.router, prefix="/api/colab-code", tags=["colab-code"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["metrics"])
 
 @app.get("/", tags=["health"])
 async def health_check():
@@ -0,0 +1,116 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.dependencies import get_openai_service
+from app.routers import chat
+from app.services.llm_transport import ReplayTransport
+from app.services.openai_service import OpenAIService
+
+
+SSE_HEADERS = {"Accept": "text/event-stream"}
+
+
+def completion_stream(*tokens):
+    """An OpenAI chat completion event stream delivering `tokens`"""
+    events = []
+    for token in tokens:
+        chunk = {
+            "id": "chatcmpl-1",
+            "object": "chat.completion.chunk",
+            "created": 1,
+            "model": "gpt-4o",
+            "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+        }
+        events.append(f"data: {json.dumps(chunk)}\n\n")
+    events.append("data: [DONE]\n\n")
+    return "".join(events)
+
+
+def write_cassette(path, body):
+    """A cassette with one streamed completion, replayed for any streaming request"""
+    record = {
+        "key": "recorded",
+        "method": "POST",
+        "path": "/v1/chat/completions",
+        "request": {"model": "gpt-4o", "stream": True},
+        "status": 200,
+        "headers": {"content-type": "text/event-stream"},
+        "elapsed": 0.0,
+        "body": body,
+        "chunks": [[0.0, len(body.encode())]]
+    }
+    path.write_text(json.dumps(record) + "\n")
+
+
+def parse_sse(text):
+    """(event, data) pairs of a server-sent event stream"""
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields.get("event"), json.loads(fields["data"])))
+    return events
+
+
+def make_client(transport):
+    service = OpenAIService(api_key="test", transport=transport)
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/api/chat")
+    app.dependency_overrides[get_openai_service] = lambda: service
+    return TestClient(app), service
+
+
+@pytest.fixture
+def cassette(tmp_path):
+    path = tmp_path / "cassette.jsonl"
+    write_cassette(path, completion_stream("Strong ", "and ", "light."))
+    return path
+
+
+def test_query_streams_tokens_then_final(cassette):
+    client, service = make_client(ReplayTransport(str(cassette), latency="none"))
+    with client:
+        response = client.post("/api/chat/query", json={"text": "A light metal?"}, headers=SSE_HEADERS)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    assert events[:-1] == [("token", {"text": "Strong "}), ("token", {"text": "and "}), ("token", {"text": "light."})]
+    assert events[-1][0] == "final"
+    assert events[-1][1]["text"] == "Strong and light."
+    assert service.transport.stats()["substituted"] == 1
+
+
+def test_continue_streams_the_new_message(cassette):
+    client, _ = make_client(ReplayTransport(str(cassette), latency="none"))
+    history = {"messages": [{"role": "user", "content": "Hello"}]}
+    with client:
+        response = client.post("/api/chat/continue", json=history, headers=SSE_HEADERS)
+
+    events = parse_sse(response.text)
+    assert [event for event, _ in events] == ["token", "token", "token", "final"]
+    assert events[-1][1] == {"role": "assistant", "content": "Strong and light."}
+
+
+def test_stream_stats_report_the_telemetry_time_to_first_token(cassette):
+    client, service = make_client(ReplayTransport(str(cassette), latency="none"))
+    with client:
+        client.post("/api/chat/query", json={"text": "A light metal?"}, headers=SSE_HEADERS)
+        stats = client.get("/api/chat/stream-stats").json()
+
+    assert stats["query"]["count"] == 1
+    assert stats["continue"]["count"] == 0
+    assert stats["query"] == service.telemetry.method_snapshot("stream_query")["time_to_first_token"]
+
+
+def test_upstream_failure_is_sent_as_an_error_event(tmp_path):
+    client, _ = make_client(ReplayTransport(str(tmp_path / "empty.jsonl"), latency="none", strict=True))
+    with client:
+        response = client.post("/api/chat/query", json={"text": "A light metal?"}, headers=SSE_HEADERS)
+
+    assert response.status_code == 200
+    events = parse_sse(response.text)
+    assert [event for event, _ in events] == ["error"]
+    assert events[0][1]["detail"]
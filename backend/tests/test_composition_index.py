@@ -0,0 +1,162 @@
+import random
+
+import numpy as np
+import pytest
+
+from app.services.composition_index import CompositionIndex
+from app.services.formula_parser import FormulaParseError, parse_formula
+
+
+ELEMENTS = ["Li", "Na", "Fe", "Co", "Ni", "Mn", "O", "S", "P", "Si", "Al", "Ti"]
+AVAILABILITY = ["Abundant", "Limited", "Rare"]
+
+
+def random_formula(rng):
+    elements = rng.sample(ELEMENTS, rng.randint(1, 4))
+    return "".join(f"{element}{rng.randint(1, 5)}" for element in elements)
+
+
+def corpus(seed=3, size=200):
+    rng = random.Random(seed)
+    return [
+        (material_id, random_formula(rng), round(rng.uniform(0, 100), 2), rng.choice(AVAILABILITY))
+        for material_id in range(1, size + 1)
+    ]
+
+
+def fraction_vector(formula, elements):
+    composition = parse_formula(formula)
+    total = sum(composition.values())
+    return np.array([composition.get(element, 0) / total for element in elements], dtype=np.float64)
+
+
+def brute_force(entries, formula, metric, cost_min=None, cost_max=None, availability=None, exclude_id=None):
+    """Distance to every entry passing the filters, by id"""
+    elements = sorted(set(ELEMENTS) | set(parse_formula(formula)))
+    q = fraction_vector(formula, elements)
+    distances = {}
+    for material_id, material_formula, cost, material_availability in entries:
+        if material_id == exclude_id:
+            continue
+        if cost_min is not None and cost < cost_min:
+            continue
+        if cost_max is not None and cost > cost_max:
+            continue
+        if availability is not None and material_availability.lower() != availability.strip().lower():
+            continue
+        x = fraction_vector(material_formula, elements)
+        if metric == "cosine":
+            distances[material_id] = 1.0 - float(x @ q) / (np.linalg.norm(x) * np.linalg.norm(q))
+        else:
+            distances[material_id] = float(np.abs(x - q).sum())
+    return distances
+
+
+def check(index, entries, formula, k, metric, **filters):
+    expected = brute_force(entries, formula, metric, **filters)
+    result = index.query(formula, k=k, metric=metric, **filters)
+
+    assert len(result) == min(k, len(expected))
+    # Each returned distance is right, and nothing left out is closer
+    for material_id, distance in result:
+        assert distance == pytest.approx(max(expected[material_id], 0.0), abs=1e-5)
+    assert [distance for _, distance in result] == sorted(distance for _, distance in result)
+    if result and len(expected) > k:
+        returned = {material_id for material_id, _ in result}
+        closest_left_out = min(distance for material_id, distance in expected.items() if material_id not in returned)
+        assert result[-1][1] <= closest_left_out + 1e-5
+
+
+@pytest.mark.parametrize("metric", CompositionIndex.METRICS)
+@pytest.mark.parametrize("formula", ["LiCoO2", "Fe2O3", "NaAlSi3O8", "Li", "Cu2O", "Au"])
+def test_matches_brute_force(metric, formula):
+    entries = corpus()
+    index = CompositionIndex(initial_capacity=16)
+    assert index.add_many(entries) == len(entries)
+    check(index, entries, formula, 10, metric)
+
+
+@pytest.mark.parametrize("metric", CompositionIndex.METRICS)
+def test_filters_match_brute_force(metric):
+    entries = corpus()
+    index = CompositionIndex()
+    index.add_many(entries)
+    check(index, entries, "LiFePO4", 7, metric, cost_min=20, cost_max=60)
+    check(index, entries, "LiFePO4", 7, metric, availability=" rare ")
+    check(index, entries, "LiFePO4", 500, metric, availability="Limited", exclude_id=5)
+    assert index.query("LiFePO4", availability="Unknown") == []
+
+
+def test_identical_composition_is_at_distance_zero():
+    index = CompositionIndex()
+    index.add_many([(1, "Fe2O3", 1.0, "Abundant"), (2, "Fe4O6", 1.0, "Abundant"), (3, "FeO", 1.0, "Abundant")])
+    for metric in CompositionIndex.METRICS:
+        result = dict(index.query("Fe2O3", k=3, metric=metric))
+        assert result[1] == pytest.approx(0.0, abs=1e-6)
+        assert result[2] == pytest.approx(0.0, abs=1e-6)
+        assert result[3] > 0
+    # No shared elements: maximum distance
+    assert dict(index.query("NaCl", k=3, metric="l1"))[1] == pytest.approx(2.0)
+    assert dict(index.query("NaCl", k=3, metric="cosine"))[1] == pytest.approx(1.0)
+
+
+def test_removed_rows_are_recycled():
+    entries = corpus(size=50)
+    index = CompositionIndex(initial_capacity=8)
+    index.add_many(entries)
+    size = index._size
+
+    removed = {material_id for material_id, *_ in entries[::3]}
+    for material_id in removed:
+        index.remove(material_id)
+    assert len(index) == 50 - len(removed)
+
+    rng = random.Random(11)
+    replacements = [(1000 + i, random_formula(rng), 1.0, "Abundant") for i in range(len(removed))]
+    index.add_many(replacements)
+    assert index._size == size
+    assert len(index) == 50
+
+    remaining = [entry for entry in entries if entry[0] not in removed] + replacements
+    for metric in CompositionIndex.METRICS:
+        check(index, remaining, "NiMnCoO2", 60, metric)
+
+
+def test_replacing_clears_the_old_composition():
+    index = CompositionIndex()
+    index.add(1, "Fe2O3", 1.0, "Abundant")
+    index.add(1, "NaCl", 2.0, "Rare")
+    assert len(index) == 1
+    assert dict(index.query("NaCl", k=1)) == {1: pytest.approx(0.0, abs=1e-6)}
+    assert index.query("Fe2O3", k=1, availability="Abundant") == []
+
+
+def test_prepare_then_add_prepared_matches_add_many():
+    entries = corpus(size=80) + [(999, "not a formula", 1.0, "Rare")]
+    direct = CompositionIndex()
+    assert direct.add_many(entries) == 80
+
+    prepared = CompositionIndex.prepare(entries)
+    assert prepared[-1] == (999, None, 1.0, "Rare")
+    staged = CompositionIndex()
+    assert staged.add_prepared(prepared) == 80
+
+    for metric in CompositionIndex.METRICS:
+        assert staged.query("LiMn2O4", k=15, metric=metric) == direct.query("LiMn2O4", k=15, metric=metric)
+
+
+def test_unparseable_entry_removes_an_existing_one():
+    index = CompositionIndex()
+    index.add(1, "Fe2O3", 1.0, "Abundant")
+    assert not index.add(1, "???", 1.0, "Abundant")
+    assert len(index) == 0
+
+
+def test_invalid_queries():
+    index = CompositionIndex()
+    index.add(1, "Fe2O3", 1.0, "Abundant")
+    with pytest.raises(ValueError):
+        index.query("Fe2O3", metric="euclidean")
+    with pytest.raises(FormulaParseError):
+        index.query("Fe2(O3")
+    assert index.query("Fe2O3", k=0) == []
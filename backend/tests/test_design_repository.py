@@ -0,0 +1,142 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.models.materials import MaterialDesignGoal, MaterialDesignResult, MaterialProperty
+from app.services.design_repository import DesignRepository, goal_hash
+from app.services.material_service import MaterialService
+
+
+def make_goal(name="Cathode", goal_type="new_material", band_gap=1.5, template_id=None):
+    return MaterialDesignGoal(
+        type=goal_type,
+        name=name,
+        description="A battery cathode",
+        target_properties=[MaterialProperty(name="band_gap", value=band_gap, unit="eV")],
+        material_constraints=["LiCoO2"],
+        template_id=template_id
+    )
+
+
+def make_result(design_id, created_at, goal=None):
+    goal = goal or make_goal(name=design_id)
+    return MaterialDesignResult(
+        design_id=design_id,
+        goal=goal,
+        properties=goal.target_properties,
+        materials_used=goal.material_constraints,
+        colab_code="print('hi')",
+        created_at=created_at
+    )
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = MaterialService(openai_service=None, upload_dir=str(tmp_path), storage_backend="json")
+    yield service
+    service.close()
+
+
+def test_goal_hash_is_canonical():
+    assert goal_hash(make_goal()) == goal_hash(MaterialDesignGoal(**make_goal().dict()))
+    # The template a goal came from doesn't change what is designed
+    assert goal_hash(make_goal(template_id="battery_material")) == goal_hash(make_goal())
+    assert goal_hash(make_goal(band_gap=3.5)) != goal_hash(make_goal())
+    assert goal_hash(make_goal(goal_type="catalyst")) != goal_hash(make_goal())
+
+
+def test_identical_goals_reuse_the_stored_design(service):
+    first = asyncio.run(service.design_material(make_goal()))
+    again = asyncio.run(service.design_material(make_goal(template_id="battery_material")))
+    other = asyncio.run(service.design_material(make_goal(band_gap=3.5)))
+
+    assert again.design_id == first.design_id
+    assert other.design_id != first.design_id
+    assert len(service.designs) == 2
+
+
+def test_concurrent_identical_goals_store_one_design(tmp_path):
+    repository = DesignRepository(str(tmp_path))
+    goal = make_goal()
+    barrier = threading.Barrier(8)
+    stored = []
+
+    def worker(index):
+        barrier.wait()
+        stored.append(repository.add_if_absent(make_result(f"d{index}", f"2026-01-01T00:00:0{index}", goal)))
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(repository) == 1
+    assert len({result.design_id for result in stored}) == 1
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+
+def test_oldest_design_wins_for_a_goal(tmp_path):
+    goal = make_goal()
+    repository = DesignRepository(str(tmp_path))
+    repository.add(make_result("newer", "2026-02-01T00:00:00", goal))
+    repository.add(make_result("older", "2026-01-01T00:00:00", goal))
+    assert repository.find_by_goal(goal).design_id == "older"
+    # Also after a restart
+    assert DesignRepository(str(tmp_path)).find_by_goal(goal).design_id == "older"
+
+
+def test_listing_is_newest_first_and_filtered_by_type(tmp_path):
+    repository = DesignRepository(str(tmp_path))
+    for index, goal_type in enumerate(["catalyst", "new_material", "catalyst", "new_material"]):
+        repository.add(make_result(f"d{index}", f"2026-01-0{index + 1}T00:00:00", make_goal(f"d{index}", goal_type)))
+
+    assert [summary.design_id for summary in repository.list()] == ["d3", "d2", "d1", "d0"]
+    assert [summary.design_id for summary in repository.list(goal_type="catalyst")] == ["d2", "d0"]
+    assert repository.list(goal_type="unknown") == []
+    assert [summary.design_id for summary in DesignRepository(str(tmp_path)).list()] == ["d3", "d2", "d1", "d0"]
+
+
+def test_cursor_paging_covers_every_design_once(service):
+    for index in range(7):
+        # Same timestamp for several designs: ties are broken by ID
+        service.designs.add(make_result(f"d{index}", f"2026-01-0{index // 3 + 1}T00:00:00"))
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = asyncio.run(service.list_designs(cursor=cursor, limit=3))
+        seen.extend(summary.design_id for summary in page)
+        if cursor is None:
+            break
+    assert seen == [summary.design_id for summary in service.designs.list()]
+    assert sorted(seen) == [f"d{index}" for index in range(7)]
+
+    with pytest.raises(ValueError):
+        asyncio.run(service.list_designs(cursor="garbage"))
+
+
+def test_missing_or_corrupt_files_are_dropped(tmp_path):
+    goal = make_goal()
+    repository = DesignRepository(str(tmp_path))
+    repository.add(make_result("gone", "2026-01-01T00:00:00", goal))
+    repository.add(make_result("broken", "2026-01-02T00:00:00", goal))
+    repository.add(make_result("fine", "2026-01-03T00:00:00", goal))
+
+    (tmp_path / "gone.json").unlink()
+    (tmp_path / "broken.json").write_text("{not json")
+
+    assert repository.get("gone") is None
+    assert [summary.design_id for summary in repository.list()] == ["fine", "broken"]
+    # The goal falls back to the next readable design
+    assert repository.find_by_goal(goal).design_id == "fine"
+    assert len(repository) == 1
+    assert repository.list(goal_type="new_material")[0].design_id == "fine"
+
+
+def test_get_design_returns_none_for_a_deleted_file(service):
+    result = asyncio.run(service.design_material(make_goal()))
+    (service.designs.designs_dir / f"{result.design_id}.json").unlink()
+    assert asyncio.run(service.get_design(result.design_id)) is None
+    # A new design is created for the goal
+    assert asyncio.run(service.design_material(make_goal())).design_id != result.design_id
@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from app.services.formula_parser import FormulaParseError, formula_elements, parse_formula, parse_formulas
+
+
+@pytest.mark.parametrize("formula, expected", [
+    ("NaCl", {"Na": 1.0, "Cl": 1.0}),
+    ("Fe2O3", {"Fe": 2.0, "O": 3.0}),
+    ("Ca3(PO4)2", {"Ca": 3.0, "P": 2.0, "O": 8.0}),
+    ("K4[Fe(CN)6]", {"K": 4.0, "Fe": 1.0, "C": 6.0, "N": 6.0}),
+    ("Li0.5CoO2", {"Li": 0.5, "Co": 1.0, "O": 2.0}),
+    ("CuSO4·5H2O", {"Cu": 1.0, "S": 1.0, "O": 9.0, "H": 10.0}),
+    ("CuSO4.5H2O", {"Cu": 1.0, "S": 1.0, "O": 9.0, "H": 10.0}),
+    ("CuSO4*5H2O", {"Cu": 1.0, "S": 1.0, "O": 9.0, "H": 10.0}),
+    ("  Si O2 ", {"Si": 1.0, "O": 2.0}),
+])
+def test_parse_formula(formula, expected):
+    assert parse_formula(formula) == pytest.approx(expected)
+
+
+def test_elements_in_order_of_first_appearance():
+    assert formula_elements("Ca3(PO4)2") == ["Ca", "P", "O"]
+    assert formula_elements("H2O") == ["H", "O"]
+
+
+@pytest.mark.parametrize("formula", ["", "   ", "Xx2", "Fe2O3)", "Ca3(PO4", "(Fe]", "NaCl!", "cu"])
+def test_invalid_formulas_raise(formula):
+    with pytest.raises(FormulaParseError):
+        parse_formula(formula)
+
+
+def test_parse_error_is_a_value_error():
+    assert issubclass(FormulaParseError, ValueError)
+
+
+def test_results_are_not_shared_between_callers():
+    first = parse_formula("Fe2O3")
+    first["Fe"] = 99.0
+    assert parse_formula("Fe2O3")["Fe"] == 2.0
+
+
+def test_parse_formulas_maps_invalid_to_none():
+    parsed = parse_formulas(pd.Series(["NaCl", "Xx", "NaCl", None]))
+    assert parsed.iloc[0] == {"Na": 1.0, "Cl": 1.0}
+    assert parsed.iloc[1] is None
+    assert parsed.iloc[2] == parsed.iloc[0]
+    assert parsed.iloc[3] is None
@@ -0,0 +1,127 @@
+import asyncio
+
+from app.services.history_manager import HistoryManager, TokenCounter, last_compaction
+
+
+def conversation(count, start=0):
+    """Alternating user and assistant messages of 14 tokens each"""
+    roles = ("user", "assistant")
+    return [{"role": roles[i % 2], "content": f"message {i:02d}".ljust(40, ".")} for i in range(start, start + count)]
+
+
+class FakeSummarizer:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, summary, messages):
+        self.calls.append((summary, [message["content"][:10] for message in messages]))
+        return f"summary {len(self.calls)}"
+
+
+def compact(manager, messages, conversation_id="c1"):
+    async def run():
+        compacted = await manager.compact(messages, conversation_id)
+        return compacted, last_compaction.get()
+    return asyncio.run(run())
+
+
+def make_manager(**kwargs):
+    summarizer = FakeSummarizer()
+    options = {"token_budget": 120, "keep_last_messages": 4, "summary_batch": 3, **kwargs}
+    return HistoryManager(summarizer, model="gpt-4o", **options), summarizer
+
+
+def test_token_counter_estimates_four_characters_per_token():
+    counter = TokenCounter("gpt-4o")
+    assert [counter.count_text(text) for text in ("", "abcd", "abcde")] == [0, 1, 2]
+    assert counter.count(conversation(2)) == 2 * (10 + 4)
+
+
+def test_history_within_budget_is_sent_as_is():
+    manager, summarizer = make_manager()
+    messages = conversation(8)
+
+    compacted, stats = compact(manager, messages)
+
+    assert compacted == messages
+    assert summarizer.calls == []
+    assert (stats.tokens_before, stats.tokens_after, stats.summarized_messages) == (112, 112, 0)
+
+
+def test_old_messages_are_summarized_and_recent_ones_kept():
+    manager, summarizer = make_manager()
+    messages = [{"role": "system", "content": "Be brief."}] + conversation(10)
+
+    compacted, stats = compact(manager, messages)
+
+    assert summarizer.calls == [(None, [f"message {i:02d}" for i in range(6)])]
+    assert compacted[0] == messages[0]
+    assert compacted[1] == {"role": "system", "content": "Summary of the earlier conversation:\nsummary 1"}
+    assert compacted[2:] == messages[-4:]
+    assert stats.tokens_before == 140 + 7
+    assert stats.tokens_after == manager.counter.count(compacted) <= manager.token_budget
+    assert (stats.messages_before, stats.messages_after, stats.summarized_messages) == (11, 6, 6)
+
+
+def test_summary_is_reused_and_extended_in_batches():
+    manager, summarizer = make_manager()
+    messages = conversation(10)
+    compact(manager, messages)
+
+    # Two more messages: fewer than a batch have left the window and the result fits
+    compacted, stats = compact(manager, messages + conversation(2, start=10))
+    assert len(summarizer.calls) == 1
+    assert compacted[0]["content"].endswith("summary 1")
+    assert compacted[1:] == conversation(6, start=6)
+    assert stats.summarized_messages == 6
+
+    # Two more again: the four messages out of the window now make a batch
+    compacted, stats = compact(manager, messages + conversation(4, start=10))
+    assert summarizer.calls[1] == ("summary 1", [f"message {i:02d}" for i in range(6, 10)])
+    assert compacted[0]["content"].endswith("summary 2")
+    assert compacted[1:] == conversation(4, start=10)
+    assert stats.summarized_messages == 10
+
+
+def test_summary_is_dropped_when_the_summarized_prefix_changes():
+    manager, summarizer = make_manager()
+    messages = conversation(10)
+    compact(manager, messages)
+
+    edited = [{"role": "user", "content": "an edited opening"}] + messages[1:]
+    compact(manager, edited)
+
+    assert len(summarizer.calls) == 2
+    assert summarizer.calls[1][0] is None
+    assert summarizer.calls[1][1][0] == "an edited "
+
+
+def test_conversations_without_an_id_are_keyed_by_their_opening_message():
+    manager, summarizer = make_manager()
+    compact(manager, conversation(10), conversation_id=None)
+    compact(manager, conversation(12), conversation_id=None)
+    assert len(summarizer.calls) == 1
+
+    compact(manager, [{"role": "user", "content": "another chat"}] + conversation(11, start=1), conversation_id=None)
+    assert len(summarizer.calls) == 2
+
+
+def test_small_batches_are_summarized_when_the_history_is_still_over_budget():
+    manager, summarizer = make_manager(token_budget=50, summary_batch=6)
+
+    compacted, stats = compact(manager, conversation(6))
+
+    assert summarizer.calls == [(None, ["message 00", "message 01"])]
+    assert compacted[1:] == conversation(4, start=2)
+    assert stats.summarized_messages == 2
+
+
+def test_cached_summaries_are_bounded():
+    manager, summarizer = make_manager(max_conversations=2)
+    for conversation_id in ("a", "b", "c"):
+        compact(manager, conversation(10), conversation_id)
+
+    compact(manager, conversation(10), "a")
+
+    assert len(summarizer.calls) == 4
+    assert list(manager._summaries) == ["c", "a"]
@@ -0,0 +1,137 @@
+import os
+import time
+import asyncio
+import threading
+
+import pytest
+
+from app.core.config import settings
+from app.models.materials import IngestionJobStatus
+from app.services.ingestion_jobs import IngestionJobManager
+from app.services.material_service import MaterialService
+
+
+def write_dataset(tmp_path, rows, name="dataset.csv"):
+    path = tmp_path / name
+    lines = ["Material,Formula,Cost,Availability"]
+    lines += [f"m{i},Fe2O3,{i}.5,Abundant" for i in range(rows)]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = MaterialService(openai_service=None, upload_dir=str(tmp_path / "uploads"), storage_backend="json")
+    yield service
+    service.close()
+
+
+@pytest.fixture
+def manager(service):
+    manager = IngestionJobManager(service, max_concurrent=1)
+    yield manager
+    manager.shutdown()
+
+
+def test_completed_job_reports_results_and_removes_the_file(tmp_path, manager, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_CHUNK_SIZE", 4)
+    path = write_dataset(tmp_path, 10)
+
+    job, future = manager.submit(path, "dataset.csv")
+    dataset = future.result(timeout=10)
+
+    state = manager.get(job.id)
+    assert state.status == IngestionJobStatus.COMPLETED
+    assert state.total_rows == 10
+    assert state.rows_processed == 10
+    assert state.rows_accepted == 10
+    assert state.eta_seconds == 0.0
+    assert state.metadata == dataset.metadata
+    assert state.started_at is not None and state.finished_at is not None
+    assert not os.path.exists(path)
+
+
+def test_progress_and_eta_are_updated_per_chunk(tmp_path, manager, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_CHUNK_SIZE", 3)
+    path = write_dataset(tmp_path, 9)
+    snapshots = []
+    original = manager._update_progress
+
+    def recording_update(job, stats):
+        original(job, stats)
+        snapshots.append(manager.get(job.id))
+
+    monkeypatch.setattr(manager, "_update_progress", recording_update)
+    _, future = manager.submit(path, "dataset.csv")
+    future.result(timeout=10)
+
+    assert [snapshot.rows_processed for snapshot in snapshots] == [3, 6, 9]
+    assert all(snapshot.status == IngestionJobStatus.RUNNING for snapshot in snapshots)
+    assert snapshots[0].eta_seconds is not None and snapshots[0].eta_seconds >= 0
+    assert snapshots[-1].eta_seconds == 0.0
+
+
+def test_failed_job_records_the_error_and_removes_the_file(tmp_path, manager):
+    path = tmp_path / "bad.csv"
+    path.write_text("Name,Cost\nx,1\n")
+
+    job, future = manager.submit(str(path), "bad.csv")
+    with pytest.raises(Exception, match="Missing required columns"):
+        future.result(timeout=10)
+
+    state = manager.get(job.id)
+    assert state.status == IngestionJobStatus.FAILED
+    assert "Missing required columns" in state.error
+    assert state.eta_seconds is None
+    assert state.finished_at is not None
+    assert not path.exists()
+
+
+def test_run_waits_for_the_result(tmp_path, manager):
+    dataset = asyncio.run(manager.run(write_dataset(tmp_path, 3), "dataset.csv"))
+    assert dataset.report.accepted_rows == 3
+
+
+def test_queued_jobs_wait_for_a_worker(tmp_path, service, monkeypatch):
+    manager = IngestionJobManager(service, max_concurrent=1)
+    release = threading.Event()
+    original = service.ingest_dataset
+
+    def blocking_ingest(*args, **kwargs):
+        release.wait(10)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(service, "ingest_dataset", blocking_ingest)
+    first, first_future = manager.submit(write_dataset(tmp_path, 2, "a.csv"), "a.csv")
+    second, second_future = manager.submit(write_dataset(tmp_path, 2, "b.csv"), "b.csv")
+    assert manager.get(second.id).status == IngestionJobStatus.QUEUED
+
+    release.set()
+    first_future.result(timeout=10)
+    second_future.result(timeout=10)
+    assert manager.get(second.id).status == IngestionJobStatus.COMPLETED
+    manager.shutdown()
+
+
+def test_finished_jobs_are_pruned_after_retention(tmp_path, service, monkeypatch):
+    manager = IngestionJobManager(service, retention_seconds=60)
+    job, future = manager.submit(write_dataset(tmp_path, 2, "a.csv"), "a.csv")
+    future.result(timeout=10)
+
+    # Still within the retention period
+    _, future = manager.submit(write_dataset(tmp_path, 2, "b.csv"), "b.csv")
+    future.result(timeout=10)
+    assert manager.get(job.id) is not None
+
+    now = time.monotonic()
+    monkeypatch.setattr("app.services.ingestion_jobs.time.monotonic", lambda: now + 61)
+    manager.submit(write_dataset(tmp_path, 2, "c.csv"), "c.csv")[1].result(timeout=10)
+    assert manager.get(job.id) is None
+    manager.shutdown()
+
+
+def test_count_data_rows(tmp_path):
+    path = tmp_path / "rows.csv"
+    path.write_bytes(b"a,b\n1,2\n3,4")
+    assert IngestionJobManager._count_data_rows(str(path)) == 2
+    assert IngestionJobManager._count_data_rows(str(tmp_path / "missing.csv")) is None
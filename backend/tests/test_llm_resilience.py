@@ -0,0 +1,213 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from app.services.llm_resilience import CircuitBreaker, ResilientCaller, TokenBucket, UpstreamUnavailableError
+
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def connection_error():
+    return openai.APIConnectionError(request=REQUEST)
+
+
+def status_error(status_code, headers=None):
+    response = httpx.Response(status_code, headers=headers, request=REQUEST)
+    return openai.APIStatusError("error", response=response, body=None)
+
+
+def flaky(failures, result="ok"):
+    """Async callable raising the given errors in turn, then returning `result`"""
+    failures = list(failures)
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        if failures:
+            raise failures.pop(0)
+        return result
+
+    return fn, calls
+
+
+def make_caller(**kwargs):
+    kwargs.setdefault("base_delay", 0.0)
+    kwargs.setdefault("max_delay", 0.0)
+    return ResilientCaller(**kwargs)
+
+
+def test_retries_transient_errors_then_succeeds():
+    caller = make_caller(max_retries=3)
+    fn, calls = flaky([connection_error(), status_error(503)])
+
+    assert asyncio.run(caller.call(fn)) == "ok"
+    assert len(calls) == 3
+    assert caller.retries == 2
+    assert caller.breaker.state == "closed"
+    assert caller.breaker.consecutive_failures == 0
+
+
+def test_exhausted_retries_raise_upstream_unavailable():
+    caller = make_caller(max_retries=2, failure_threshold=10)
+    fn, calls = flaky([connection_error()] * 5)
+
+    with pytest.raises(UpstreamUnavailableError):
+        asyncio.run(caller.call(fn))
+    assert len(calls) == 3
+    assert caller.failures == 1
+
+
+def test_non_retryable_errors_are_raised_unchanged():
+    caller = make_caller(max_retries=3)
+    fn, calls = flaky([status_error(400)])
+
+    with pytest.raises(openai.APIStatusError):
+        asyncio.run(caller.call(fn))
+    assert len(calls) == 1
+    assert caller.breaker.consecutive_failures == 0
+
+
+def test_retry_after_header_is_reported():
+    caller = make_caller(max_retries=0, failure_threshold=10)
+    fn, _ = flaky([status_error(429, {"retry-after": "7"})])
+
+    with pytest.raises(UpstreamUnavailableError) as info:
+        asyncio.run(caller.call(fn))
+    assert info.value.retry_after == 7.0
+
+
+def test_retry_after_within_max_delay_is_waited_for(monkeypatch):
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    caller = make_caller(max_retries=3, max_delay=5.0)
+    fn, calls = flaky([status_error(429, {"retry-after": "2"})])
+
+    assert asyncio.run(caller.call(fn)) == "ok"
+    assert len(calls) == 2
+    assert sleeps == [2.0]
+
+
+def test_retry_after_beyond_max_delay_fails_without_waiting(monkeypatch):
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    caller = make_caller(max_retries=3, max_delay=5.0, failure_threshold=10)
+    fn, calls = flaky([status_error(429, {"retry-after": "120"})])
+
+    with pytest.raises(UpstreamUnavailableError) as info:
+        asyncio.run(caller.call(fn))
+    assert info.value.retry_after == 120.0
+    assert len(calls) == 1
+    assert sleeps == []
+    assert caller.failures == 1
+
+
+def test_breaker_opens_rejects_and_recovers(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("app.services.llm_resilience.time.monotonic", lambda: clock[0])
+
+    caller = make_caller(max_retries=0, failure_threshold=2, reset_seconds=30.0)
+    for _ in range(2):
+        fn, _ = flaky([connection_error()])
+        with pytest.raises(UpstreamUnavailableError):
+            asyncio.run(caller.call(fn))
+    assert caller.breaker.state == "open"
+
+    fn, calls = flaky([])
+    with pytest.raises(UpstreamUnavailableError) as info:
+        asyncio.run(caller.call(fn))
+    assert not calls
+    assert caller.rejected == 1
+    assert info.value.retry_after == pytest.approx(30.0)
+
+    # After the cool-down one probe goes through and closes the circuit
+    clock[0] += 30.0
+    assert caller.breaker.state == "half_open"
+    assert asyncio.run(caller.call(fn)) == "ok"
+    assert caller.breaker.state == "closed"
+
+
+def test_failed_probe_reopens_circuit(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("app.services.llm_resilience.time.monotonic", lambda: clock[0])
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10.0)
+    breaker.record_failure()
+    clock[0] += 10.0
+    breaker.before_call()
+    # Only one probe at a time
+    with pytest.raises(UpstreamUnavailableError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.times_opened == 2
+
+
+def test_token_bucket_waits_for_capacity(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("app.services.llm_resilience.time.monotonic", lambda: clock[0])
+
+    async def fake_sleep(delay):
+        clock[0] += delay
+
+    monkeypatch.setattr("app.services.llm_resilience.asyncio.sleep", fake_sleep)
+
+    bucket = TokenBucket(per_minute=60)
+    assert asyncio.run(bucket.acquire(60)) == 0.0
+    # Refills at one token per second
+    assert asyncio.run(bucket.acquire(30)) == pytest.approx(30.0)
+    # Larger than the bucket: waits for a full bucket only
+    assert asyncio.run(bucket.acquire(1000)) == pytest.approx(60.0)
+
+
+def test_actual_usage_adjusts_token_budget():
+    caller = make_caller(tokens_per_minute=1000)
+    fn, _ = flaky([], result=300)
+
+    asyncio.run(caller.call(fn, estimated_tokens=100, actual_tokens=lambda used: used))
+    assert caller.token_bucket.tokens == pytest.approx(700, abs=1)
+
+
+def test_failed_attempts_refund_estimated_tokens():
+    caller = make_caller(max_retries=2, failure_threshold=10, tokens_per_minute=1000, requests_per_minute=100)
+    fn, _ = flaky([connection_error()] * 5)
+
+    with pytest.raises(UpstreamUnavailableError):
+        asyncio.run(caller.call(fn, estimated_tokens=400))
+    assert caller.token_bucket.tokens == pytest.approx(1000, abs=1)
+    # The attempts were sent, so they still count against the request budget
+    assert caller.request_bucket.tokens == pytest.approx(97, abs=0.1)
+
+
+def test_non_retryable_failure_refunds_estimated_tokens():
+    caller = make_caller(tokens_per_minute=1000)
+    fn, _ = flaky([status_error(400)])
+
+    with pytest.raises(openai.APIStatusError):
+        asyncio.run(caller.call(fn, estimated_tokens=400))
+    assert caller.token_bucket.tokens == pytest.approx(1000, abs=1)
+
+
+def test_breaker_rejection_refunds_both_budgets():
+    caller = make_caller(max_retries=0, failure_threshold=1, tokens_per_minute=1000, requests_per_minute=100)
+    fn, _ = flaky([connection_error()])
+    with pytest.raises(UpstreamUnavailableError):
+        asyncio.run(caller.call(fn, estimated_tokens=400))
+    assert caller.breaker.state == "open"
+
+    for _ in range(5):
+        with pytest.raises(UpstreamUnavailableError):
+            asyncio.run(caller.call(fn, estimated_tokens=400))
+    assert caller.rejected == 5
+    assert caller.token_bucket.tokens == pytest.approx(1000, abs=1)
+    assert caller.request_bucket.tokens == pytest.approx(99, abs=0.1)
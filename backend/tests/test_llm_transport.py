@@ -0,0 +1,147 @@
+import json
+import random
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.llm_transport import (
+    RecordingTransport,
+    ReplayTransport,
+    create_llm_transport,
+    request_key
+)
+
+
+URL = "https://api.openai.com/v1/chat/completions"
+
+
+def upstream(request):
+    """A fake provider answering with the request's prompt"""
+    payload = json.loads(request.content)
+    if payload.get("stream"):
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=b"data: hi\n\ndata: [DONE]\n\n")
+    return httpx.Response(200, json={"echo": payload["messages"][0]["content"]}, headers={"x-request-id": "req-1"})
+
+
+async def post(transport, payload):
+    async with httpx.AsyncClient(transport=transport) as client:
+        response = await client.post(URL, json=payload)
+        return response.status_code, response.content
+
+
+def record(path, *payloads):
+    transport = RecordingTransport(httpx.MockTransport(upstream), str(path))
+    return [asyncio.run(post(transport, payload)) for payload in payloads], transport
+
+
+def prompt(text, **extra):
+    return {"model": "gpt-4o", "messages": [{"role": "user", "content": text}], **extra}
+
+
+def test_request_key_ignores_json_formatting():
+    compact = b'{"b":1,"a":[1,2]}'
+    spaced = b'{ "a": [1, 2], "b": 1 }'
+    assert request_key("POST", "/v1/x", compact) == request_key("POST", "/v1/x", spaced)
+    assert request_key("POST", "/v1/x", compact) != request_key("POST", "/v1/y", compact)
+
+
+def test_recording_keeps_the_exchange(tmp_path):
+    path = tmp_path / "cassettes" / "chat.jsonl"
+    responses, transport = record(path, prompt("one"))
+
+    assert responses == [(200, b'{"echo":"one"}')]
+    assert transport.stats()["recorded"] == 1
+    line = json.loads(path.read_text())
+    assert line["key"] == request_key("POST", "/v1/chat/completions", json.dumps(prompt("one")).encode())
+    assert line["request"] == prompt("one")
+    assert line["headers"] == {"content-type": "application/json", "x-request-id": "req-1"}
+    assert line["chunks"][-1][1] == len(line["body"])
+
+
+def test_replay_serves_the_recorded_response(tmp_path):
+    path = tmp_path / "chat.jsonl"
+    recorded, _ = record(path, prompt("one"), prompt("two"), prompt("streamed", stream=True))
+
+    replay = ReplayTransport(str(path), latency="none")
+    replayed = [asyncio.run(post(replay, payload)) for payload in (prompt("one"), prompt("two"), prompt("streamed", stream=True))]
+
+    assert replayed == recorded
+    assert replay.stats()["matched"] == 3
+
+
+def test_repeated_requests_cycle_through_their_recordings(tmp_path):
+    path = tmp_path / "chat.jsonl"
+    record(path, prompt("one"))
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    second = dict(lines[0], body='{"echo":"again"}', chunks=[[0.0, 16]])
+    path.write_text("\n".join(json.dumps(line) for line in (lines[0], second)) + "\n")
+
+    replay = ReplayTransport(str(path), latency="none")
+    bodies = [asyncio.run(post(replay, prompt("one")))[1] for _ in range(3)]
+
+    assert bodies == [b'{"echo":"one"}', b'{"echo":"again"}', b'{"echo":"one"}']
+
+
+def test_unmatched_requests_get_a_recording_of_the_same_kind(tmp_path):
+    path = tmp_path / "chat.jsonl"
+    record(path, prompt("one"), prompt("streamed", stream=True))
+
+    replay = ReplayTransport(str(path), latency="none")
+    assert asyncio.run(post(replay, prompt("unseen"))) == (200, b'{"echo":"one"}')
+    assert asyncio.run(post(replay, prompt("unseen", stream=True)))[1].endswith(b"[DONE]\n\n")
+    assert replay.stats()["substituted"] == 2
+
+
+def test_strict_replay_misses_unmatched_requests(tmp_path):
+    path = tmp_path / "chat.jsonl"
+    record(path, prompt("one"))
+
+    replay = ReplayTransport(str(path), latency="none", strict=True)
+    status, body = asyncio.run(post(replay, prompt("unseen")))
+
+    assert status == 404
+    assert json.loads(body)["error"]["type"] == "replay_miss"
+    assert replay.stats()["missed"] == 1
+
+
+def test_missing_cassette_replays_nothing(tmp_path):
+    replay = ReplayTransport(str(tmp_path / "missing.jsonl"), latency="none")
+    assert asyncio.run(post(replay, prompt("one")))[0] == 404
+    assert replay.stats()["recordings"] == 0
+
+
+def test_recorded_pacing_is_relative_to_the_previous_chunk():
+    replay = ReplayTransport("unused.jsonl")
+    record_ = {"elapsed": 0.2, "chunks": [[0.25, 10], [0.4, 20], [0.35, 30]]}
+
+    delays = replay._chunk_delays(record_, random.Random(0))
+
+    assert [end for _, end in delays] == [10, 20, 30]
+    assert [round(delay, 4) for delay, _ in delays] == [0.05, 0.15, 0.0]
+
+
+def test_random_latency_repeats_for_the_same_seed():
+    record_ = {"elapsed": 0.0, "chunks": [[0.0, 10], [0.0, 20]]}
+    first = ReplayTransport("unused.jsonl", latency="lognormal", chunk_interval=0.05, seed=7)
+    second = ReplayTransport("unused.jsonl", latency="lognormal", chunk_interval=0.05, seed=7)
+
+    def draws(replay):
+        rng = random.Random(f"{replay.seed}:key:0")
+        return replay._headers_delay(record_, rng), replay._chunk_delays(record_, rng)
+
+    assert draws(first) == draws(second)
+    headers_delay, chunk_delays = draws(first)
+    assert headers_delay > 0
+    assert chunk_delays[0][0] == 0.0 and 0.025 <= chunk_delays[1][0] <= 0.075
+
+
+def test_create_llm_transport(tmp_path):
+    path = str(tmp_path / "chat.jsonl")
+    assert create_llm_transport("live", path) is None
+    assert isinstance(create_llm_transport("record", path), RecordingTransport)
+    assert isinstance(create_llm_transport("replay", path, latency="none"), ReplayTransport)
+    with pytest.raises(ValueError):
+        create_llm_transport("mirror", path)
+    with pytest.raises(ValueError):
+        create_llm_transport("replay", path, latency="instant")
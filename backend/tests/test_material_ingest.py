@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services.material_ingest import IngestionStats, build_materials, iter_csv_chunks, validate_chunk
+from app.services.material_service import MaterialService
+
+
+CSV = """Material,Formula,Cost,Availability,Notes
+Iron oxide,Fe2O3,1.5,Abundant,red
+ Salt ,NaCl, 0.2 ,Abundant,
+Nameless,Fe2O3,1.0,Rare,
+,SiO2,1.0,Rare,
+Quartz,,1.0,Rare,
+Quartz,SiO2,1.0,,
+Quartz,SiO2,cheap,Rare,
+Quartz,SiO2,-3,Rare,
+Gibberish,Xx9,2.0,Rare,
+Lithium cobalt oxide,LiCoO2,30,Limited,
+"""
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = tmp_path / "dataset.csv"
+    path.write_text(CSV)
+    return str(path)
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = MaterialService(openai_service=None, upload_dir=str(tmp_path / "uploads"), storage_backend="json")
+    yield service
+    service.close()
+
+
+def test_validate_chunk_reports_first_failing_check(dataset):
+    chunk = next(iter_csv_chunks(dataset, 100))
+    valid, rejected = validate_chunk(chunk)
+
+    assert valid["Material"].tolist() == ["Iron oxide", "Salt", "Nameless", "Gibberish", "Lithium cobalt oxide"]
+    assert valid["Cost"].tolist() == [1.5, 0.2, 1.0, 2.0, 30.0]
+    assert rejected == [
+        (5, "Missing material name"),
+        (6, "Missing formula"),
+        (7, "Missing availability"),
+        (8, "Invalid cost 'cheap'"),
+        (9, "Negative cost -3.0")
+    ]
+
+
+def test_build_materials_matches_row_by_row_construction(dataset, service):
+    valid, _ = validate_chunk(next(iter_csv_chunks(dataset, 100)))
+    materials, rejected = build_materials(valid, service._extract_elements_batch)
+
+    assert rejected == [(10, "Could not parse formula 'Xx9'")]
+    expected = [
+        (row["Material"], row["Formula"], row["Cost"], row["Availability"],
+         service._extract_elements_from_formula(row["Formula"]))
+        for _, row in valid.iterrows() if row["Formula"] != "Xx9"
+    ]
+    assert [
+        (material.name, material.formula, material.cost, material.availability, material.elements)
+        for material in materials
+    ] == expected
+    assert all(material.id == 0 for material in materials)
+
+
+def test_missing_columns_are_rejected_before_reading(tmp_path):
+    path = tmp_path / "bad.csv"
+    path.write_text("Material,Formula\n")
+    with pytest.raises(ValueError, match="Missing required columns: Cost, Availability"):
+        next(iter_csv_chunks(str(path), 100))
+
+
+def test_ingest_dataset_across_chunks(dataset, service, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_CHUNK_SIZE", 3)
+    progress = []
+    result = service.ingest_dataset(dataset, progress_callback=lambda stats: progress.append(stats.total_rows))
+
+    assert progress == [3, 6, 9, 10]
+    assert result.report.total_rows == 10
+    assert result.report.accepted_rows == 4
+    assert result.report.rejected_rows == 6
+    assert [row.line for row in result.report.rejected] == [5, 6, 7, 8, 9, 10]
+
+    # IDs are assigned in file order and the materials are queryable and persisted
+    assert [material.id for material in result.materials] == [1, 2, 3, 4]
+    assert [material.name for material in asyncio.run(service.get_materials())] == [
+        "Iron oxide", "Salt", "Nameless", "Lithium cobalt oxide"
+    ]
+    assert len(asyncio.run(service.find_similar(1, k=3))) == 3
+    reopened = MaterialService(openai_service=None, upload_dir=service.upload_dir, storage_backend="json")
+    assert len(reopened.store) == 4
+    reopened.close()
+
+
+def test_ingest_dataset_wraps_errors(tmp_path, service):
+    path = tmp_path / "bad.csv"
+    path.write_text("Name,Cost\nx,1\n")
+    with pytest.raises(Exception, match="Error processing dataset: Missing required columns"):
+        service.ingest_dataset(str(path))
+
+
+def test_reported_errors_are_truncated():
+    stats = IngestionStats(max_reported_errors=2)
+    stats.reject([(2, "a"), (3, "b")])
+    stats.reject([(4, "c")])
+    assert stats.rejected_rows == 3
+    assert [row.line for row in stats.rejected] == [2, 3]
@@ -0,0 +1,220 @@
+import os
+import time
+import asyncio
+
+import pytest
+
+from app.models.materials import Material, MaterialCreate, MaterialUpdate
+from app.services.material_journal import JournaledMaterialStorage, JournalWriteError
+from app.services.material_service import MaterialService
+from app.services.material_storage import SqliteMaterialStorage
+from app.services.material_store import MaterialStore
+
+
+def make_material(material_id, cost=1.0):
+    return Material(
+        id=material_id,
+        name=f"Material {material_id}",
+        formula="NaCl",
+        cost=cost,
+        availability="Abundant",
+        elements=["Na", "Cl"]
+    )
+
+
+def open_journal(tmp_path):
+    journal = JournaledMaterialStorage(
+        SqliteMaterialStorage(str(tmp_path / "materials.db")),
+        str(tmp_path / "materials.journal"),
+        fsync_interval=0.01,
+        compact_interval=3600
+    )
+    store = MaterialStore()
+    next_id = journal.load(store)
+    return journal, store, next_id
+
+
+def snapshot_ids(tmp_path):
+    """IDs in the SQLite snapshot, without the journal"""
+    storage = SqliteMaterialStorage(str(tmp_path / "materials.db"))
+    store = MaterialStore()
+    storage.load(store)
+    storage.close()
+    return sorted(material.id for material in store.all())
+
+
+def crash(journal):
+    """Stop the flusher the way a killed process would: no final flush or compaction"""
+    with journal._condition:
+        journal._closed = True
+        journal._condition.notify()
+    journal._flusher.join()
+    journal._file.close()
+    journal.storage.close()
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return tmp_path / "materials.journal"
+
+
+def test_flushed_changes_survive_a_crash(tmp_path, journal_path):
+    journal, _, _ = open_journal(tmp_path)
+    journal.save_many([make_material(1), make_material(2), make_material(3)])
+    journal.save_many([make_material(2, cost=9.0)])
+    journal.delete_many([3])
+    journal.flush()
+    assert os.path.getsize(journal_path) > 0
+    crash(journal)
+
+    journal, store, next_id = open_journal(tmp_path)
+    try:
+        assert sorted(material.id for material in store.all()) == [1, 2]
+        assert store.get(2).cost == 9.0
+        assert next_id == 3
+        # Replayed records are folded into the snapshot and the journal starts empty
+        assert os.path.getsize(journal_path) == 0
+    finally:
+        journal.close()
+
+    assert snapshot_ids(tmp_path) == [1, 2]
+
+
+def test_close_compacts_into_the_snapshot(tmp_path, journal_path):
+    journal, _, _ = open_journal(tmp_path)
+    journal.save_many([make_material(1), make_material(2)])
+    journal.delete_many([1])
+    journal.close()
+
+    assert os.path.getsize(journal_path) == 0
+    assert snapshot_ids(tmp_path) == [2]
+
+
+def test_compaction_keeps_changes_queued_after_it(tmp_path):
+    journal, _, _ = open_journal(tmp_path)
+    journal.save_many([make_material(1)])
+    journal.flush()
+    journal._compact()
+    journal.save_many([make_material(2)])
+    journal.flush()
+    crash(journal)
+
+    journal, store, _ = open_journal(tmp_path)
+    try:
+        assert sorted(material.id for material in store.all()) == [1, 2]
+    finally:
+        journal.close()
+
+
+def test_torn_final_record_is_skipped(tmp_path, journal_path):
+    journal, _, _ = open_journal(tmp_path)
+    journal.save_many([make_material(1), make_material(2)])
+    journal.flush()
+    crash(journal)
+    with open(journal_path, "a") as f:
+        f.write('{"op": "put", "material": {"id": 3, "na')
+
+    journal, store, _ = open_journal(tmp_path)
+    try:
+        assert sorted(material.id for material in store.all()) == [1, 2]
+    finally:
+        journal.close()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_failing_writes_back_off_and_refuse_new_writes(tmp_path):
+    journal, _, _ = open_journal(tmp_path)
+    journal.retry_delay = journal.max_retry_delay = 0.05
+    journal.max_write_failures = 3
+
+    original_write = journal._write
+    disk = {"full": True, "attempts": 0}
+
+    def flaky_write(records):
+        if records and disk["full"]:
+            disk["attempts"] += 1
+            raise OSError(28, "No space left on device")
+        original_write(records)
+
+    journal._write = flaky_write
+    journal.save_many([make_material(1)])
+    wait_for(lambda: journal.failing)
+    assert "No space left" in journal.last_error
+
+    # Retries are paced by the backoff instead of spinning
+    attempts = disk["attempts"]
+    time.sleep(0.3)
+    assert disk["attempts"] - attempts <= 8
+
+    with pytest.raises(JournalWriteError):
+        journal.save_many([make_material(2)])
+    with pytest.raises(JournalWriteError):
+        journal.delete_many([1])
+
+    # Once the disk recovers the queued record is written and writes are accepted again
+    disk["full"] = False
+    wait_for(lambda: not journal.failing)
+    assert journal.last_error is None
+    journal.save_many([make_material(2)])
+    journal.flush()
+    crash(journal)
+
+    journal, store, _ = open_journal(tmp_path)
+    try:
+        assert sorted(material.id for material in store.all()) == [1, 2]
+    finally:
+        journal.close()
+
+
+def test_close_is_not_delayed_by_backoff(tmp_path):
+    journal, _, _ = open_journal(tmp_path)
+    journal.retry_delay = journal.max_retry_delay = 60.0
+    original_write = journal._write
+    failures = {"left": 1}
+
+    def fail_once(records):
+        if records and failures["left"]:
+            failures["left"] -= 1
+            raise OSError("I/O error")
+        original_write(records)
+
+    journal._write = fail_once
+    journal.save_many([make_material(1)])
+    wait_for(lambda: failures["left"] == 0)
+
+    started = time.monotonic()
+    journal.close()
+    assert time.monotonic() - started < 5
+    assert snapshot_ids(tmp_path) == [1]
+
+
+def test_refused_writes_leave_the_service_unchanged(tmp_path):
+    service = MaterialService(openai_service=None, upload_dir=str(tmp_path), storage_backend="sqlite", journal=True)
+    try:
+        material = asyncio.run(service.create_material(
+            MaterialCreate(name="Hematite", formula="Fe2O3", cost=1.0, availability="Abundant")
+        ))
+        service.storage._write_failures = service.storage.max_write_failures
+        service.storage.last_error = "disk full"
+
+        with pytest.raises(JournalWriteError):
+            asyncio.run(service.create_material(
+                MaterialCreate(name="Salt", formula="NaCl", cost=1.0, availability="Abundant")
+            ))
+        with pytest.raises(JournalWriteError):
+            asyncio.run(service.update_material(material.id, MaterialUpdate(cost=5.0)))
+        with pytest.raises(JournalWriteError):
+            asyncio.run(service.delete_material(material.id))
+
+        assert [m.id for m in asyncio.run(service.get_materials())] == [material.id]
+        assert asyncio.run(service.get_material(material.id)).cost == 1.0
+        assert len(service.similarity_index) == 1
+    finally:
+        service.storage._write_failures = 0
+        service.close()
@@ -0,0 +1,96 @@
+import json
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.pagination import encode_cursor
+from app.models.materials import MaterialCreate
+from app.core.dependencies import get_material_service
+from app.routers import materials
+from app.services.material_service import MaterialService
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = MaterialService(openai_service=None, upload_dir=str(tmp_path), storage_backend="json")
+    for i in range(25):
+        availability = "Rare" if i % 2 else "Abundant"
+        asyncio.run(service.create_material(
+            MaterialCreate(name=f"m{i}", formula="Fe2O3", cost=float(i), availability=availability)
+        ))
+    yield service
+    service.close()
+
+
+def test_cursor_pages_cover_every_match_once(service):
+    seen, cursor = [], None
+    while True:
+        page, cursor = asyncio.run(service.get_materials_page(cursor=cursor, limit=4, availability="rare"))
+        seen.extend(material.id for material in page)
+        if cursor is None:
+            break
+
+    assert seen == [material.id for material in asyncio.run(service.get_materials(availability="rare"))]
+    assert len(seen) == 12
+
+
+def test_last_full_page_has_a_cursor_to_an_empty_page(service):
+    page, cursor = asyncio.run(service.get_materials_page(limit=25))
+    assert len(page) == 25 and cursor is not None
+
+    page, cursor = asyncio.run(service.get_materials_page(cursor=cursor, limit=25))
+    assert page == [] and cursor is None
+
+
+def test_iter_materials_streams_in_batches(service):
+    ids = [material.id for material in service.iter_materials(cost_min=5.0, batch_size=3)]
+    assert ids == sorted(ids)
+    assert len(ids) == 20
+
+
+@pytest.mark.parametrize("cursor", ["garbage", encode_cursor({"after": "1"})])
+def test_invalid_cursor_raises_value_error(service, cursor):
+    with pytest.raises(ValueError):
+        asyncio.run(service.get_materials_page(cursor=cursor))
+
+
+def test_iter_materials_checks_the_cursor_before_scanning(service, monkeypatch):
+    def fail_scan(*args, **kwargs):
+        raise AssertionError("scanned before the cursor was checked")
+
+    monkeypatch.setattr(service.store, "scan", fail_scan)
+    with pytest.raises(ValueError):
+        service.iter_materials(cursor="not-a-cursor")
+    with pytest.raises(ValueError):
+        service.iter_materials(cursor=encode_cursor({"after": "x"}))
+    # Nothing is read until the iterator is consumed
+    service.iter_materials(cost_min=5.0)
+
+
+def make_client(service):
+    app = FastAPI()
+    app.include_router(materials.router, prefix="/api/materials")
+    app.dependency_overrides[get_material_service] = lambda: service
+    return TestClient(app)
+
+
+def test_ndjson_listing_streams_every_match(service):
+    client = make_client(service)
+    response = client.get("/api/materials/", params={"cost_min": 20}, headers={"Accept": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["cost"] for line in lines] == [20.0, 21.0, 22.0, 23.0, 24.0]
+
+    empty = client.get("/api/materials/", params={"cost_min": 1000}, headers={"Accept": "application/x-ndjson"})
+    assert empty.status_code == 200
+    assert empty.text == ""
+
+
+def test_ndjson_listing_rejects_a_bad_cursor(service):
+    response = make_client(service).get(
+        "/api/materials/", params={"cursor": "garbage"}, headers={"Accept": "application/x-ndjson"}
+    )
+    assert response.status_code == 400
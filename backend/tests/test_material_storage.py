@@ -0,0 +1,136 @@
+import json
+import sqlite3
+
+import pytest
+
+from app.models.materials import Material
+from app.services.material_storage import (
+    JsonMaterialStorage,
+    SqliteMaterialStorage,
+    create_material_storage
+)
+from app.services.material_store import MaterialStore
+
+
+def make_material(material_id, cost=1.0, availability="Abundant"):
+    return Material(
+        id=material_id,
+        name=f"Material {material_id}",
+        formula="LiFePO4",
+        cost=cost,
+        availability=availability,
+        elements=["Li", "Fe", "P", "O"]
+    )
+
+
+def load(storage):
+    store = MaterialStore()
+    next_id = storage.load(store)
+    return store, next_id
+
+
+def write_json(directory, material):
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / f"{material.id}.json", "w") as f:
+        json.dump(material.dict(), f)
+
+
+def test_sqlite_round_trip(tmp_path):
+    storage = SqliteMaterialStorage(str(tmp_path / "materials.db"))
+    storage.save_many([make_material(1, 2.5), make_material(7, 0.5, "Rare")])
+    storage.save(make_material(1, 3.0))
+    storage.close()
+
+    reopened = SqliteMaterialStorage(str(tmp_path / "materials.db"))
+    store, next_id = load(reopened)
+    assert next_id == 8
+    assert store.get(1) == make_material(1, 3.0)
+    assert store.get(7) == make_material(7, 0.5, "Rare")
+    reopened.close()
+
+
+def test_sqlite_delete_and_empty_database(tmp_path):
+    storage = SqliteMaterialStorage(str(tmp_path / "materials.db"))
+    storage.save_many([make_material(1), make_material(2)])
+    storage.delete(2)
+    storage.delete_many([])
+    store, next_id = load(storage)
+    assert [material.id for material in store.all()] == [1]
+    assert next_id == 2
+
+    storage.delete(1)
+    store, next_id = load(storage)
+    assert len(store) == 0
+    assert next_id == 1
+    storage.close()
+
+
+def test_sqlite_bulk_save(tmp_path):
+    storage = SqliteMaterialStorage(str(tmp_path / "materials.db"))
+    storage.save_bulk(make_material(material_id) for material_id in range(1, 501))
+    store, next_id = load(storage)
+    assert len(store) == 500
+    assert next_id == 501
+    storage.close()
+
+
+def test_json_migration_imports_once(tmp_path):
+    json_dir = tmp_path / "materials"
+    write_json(json_dir, make_material(3, 1.5))
+    write_json(json_dir, make_material(5, 4.0))
+    (json_dir / "broken.json").write_text("{not json")
+
+    db_path = str(tmp_path / "materials.db")
+    storage = SqliteMaterialStorage(db_path, legacy_json_dir=str(json_dir))
+    store, next_id = load(storage)
+    assert sorted(material.id for material in store.all()) == [3, 5]
+    assert store.get(3) == make_material(3, 1.5)
+    assert next_id == 6
+
+    # Changes after the migration are not undone by the JSON files
+    storage.delete(3)
+    storage.close()
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone() == ("2",)
+    conn.close()
+
+    write_json(json_dir, make_material(9))
+    rerun = SqliteMaterialStorage(db_path, legacy_json_dir=str(json_dir))
+    store, _ = load(rerun)
+    assert [material.id for material in store.all()] == [5]
+    rerun.close()
+
+
+def test_migration_without_json_directory(tmp_path):
+    db_path = str(tmp_path / "materials.db")
+    storage = SqliteMaterialStorage(db_path, legacy_json_dir=str(tmp_path / "missing"))
+    store, next_id = load(storage)
+    assert len(store) == 0
+    assert next_id == 1
+    storage.close()
+
+    # Not marked as migrated, so a directory that appears later is still imported
+    write_json(tmp_path / "missing", make_material(4))
+    storage = SqliteMaterialStorage(db_path, legacy_json_dir=str(tmp_path / "missing"))
+    store, _ = load(storage)
+    assert [material.id for material in store.all()] == [4]
+    storage.close()
+
+
+def test_json_storage_round_trip(tmp_path):
+    storage = JsonMaterialStorage(str(tmp_path / "materials"))
+    storage.save_many([make_material(2), make_material(4)])
+    storage.delete(2)
+    store, next_id = load(storage)
+    assert [material.id for material in store.all()] == [4]
+    assert next_id == 5
+
+
+def test_create_material_storage(tmp_path):
+    assert isinstance(create_material_storage("json", str(tmp_path)), JsonMaterialStorage)
+    storage = create_material_storage("sqlite", str(tmp_path))
+    assert isinstance(storage, SqliteMaterialStorage)
+    storage.close()
+    with pytest.raises(ValueError):
+        create_material_storage("mongo", str(tmp_path))
@@ -0,0 +1,127 @@
+import random
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.materials import Material
+from app.services.material_store import MaterialStore
+
+
+def make_material(material_id, cost=1.0, availability="Abundant"):
+    return Material(
+        id=material_id,
+        name=f"Material {material_id}",
+        formula="NaCl",
+        cost=cost,
+        availability=availability,
+        elements=["Na", "Cl"]
+    )
+
+
+def expected_ids(materials, cost_min=None, cost_max=None, availability=None):
+    return sorted(
+        material.id for material in materials
+        if (cost_min is None or material.cost >= cost_min)
+        and (cost_max is None or material.cost <= cost_max)
+        and (availability is None or material.availability.lower() == availability.lower())
+    )
+
+
+def random_materials(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        make_material(material_id, round(rng.uniform(0, 100), 2), rng.choice(["Abundant", "Rare", "Limited"]))
+        for material_id in rng.sample(range(1, count * 3), count)
+    ]
+
+
+def test_get_add_replace_remove():
+    store = MaterialStore()
+    store.add(make_material(1, cost=5.0))
+    store.add(make_material(1, cost=7.0, availability="Rare"))
+
+    assert len(store) == 1
+    assert store.get(1).cost == 7.0
+    assert [m.id for m in store.query(availability="abundant")] == []
+    assert [m.id for m in store.query(availability="RARE")] == [1]
+    assert [m.id for m in store.query(cost_min=6.0, cost_max=8.0)] == [1]
+
+    assert store.remove(1).id == 1
+    assert store.get(1) is None
+    assert store.query(availability="rare") == []
+    assert store.query(cost_min=0.0) == []
+
+
+def test_query_matches_brute_force():
+    materials = random_materials(2000)
+    store = MaterialStore()
+    store.add_many(materials[:1000])
+    # A second batch with IDs interleaved with the first exercises the index merges
+    store.add_many(materials[1000:])
+
+    for cost_min, cost_max, availability in [
+        (None, None, None),
+        (None, None, "rare"),
+        (10.0, 20.0, None),
+        (0.0, 99.0, None),
+        (50.0, None, "Limited"),
+        (None, 0.5, "abundant"),
+        (200.0, None, None)
+    ]:
+        ids = expected_ids(materials, cost_min, cost_max, availability)
+        for skip, limit in [(0, 100), (37, 25), (len(ids) - 3, 10)]:
+            skip = max(skip, 0)
+            page = store.query(cost_min=cost_min, cost_max=cost_max, availability=availability, skip=skip, limit=limit)
+            assert [m.id for m in page] == ids[skip:skip + limit]
+
+
+def test_bulk_add_replaces_existing_ids():
+    store = MaterialStore()
+    store.add_many([make_material(i, cost=float(i)) for i in range(1, 11)])
+    store.add_many([make_material(5, cost=50.0, availability="Rare"), make_material(11, cost=0.5)])
+
+    assert len(store) == 11
+    assert [m.id for m in store.query(cost_min=40.0)] == [5]
+    assert [m.id for m in store.query(cost_max=1.0)] == [1, 11]
+    assert [m.id for m in store.query(availability="rare")] == [5]
+    assert [m.id for m in store.query(availability="abundant", limit=3)] == [1, 2, 3]
+
+
+def test_raw_rows_hydrate_on_access():
+    store = MaterialStore()
+    store.add_rows([(3, "Salt", "NaCl", 2.0, "Abundant", '["Na", "Cl"]')])
+
+    assert [fields for fields in store.iter_fields()] == [(3, "NaCl", 2.0, "Abundant")]
+    material = store.get(3)
+    assert isinstance(material, Material)
+    assert material.elements == ["Na", "Cl"]
+
+
+def test_scan_pages_in_id_order():
+    materials = random_materials(500, seed=1)
+    store = MaterialStore()
+    store.add_many(materials)
+
+    ids = expected_ids(materials, cost_max=60.0, availability="rare")
+    seen, after_id = [], None
+    while True:
+        page = store.scan(after_id=after_id, limit=17, cost_max=60.0, availability="rare")
+        seen.extend(m.id for m in page)
+        if len(page) < 17:
+            break
+        after_id = page[-1].id
+
+    assert seen == ids
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor({"after_id": 42})
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == {"after_id": 42}
+
+
+def test_malformed_cursor_raises_value_error():
+    for cursor in ["not a cursor!", encode_cursor([1, 2])]:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            continue
+        raise AssertionError(f"{cursor!r} was accepted")
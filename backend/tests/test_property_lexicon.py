@@ -0,0 +1,131 @@
+import pytest
+
+from app.models.chat import ChatHistory, ChatMessage
+from app.services.openai_service import OpenAIService
+from app.services.property_lexicon import COMPARATIVE_FACTOR, PropertyLexicon
+
+
+def analyze(text, current_property="hardness", min_confidence=0.8):
+    return PropertyLexicon(min_confidence=min_confidence).analyze([text], current_property)
+
+
+def values(result):
+    return {interp.property_name: interp.technical_value for interp in result.interpretations}
+
+
+@pytest.mark.parametrize("text, current, expected", [
+    ("a band gap of 1.5 eV", "band_gap", {"band_gap": 1.5}),
+    ("density around 2 g/cm3", "density", {"density": 2.0}),
+    ("about 2500 kg/m3", "density", {"density": 2.5}),
+    ("stable up to 500 °C", "thermal_stability", {"thermal_stability": 500.0}),
+    ("stable up to 600 K", "thermal_stability", {"thermal_stability": 326.85}),
+    # GPa names no property; the one under discussion is used
+    ("around 200 GPa", "bulk_modulus", {"bulk_modulus": 200.0}),
+    ("a stiffness of 150000 MPa", "shear_modulus", {"shear_modulus": 150.0}),
+])
+def test_explicit_values_are_converted_to_canonical_units(text, current, expected):
+    result = analyze(text, current)
+    assert values(result) == expected
+    assert result.complete
+    assert result.interpretations[0].confidence == 0.95
+
+
+def test_reference_materials_and_aliases():
+    assert values(analyze("as hard as diamond")) == {"hardness": 100.0}
+    assert values(analyze("light like aluminium", "density")) == {"density": 2.70}
+    # No cue: the reference gives the value of the current property
+    assert values(analyze("something like gaas", "band_gap")) == {"band_gap": 1.42}
+
+
+def test_comparatives_move_away_from_the_reference():
+    assert values(analyze("lighter than steel", "density")) == {"density": round(7.85 / COMPARATIVE_FACTOR, 4)}
+    assert values(analyze("harder than quartz")) == {"hardness": round(12.0 * COMPARATIVE_FACTOR, 4)}
+    assert values(analyze("less dense than iron", "density")) == {"density": round(7.87 / COMPARATIVE_FACTOR, 4)}
+
+
+@pytest.mark.parametrize("text", [
+    "not as hard as diamond",
+    "it shouldn't be as heavy as lead",
+    "no harder than steel",
+])
+def test_negated_clauses_are_left_for_the_llm(text):
+    result = analyze(text)
+    assert result.interpretations == []
+    assert result.unresolved == [text]
+
+
+@pytest.mark.parametrize("text, current", [
+    ("hard as diamond or as light as aluminum", "hardness"),
+    ("somewhere between steel and titanium", "hardness"),
+    ("a band gap between 1 and 2 ev", "band_gap"),
+    ("2 ev or 3 ev", "band_gap"),
+])
+def test_ambiguous_clauses_are_left_for_the_llm(text, current):
+    result = analyze(text, current)
+    assert result.interpretations == []
+    assert len(result.unresolved) == 1
+
+
+def test_qualitative_cues_need_a_lower_threshold():
+    assert analyze("very lightweight", "density").unresolved == ["very lightweight"]
+    assert values(analyze("very lightweight", "density", min_confidence=0.5)) == {"density": 2.0}
+
+
+def test_light_weight_as_two_words_is_a_density_cue():
+    result = analyze("light weight", "density", min_confidence=0.5)
+    assert values(result) == {"density": 2.0}
+
+
+def test_only_the_current_property_completes_a_request():
+    result = analyze("hard as diamond", "band_gap")
+    assert values(result) == {"hardness": 100.0}
+    assert not result.complete
+    assert result.outcome == "partial"
+
+    assert analyze("hard as diamond", "hardness").outcome == "local"
+    # Property names are normalized before the comparison
+    assert analyze("a band gap of 1.5 eV", "Band Gap").complete
+
+
+def test_bare_numbers_are_not_property_mentions():
+    result = analyze("we have 2 prototypes, ideally hard as diamond")
+    assert result.complete
+    assert result.unresolved == []
+
+
+def test_numbers_with_unknown_units_are_left_for_the_llm():
+    result = analyze("a thermal conductivity of 5 w/mk, hard as diamond")
+    assert values(result) == {"hardness": 100.0}
+    assert result.unresolved == ["a thermal conductivity of 5 w/mk"]
+    assert not result.complete
+
+
+def test_later_mentions_override_earlier_ones():
+    lexicon = PropertyLexicon()
+    result = lexicon.analyze(["hard as steel", "actually, as hard as diamond"], "hardness")
+    assert values(result) == {"hardness": 100.0}
+
+
+def test_stats_count_outcomes():
+    lexicon = PropertyLexicon()
+    lexicon.analyze(["hard as diamond"], "hardness")
+    lexicon.analyze(["hard as diamond"], "band_gap")
+    lexicon.analyze(["something nice"], "hardness")
+
+    stats = lexicon.stats()
+    assert (stats["handled_locally"], stats["partially_handled"], stats["fell_back"]) == (1, 1, 1)
+
+
+def test_lexicon_outcomes_are_not_counted_as_cache_hits():
+    service = OpenAIService(api_key="test", property_lexicon=PropertyLexicon())
+    history = ChatHistory(messages=[ChatMessage(role="user", content="as hard as diamond")])
+
+    resolved, _, _ = service._interpret_locally("interpret_chat_for_mattergen", history, "drill bit", "hardness")
+    unresolved, local, _ = service._interpret_locally("interpret_chat_for_mattergen", history, "drill bit", "band_gap")
+
+    assert resolved.suggested_mattergen_params == {"hardness": 100.0}
+    assert unresolved is None and local.outcome == "partial"
+    stats = service.telemetry.method_snapshot("interpret_chat_for_mattergen")
+    assert stats["lexicon"] == {"local": 1, "partial": 1}
+    assert stats["cache_hits"] == 0
+    assert 'llm_lexicon_requests_total{method="interpret_chat_for_mattergen",outcome="local"} 1' in service.telemetry.prometheus()
@@ -0,0 +1,182 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import dependencies
+from app.services.openai_service import normalize_user_level
+from app.services.response_cache import ResponseCache
+
+
+def test_single_flight_calls_the_loader_once():
+    cache = ResponseCache()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load("key", loader) for _ in range(10)))
+
+    assert asyncio.run(run()) == ["value"] * 10
+    assert calls == 1
+    stats = cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["hits"]) == (1, 9, 0)
+    # Waiters for the load are not hits
+    assert stats["hit_rate"] == 0.0
+    assert cache.get("key") == "value"
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_get_or_load_keeps_disk_access_off_the_event_loop(tmp_path):
+    cache = ResponseCache(db_path=str(tmp_path / "cache.db"), max_entries=1)
+    threads = []
+    for name in ("_lookup_disk", "_write"):
+        original = getattr(cache, name)
+
+        def traced(*args, original=original):
+            threads.append(threading.get_ident())
+            return original(*args)
+
+        setattr(cache, name, traced)
+
+    async def load():
+        return "value"
+
+    async def run():
+        first = await cache.get_or_load("a", load)
+        # Evict "a" from memory so the next lookup reads it back from disk
+        await cache.get_or_load("b", load)
+        second = await cache.get_or_load("a", load)
+        return first, second
+
+    assert asyncio.run(run()) == ("value", "value")
+    assert cache.stats()["disk_hits"] == 1
+    # Two misses each read and wrote the disk, then one disk hit
+    assert len(threads) == 5
+    assert threading.get_ident() not in threads
+    cache.close()
+
+
+def test_loader_errors_reach_every_waiter_and_are_not_cached():
+    cache = ResponseCache()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load("key", failing) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cache.get("key") is None
+
+
+def test_cancelled_loader_hands_the_load_to_a_waiter():
+    cache = ResponseCache()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return f"value {calls}"
+
+    async def run():
+        first = asyncio.create_task(cache.get_or_load("key", loader))
+        await asyncio.sleep(0.01)
+        waiters = [asyncio.create_task(cache.get_or_load("key", loader)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(run()) == ["value 2"] * 3
+    assert calls == 2
+
+
+def test_entries_expire_after_the_ttl():
+    cache = ResponseCache(ttl_seconds=0.05)
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+    time.sleep(0.1)
+    assert cache.get("key") is None
+
+
+def test_memory_is_lru_bounded_and_disk_backs_evicted_entries(tmp_path):
+    cache = ResponseCache(db_path=str(tmp_path / "cache.db"), max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, key.upper())
+
+    assert cache.stats()["memory_entries"] == 2
+    assert cache.get("a") == "A"
+    assert cache.stats()["disk_hits"] == 1
+    cache.close()
+
+    reopened = ResponseCache(db_path=str(tmp_path / "cache.db"), max_entries=2)
+    assert reopened.get("c") == "C"
+    reopened.close()
+
+
+def test_disk_table_is_capped(tmp_path):
+    cache = ResponseCache(db_path=str(tmp_path / "cache.db"), max_entries=4, max_disk_entries=20)
+    for i in range(100):
+        cache.set(f"key {i}", "value")
+
+    # Trimmed every max_disk_entries / 10 writes
+    assert cache.stats()["disk_entries"] <= 22
+    # The rows closest to expiry, i.e. the oldest, go first
+    assert cache.get("key 0") is None
+    assert cache.get("key 99") == "value"
+    cache.close()
+
+
+def test_invalidate_by_prefix(tmp_path):
+    cache = ResponseCache(db_path=str(tmp_path / "cache.db"))
+    cache.set("guidance:m:band_gap:beginner", "1")
+    cache.set("guidance:m:band_gap:advanced", "2")
+    cache.set("guidance:m:density:beginner", "3")
+
+    assert cache.invalidate("guidance:m:band_gap:") == 2
+    assert cache.get("guidance:m:band_gap:beginner") is None
+    assert cache.get("guidance:m:density:beginner") == "3"
+    cache.close()
+
+
+@pytest.mark.parametrize("level, expected", [
+    ("Beginner", "beginner"),
+    (" ADVANCED ", "advanced"),
+    ("intermediate", "intermediate"),
+    ("'; drop table", "beginner"),
+    (None, "beginner"),
+])
+def test_user_levels_are_normalized(level, expected):
+    assert normalize_user_level(level) == expected
+
+
+def test_admin_endpoints_disabled_with_the_default_secret(monkeypatch):
+    monkeypatch.setattr(dependencies.settings, "SECRET_KEY", dependencies.DEV_SECRET_KEY)
+    with pytest.raises(HTTPException) as error:
+        dependencies.require_admin(dependencies.DEV_SECRET_KEY)
+    assert error.value.status_code == 503
+
+    monkeypatch.setattr(dependencies.settings, "SECRET_KEY", "")
+    with pytest.raises(HTTPException) as error:
+        dependencies.require_admin("")
+    assert error.value.status_code == 503
+
+
+def test_admin_key_must_match_a_configured_secret(monkeypatch):
+    monkeypatch.setattr(dependencies.settings, "SECRET_KEY", "s3cret")
+    dependencies.require_admin("s3cret")
+    for key in (None, "wrong"):
+        with pytest.raises(HTTPException) as error:
+            dependencies.require_admin(key)
+        assert error.value.status_code == 403
@@ -0,0 +1,84 @@
+from app.services.openai_service import OpenAIService
+from app.services.semantic_cache import SemanticCache, quantities
+
+
+def key(text, goal="battery", prop="band_gap"):
+    return OpenAIService._semantic_cache_key(goal, prop, text)
+
+
+def test_quantities_are_normalized_and_sorted():
+    assert quantities("density 2 g/cm3 and a band gap of 1.50 eV at 300K") == ("1.5 ev", "2 g/cm3", "300 k")
+    assert quantities("no numbers here, just item3 and v2") == ()
+
+
+def test_rewording_hits():
+    cache = SemanticCache()
+    stored = "I need a band gap of about 1.5 eV for a solar absorber"
+    cache.add(key(stored), cache.embed(stored), "cached")
+
+    reworded = "i need a band gap of about 1.5 ev for the solar absorber please"
+    assert cache.lookup(key(reworded), cache.embed(reworded)) == "cached"
+
+
+def test_different_numbers_miss():
+    cache = SemanticCache()
+    stored = "I need a band gap of about 1.5 eV for a solar absorber"
+    cache.add(key(stored), cache.embed(stored), "cached")
+
+    # The texts embed almost identically; only the exact key tells them apart
+    changed = "I need a band gap of about 3.5 eV for a solar absorber"
+    assert float(cache.embed(stored) @ cache.embed(changed)) >= cache.threshold
+    assert cache.lookup(key(changed), cache.embed(changed)) is None
+
+    other_unit = "I need a band gap of about 1.5 meV for a solar absorber"
+    assert cache.lookup(key(other_unit), cache.embed(other_unit)) is None
+
+
+def test_goal_and_property_partition():
+    cache = SemanticCache()
+    text = "something very hard and light"
+    cache.add(key(text), cache.embed(text), "cached")
+    assert cache.lookup(key(text, prop="hardness"), cache.embed(text)) is None
+    assert cache.lookup(key(text, goal="Battery "), cache.embed(text)) == "cached"
+
+
+def test_total_entries_and_memory_stay_bounded():
+    cache = SemanticCache(max_entries_per_key=8, max_entries=50, dim=64)
+    for i in range(200):
+        text = f"a stable oxide with a band gap of {i} eV"
+        cache.add(key(text), cache.embed(text), f"response {i}")
+
+    stats = cache.stats()
+    assert stats["entries"] <= 50
+    assert stats["keys"] <= 50
+    assert stats["evicted_keys"] == 200 - stats["keys"]
+    # Partitions grow by doubling, so at most twice the rows in use are allocated
+    assert stats["memory_bytes"] <= 2 * 50 * 64 * 4
+
+
+def test_least_recently_used_keys_are_dropped_first():
+    cache = SemanticCache(max_entries_per_key=4, max_entries=6, dim=64)
+    texts = {goal: f"a {goal} material for batteries" for goal in ("light", "hard", "cheap")}
+    keys = {goal: key(text, goal=goal) for goal, text in texts.items()}
+    for goal in ("light", "hard"):
+        for _ in range(3):
+            cache.add(keys[goal], cache.embed(texts[goal]), goal)
+
+    # Using "light" makes "hard" the least recently used
+    assert cache.lookup(keys["light"], cache.embed(texts["light"])) == "light"
+    cache.add(keys["cheap"], cache.embed(texts["cheap"]), "cheap")
+
+    assert cache.lookup(keys["hard"], cache.embed(texts["hard"])) is None
+    assert cache.lookup(keys["light"], cache.embed(texts["light"])) == "light"
+    assert cache.lookup(keys["cheap"], cache.embed(texts["cheap"])) == "cheap"
+    assert cache.stats()["entries"] == 4
+
+
+def test_one_key_cannot_outgrow_the_total_cap():
+    cache = SemanticCache(max_entries_per_key=512, max_entries=10, dim=64)
+    for i in range(30):
+        text = f"some light material, variant {i}"
+        cache.add(key("light"), cache.embed(text), str(i))
+
+    assert cache.stats()["entries"] == 10
+    assert cache.stats()["keys"] == 1
@@ -0,0 +1,136 @@
+import gc
+import time
+import asyncio
+import sqlite3
+
+from app.models.chat import ChatMessage, MessageRole
+from app.services.session_store import SessionStore
+
+
+def message(role, content):
+    return ChatMessage(role=role, content=content)
+
+
+def turn(question, answer):
+    return [message(MessageRole.USER, question), message(MessageRole.ASSISTANT, answer)]
+
+
+def contents(messages):
+    return [m.content for m in messages]
+
+
+def test_append_and_get_in_memory():
+    store = SessionStore()
+    session_id = store.create({"topic": "batteries"})
+    assert store.append(session_id, turn("q1", "a1"))
+    assert store.append(session_id, turn("q2", "a2"))
+
+    session = store.get(session_id)
+    assert session.metadata == {"topic": "batteries"}
+    assert contents(session.messages) == ["q1", "a1", "q2", "a2"]
+    assert not store.append("missing", turn("q", "a"))
+    assert store.get("missing") is None
+
+
+def test_evicted_session_without_database_is_gone():
+    store = SessionStore(max_memory_bytes=10)
+    first = store.create()
+    store.append(first, turn("x" * 8, "y" * 8))
+    second = store.create()
+    store.append(second, turn("z", "w"))
+
+    assert store.get(first) is None
+    assert contents(store.messages(second)) == ["z", "w"]
+
+
+def test_eviction_keeps_memory_under_cap_and_reloads_from_disk(tmp_path):
+    store = SessionStore(db_path=str(tmp_path / "sessions.db"), max_memory_bytes=40)
+    ids = []
+    for index in range(5):
+        session_id = store.create()
+        store.append(session_id, turn(f"q{index}" * 5, f"a{index}" * 5))
+        ids.append(session_id)
+
+    stats = store.stats()
+    assert stats["memory_bytes"] <= 40
+    assert stats["sessions_in_memory"] < 5
+    assert stats["sessions_on_disk"] == 5
+
+    # Evicted sessions come back with their full logs
+    for index, session_id in enumerate(ids):
+        assert contents(store.messages(session_id)) == [f"q{index}" * 5, f"a{index}" * 5]
+
+
+def test_seq_continues_after_reload(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+    store = SessionStore(db_path=db_path, max_memory_bytes=10)
+    session_id = store.create()
+    store.append(session_id, turn("q1", "a1"))
+
+    # Push the session out of memory, then append to the reloaded copy
+    other = store.create()
+    store.append(other, turn("x" * 20, "y"))
+    assert session_id not in store._sessions
+    assert store.append(session_id, turn("q2", "a2"))
+    store.close()
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        "SELECT seq, content FROM session_messages WHERE session_id = ? ORDER BY seq",
+        (session_id,)
+    ).fetchall()
+    conn.close()
+    assert rows == [(0, "q1"), (1, "a1"), (2, "q2"), (3, "a2")]
+
+    reopened = SessionStore(db_path=db_path)
+    assert contents(reopened.messages(session_id)) == ["q1", "a1", "q2", "a2"]
+    reopened.close()
+
+
+def test_lock_survives_eviction_while_held(tmp_path):
+    store = SessionStore(db_path=str(tmp_path / "sessions.db"), max_memory_bytes=10)
+    session_id = store.create()
+    lock = store.lock(session_id)
+
+    async def scenario():
+        async with lock:
+            other = store.create()
+            store.append(other, turn("x" * 20, "y"))
+            assert session_id not in store._sessions
+            # The reloaded session must be serialized by the lock still held
+            assert store.lock(session_id) is lock
+            assert lock.locked()
+
+    asyncio.run(scenario())
+
+
+def test_unreferenced_lock_is_released_after_eviction(tmp_path):
+    store = SessionStore(db_path=str(tmp_path / "sessions.db"), max_memory_bytes=10)
+    session_id = store.create()
+    other = store.create()
+    store.append(other, turn("x" * 20, "y"))
+    assert session_id not in store._sessions
+
+    gc.collect()
+    assert session_id not in store._locks
+
+
+def test_idle_sessions_expire(tmp_path, monkeypatch):
+    store = SessionStore(db_path=str(tmp_path / "sessions.db"), idle_ttl_seconds=60, prune_interval_seconds=0)
+    session_id = store.create()
+    store.append(session_id, turn("q", "a"))
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    assert store.get(session_id) is None
+    assert store.stats()["sessions_on_disk"] == 0
+
+
+def test_delete(tmp_path):
+    store = SessionStore(db_path=str(tmp_path / "sessions.db"))
+    session_id = store.create()
+    store.append(session_id, turn("q", "a"))
+    assert store.delete(session_id)
+    assert not store.delete(session_id)
+    assert store.get(session_id) is None
+    assert store.stats()["memory_bytes"] == 0
@@ -0,0 +1,82 @@
+import json
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.llm_transport import RecordingTransport, ReplayTransport
+from app.services.openai_service import OpenAIService
+
+
+EXTRACTION_PARAMS = {"band_gap": 1.5}
+PLAIN_ANSWER = "A band gap around 1.5 eV suits solar cells."
+
+
+def completion(content):
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 1,
+        "model": "gpt-4o",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 20, "completion_tokens": 10, "total_tokens": 30}
+    }
+
+
+def provider(structured_content):
+    """A fake provider answering the single-pass call with `structured_content`"""
+    def handle(request):
+        payload = json.loads(request.content)
+        if "response_format" not in payload:
+            return httpx.Response(200, json=completion(PLAIN_ANSWER))
+        if "extract the material properties" in payload["messages"][-1]["content"]:
+            return httpx.Response(200, json=completion(json.dumps({"mattergen_params": EXTRACTION_PARAMS})))
+        return httpx.Response(200, json=completion(structured_content))
+    return handle
+
+
+def process(transport):
+    async def run():
+        service = OpenAIService(api_key="test", transport=transport)
+        try:
+            response = await service.process_query("Something for solar cells", {"extract_params": True})
+        finally:
+            await service.close()
+        return response, service
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("structured_content, reason, text", [
+    ("Sure! Here you go", "unusable_answer", PLAIN_ANSWER),
+    (json.dumps({"text": "  "}), "unusable_answer", PLAIN_ANSWER),
+    (json.dumps({"text": "Try silicon.", "interpretations": [{"unit": "eV"}]}), "invalid_fields", "Try silicon."),
+])
+def test_malformed_structured_responses_fall_back_to_extra_calls(tmp_path, structured_content, reason, text):
+    cassette = str(tmp_path / "cassette.jsonl")
+    recorded, _ = process(RecordingTransport(httpx.MockTransport(provider(structured_content)), cassette))
+
+    # The replay must reproduce the same calls exactly
+    transport = ReplayTransport(cassette, latency="none", strict=True)
+    response, service = process(transport)
+
+    assert response.text == text
+    assert response.mattergen_params == EXTRACTION_PARAMS
+    assert response == recorded
+    assert transport.stats()["missed"] == 0
+    methods = service.telemetry.snapshot()["methods"]
+    assert methods["process_query"]["fallbacks"] == {reason: 1}
+    assert methods["extract_params"]["calls"] == 1
+
+
+def test_valid_structured_response_needs_one_call(tmp_path):
+    structured = {"text": "Try silicon.", "mattergen_params": {"band_gap": 1.1}, "interpretations": []}
+    cassette = str(tmp_path / "cassette.jsonl")
+    process(RecordingTransport(httpx.MockTransport(provider(json.dumps(structured))), cassette))
+
+    response, service = process(ReplayTransport(cassette, latency="none", strict=True))
+
+    assert response.mattergen_params == {"band_gap": 1.1}
+    methods = service.telemetry.snapshot()["methods"]
+    assert methods["process_query"]["calls"] == 1
+    assert methods["process_query"]["fallbacks"] == {}
+    assert "extract_params" not in methods
@@ -0,0 +1,114 @@
+from app.models.templates import DesignTemplate
+from app.services.template_index import TemplateSearchIndex, normalize_element, tokenize
+
+
+def template(template_id, display_name, description="", category="energy", elements=(), explanations=None, prompts=None):
+    return DesignTemplate(
+        id=template_id,
+        name=template_id,
+        display_name=display_name,
+        description=description,
+        category=category,
+        icon="flask",
+        default_properties=[],
+        suggested_elements=list(elements),
+        property_explanations=explanations or {},
+        prompts=prompts or {}
+    )
+
+
+def build():
+    index = TemplateSearchIndex()
+    index.update([
+        template("battery", "Battery Material", "High conductivity electrode for batteries", "energy", ["Li", "Co", "O"]),
+        template("solar", "Solar Panel Material", "Absorbs sunlight for solar cells", "energy", ["Si", "Ga", "As"]),
+        template("catalyst", "Chemical Catalyst", "Speeds up reactions such as battery recycling", "chemistry", ["Pt", "Co"]),
+        template("structural", "Structural Material", "Strong and light", "construction", ["Fe", "C"],
+                 explanations={"bulk_modulus": "Resistance to compression"})
+    ])
+    return index
+
+
+def ids(result):
+    return [template_id for template_id, _ in result[1]]
+
+
+def test_tokenize_and_normalize():
+    assert tokenize("Batteries, Cells & glass!") == ["batterie", "cell", "glass"]
+    assert normalize_element(" li ") == "Li"
+
+
+def test_display_name_outranks_description():
+    index = build()
+    total, hits = index.search("battery")
+    assert total == 2
+    assert [template_id for template_id, _ in hits] == ["battery", "catalyst"]
+    assert hits[0][1] > hits[1][1] > 0
+
+
+def test_rare_terms_weigh_more():
+    index = build()
+    # "material" is in three names, "solar" in one
+    assert ids(index.search("material solar"))[0] == "solar"
+
+
+def test_property_keys_are_searchable():
+    assert ids(build().search("bulk_modulus")) == ["structural"]
+
+
+def test_prefix_expansion_for_last_word():
+    index = build()
+    assert ids(index.search("catal")) == ["catalyst"]
+    assert index.search("catal", prefix=False) == (0, [])
+    # Only the last word is expanded
+    assert index.search("catal battery", prefix=True)[0] == 2
+
+
+def test_element_and_category_filters():
+    index = build()
+    assert ids(index.search("", elements=["co"])) == ["battery", "catalyst"]
+    assert ids(index.search("", elements=["Co", "Li"])) == ["battery"]
+    assert ids(index.search("battery", category="chemistry")) == ["catalyst"]
+    assert index.search("battery", elements=["Xe"]) == (0, [])
+
+
+def test_empty_query_lists_by_display_name():
+    index = build()
+    assert ids(index.search("")) == ["battery", "catalyst", "solar", "structural"]
+    assert all(score == 0.0 for _, score in index.search("")[1])
+
+
+def test_pagination_reports_total_matches():
+    index = build()
+    total, page = index.search("material", offset=1, limit=1)
+    assert total == 3
+    assert len(page) == 1
+    assert ids(index.search("material"))[1] == page[0][0]
+
+
+def test_update_and_remove():
+    index = build()
+    index.update([template("battery", "Flow Cell", "Vanadium redox", "energy", ["V"])])
+    assert ids(index.search("battery")) == ["catalyst"]
+    assert ids(index.search("vanadium")) == ["battery"]
+    assert ids(index.search("", elements=["Li"])) == []
+
+    index.remove(["battery", "missing"])
+    assert index.search("vanadium") == (0, [])
+    assert len(index) == 3
+    stats = index.stats()
+    assert stats["templates"] == 3
+    assert "vanadium" not in index._postings
+
+    # Freed rows are reused
+    index.update([template("new", "Vanadium Cell", "", "energy", ["V"])])
+    assert ids(index.search("vanadium")) == ["new"]
+
+
+def test_many_templates_grow_rows():
+    index = TemplateSearchIndex(initial_capacity=2)
+    index.update([template(f"t{i}", f"Template {i}", "common words", "energy", ["Fe"]) for i in range(10)])
+    total, hits = index.search("common", limit=3)
+    assert total == 10
+    # Equal scores keep insertion order
+    assert [template_id for template_id, _ in hits] == ["t0", "t1", "t2"]
@@ -0,0 +1,142 @@
+import json
+import math
+import random
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.dependencies import get_template_service
+from app.routers import templates
+from app.services.template_popularity import DecayedSpaceSaving, TemplatePopularityTracker, EVENT_WEIGHTS
+from app.services.template_service import TemplateService
+
+HOUR = 3600.0
+
+
+def test_counts_without_eviction_are_exact():
+    sketch = DecayedSpaceSaving(capacity=10, half_life=HOUR, landmark=0.0)
+    for key, times in [("a", 3), ("b", 1), ("c", 2)]:
+        for _ in range(times):
+            sketch.add(key, now=0.0)
+
+    assert sketch.top(now=0.0) == [("a", 3.0, 0.0), ("c", 2.0, 0.0), ("b", 1.0, 0.0)]
+    assert [key for key, _, _ in sketch.top(2, now=0.0)] == ["a", "c"]
+
+
+def test_counts_halve_every_half_life():
+    sketch = DecayedSpaceSaving(capacity=10, half_life=HOUR, landmark=0.0)
+    sketch.add("old", 8.0, now=0.0)
+    sketch.add("new", 3.0, now=2 * HOUR)
+
+    top = sketch.top(now=2 * HOUR)
+    assert top[0][0] == "new"
+    assert top[1][1] == pytest.approx(2.0)
+    assert sketch.top(now=3 * HOUR)[0][1] == pytest.approx(1.5)
+
+
+def test_eviction_inherits_the_smallest_count_as_error():
+    sketch = DecayedSpaceSaving(capacity=2, half_life=HOUR, landmark=0.0)
+    sketch.add("a", 5.0, now=0.0)
+    sketch.add("b", 2.0, now=0.0)
+    sketch.add("c", 1.0, now=0.0)
+
+    assert len(sketch) == 2
+    assert dict((key, (count, error)) for key, count, error in sketch.top(now=0.0)) == {
+        "a": (5.0, 0.0),
+        "c": (3.0, 2.0)
+    }
+
+
+def test_heavy_hitters_are_tracked_within_the_error_bound():
+    rng = random.Random(7)
+    capacity = 20
+    sketch = DecayedSpaceSaving(capacity=capacity, half_life=1e9, landmark=0.0)
+    true_counts = {}
+    keys = [f"hot{i}" for i in range(5)] * 40 + [f"cold{i}" for i in range(400)]
+    rng.shuffle(keys)
+    for key in keys:
+        sketch.add(key, now=0.0)
+        true_counts[key] = true_counts.get(key, 0) + 1
+
+    total = sum(true_counts.values())
+    tracked = {key: (count, error) for key, count, error in sketch.top(now=0.0)}
+    for key, true_count in true_counts.items():
+        if true_count > total / capacity:
+            assert key in tracked
+    for key, (count, error) in tracked.items():
+        # Never an underestimate, and over by at most the recorded error
+        assert count - error <= true_counts[key] + 1e-9 <= count + 1e-9
+
+
+def test_rescale_preserves_decayed_counts():
+    sketch = DecayedSpaceSaving(capacity=10, half_life=1.0, landmark=0.0)
+    sketch.add("a", 1.0, now=0.0)
+    # Far enough that the forward-decay exponent would overflow the limit
+    later = 80.0
+    sketch.add("b", 1.0, now=later)
+
+    assert sketch.landmark == later
+    top = dict((key, count) for key, count, _ in sketch.top(now=later))
+    assert top["b"] == pytest.approx(1.0)
+    assert top["a"] == pytest.approx(2.0 ** -later)
+    assert all(math.isfinite(counter[0]) for counter in sketch.counters.values())
+
+
+def test_round_trip_decays_to_now_and_trims_to_capacity():
+    sketch = DecayedSpaceSaving(capacity=5, half_life=HOUR, landmark=0.0)
+    for index, key in enumerate("abcde"):
+        sketch.add(key, float(index + 1), now=0.0)
+
+    data = json.loads(json.dumps(sketch.to_dict()))
+    restored = DecayedSpaceSaving.from_dict(data, capacity=3, half_life=2 * HOUR, now=HOUR)
+
+    assert restored.landmark == HOUR
+    assert restored.half_life == 2 * HOUR
+    # Decayed under the saved half-life, keeping the three largest
+    assert [(key, round(count, 6)) for key, count, _ in restored.top(now=HOUR)] == [("e", 2.5), ("d", 2.0), ("c", 1.5)]
+
+
+def test_tracker_records_ranks_and_persists(tmp_path):
+    path = str(tmp_path / "popularity.json")
+    tracker = TemplatePopularityTracker(path, capacity=8, refresh_interval=3600, flush_interval=3600)
+    tracker.record("battery", "design")
+    tracker.record("solar", "view")
+    tracker.record("solar", "view")
+    assert tracker.top(5) == []
+
+    tracker.refresh()
+    ranked = tracker.top(5)
+    assert [template_id for template_id, _, _ in ranked] == ["battery", "solar"]
+    assert ranked[0][1] == pytest.approx(EVENT_WEIGHTS["design"], rel=1e-3)
+    tracker.close()
+
+    reopened = TemplatePopularityTracker(path, capacity=8, refresh_interval=3600, flush_interval=3600)
+    assert [template_id for template_id, _, _ in reopened.top(5)] == ["battery", "solar"]
+    reopened.close()
+
+
+def test_tracker_starts_afresh_from_a_corrupt_file(tmp_path):
+    path = tmp_path / "popularity.json"
+    path.write_text("{broken")
+    tracker = TemplatePopularityTracker(str(path), refresh_interval=3600, flush_interval=3600)
+    assert tracker.top(5) == []
+    tracker.close()
+
+
+def test_not_modified_template_responses_are_not_counted_as_views(tmp_path):
+    tracker = TemplatePopularityTracker(str(tmp_path / "popularity.json"), refresh_interval=3600, flush_interval=3600)
+    service = TemplateService(str(tmp_path / "templates"), popularity=tracker)
+    app = FastAPI()
+    app.include_router(templates.router, prefix="/api/templates")
+    app.dependency_overrides[get_template_service] = lambda: service
+    client = TestClient(app)
+
+    first = client.get("/api/templates/battery_material")
+    assert first.status_code == 200
+    cached = client.get("/api/templates/battery_material", headers={"If-None-Match": first.headers["ETag"]})
+    assert cached.status_code == 304
+
+    counts = {template_id: count for template_id, count, _ in tracker.sketch.top()}
+    assert counts == {"battery_material": pytest.approx(EVENT_WEIGHTS["view"])}
+    service.close()
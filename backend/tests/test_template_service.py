@@ -0,0 +1,128 @@
+import os
+import json
+import asyncio
+
+import pytest
+
+from app.models.templates import DesignTemplate
+from app.services.template_service import TemplateService
+
+
+def template_data(template_id, display_name=None, category="energy", elements=("Li", "O"), description="A material"):
+    return {
+        "id": template_id,
+        "name": template_id,
+        "display_name": display_name or template_id.replace("_", " ").title(),
+        "description": description,
+        "category": category,
+        "icon": "flask",
+        "default_properties": [],
+        "suggested_elements": list(elements),
+        "property_explanations": {},
+        "prompts": {}
+    }
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = TemplateService(str(tmp_path))
+    yield service
+    service.close()
+
+
+def write(service, name, data):
+    path = service.templates_path / name
+    with open(path, "w") as f:
+        json.dump(data, f)
+    # Make sure the change is seen even within the timestamp resolution
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_default_templates_are_loaded(service):
+    assert {"battery_material", "solar_material", "catalyst", "structural_material"} <= set(service.templates_cache)
+    assert not service.load_errors
+
+
+def test_duplicate_id_is_reported_and_skipped(service):
+    write(service, "a_first.json", template_data("shared", display_name="First"))
+    write(service, "b_second.json", template_data("shared", display_name="Second"))
+    service.refresh()
+
+    assert service.templates_cache["shared"].display_name == "First"
+    assert "shared" in service.load_errors["b_second.json"]
+    assert "a_first.json" in service.load_errors["b_second.json"]
+
+
+def test_duplicate_takes_over_when_the_owner_is_deleted(service):
+    write(service, "a_first.json", template_data("shared", display_name="First"))
+    write(service, "b_second.json", template_data("shared", display_name="Second"))
+    service.refresh()
+
+    os.remove(service.templates_path / "a_first.json")
+    assert service.refresh()
+    assert service.templates_cache["shared"].display_name == "Second"
+    assert "b_second.json" not in service.load_errors
+
+
+def test_deleting_the_duplicate_keeps_the_owner(service):
+    write(service, "a_first.json", template_data("shared", display_name="First"))
+    write(service, "b_second.json", template_data("shared", display_name="Second"))
+    service.refresh()
+
+    os.remove(service.templates_path / "b_second.json")
+    service.refresh()
+    assert service.templates_cache["shared"].display_name == "First"
+    assert not service.load_errors
+
+    os.remove(service.templates_path / "a_first.json")
+    service.refresh()
+    assert "shared" not in service.templates_cache
+
+
+def test_duplicate_takes_over_when_the_owner_changes_id(service):
+    write(service, "a_first.json", template_data("shared", display_name="First"))
+    write(service, "b_second.json", template_data("shared", display_name="Second"))
+    service.refresh()
+
+    write(service, "a_first.json", template_data("renamed", display_name="First"))
+    service.refresh(["a_first.json"])
+    assert service.templates_cache["renamed"].display_name == "First"
+    assert service.templates_cache["shared"].display_name == "Second"
+    assert not service.load_errors
+
+
+def test_duplicate_keeps_the_files_last_good_version(service):
+    write(service, "a_first.json", template_data("shared", display_name="First"))
+    write(service, "b_second.json", template_data("own", display_name="Own"))
+    service.refresh()
+
+    write(service, "b_second.json", template_data("shared", display_name="Second"))
+    service.refresh()
+    assert service.templates_cache["shared"].display_name == "First"
+    assert service.templates_cache["own"].display_name == "Own"
+    assert "b_second.json" in service.load_errors
+
+
+def test_invalid_file_keeps_last_good_version(service):
+    write(service, "custom.json", template_data("custom", display_name="Good"))
+    service.refresh()
+    path = service.templates_path / "custom.json"
+    with open(path, "w") as f:
+        f.write("{not json")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2_000_000))
+
+    assert not service.refresh()
+    assert service.templates_cache["custom"].display_name == "Good"
+    assert "custom.json" in service.load_errors
+
+
+def test_search_total_matches_results_during_reload(service):
+    # A template indexed by a reload whose cache swap hasn't happened yet
+    service.search_index.update([DesignTemplate(**template_data("pending_battery", display_name="Battery Pack"))])
+    response = asyncio.run(service.search_templates("battery"))
+
+    ids = [hit.template.id for hit in response.results]
+    assert "pending_battery" not in ids
+    assert response.total == len(ids)
@@ -0,0 +1,168 @@
+import io
+import os
+import asyncio
+import tempfile
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+
+from app.core.uploads import MULTIPART_OVERHEAD, UploadSizeLimitMiddleware, UploadTooLarge, save_upload_to_temp
+
+
+MAX_SIZE = 1000
+
+
+@pytest.fixture(autouse=True)
+def temp_dir(tmp_path, monkeypatch):
+    """Send temporary files to a directory the test can inspect"""
+    directory = tmp_path / "tmp"
+    directory.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(directory))
+    return directory
+
+
+def upload(data, size=None):
+    return UploadFile(io.BytesIO(data), size=size, filename="dataset.csv")
+
+
+def test_save_upload_streams_to_a_temp_file(temp_dir):
+    data = b"Material,Formula\n" * 50
+    path = asyncio.run(save_upload_to_temp(upload(data), max_size=MAX_SIZE))
+    try:
+        assert os.path.dirname(path) == str(temp_dir)
+        assert path.endswith(".csv")
+        with open(path, "rb") as f:
+            assert f.read() == data
+    finally:
+        os.unlink(path)
+
+
+def test_oversized_upload_is_rejected_and_removed(temp_dir):
+    with pytest.raises(UploadTooLarge) as info:
+        asyncio.run(save_upload_to_temp(upload(b"x" * (MAX_SIZE + 1)), max_size=MAX_SIZE))
+    assert info.value.status_code == 413
+    assert os.listdir(temp_dir) == []
+
+
+def test_declared_size_is_checked_before_reading(temp_dir):
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(save_upload_to_temp(upload(b"small", size=MAX_SIZE + 1), max_size=MAX_SIZE))
+    assert os.listdir(temp_dir) == []
+
+
+def test_temp_file_is_removed_when_reading_fails(temp_dir):
+    class FailingUpload:
+        size = None
+
+        async def read(self, size):
+            raise OSError("connection reset")
+
+    with pytest.raises(OSError):
+        asyncio.run(save_upload_to_temp(FailingUpload(), max_size=MAX_SIZE))
+    assert os.listdir(temp_dir) == []
+
+
+def make_app(received):
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload_route(file: UploadFile = File(...)):
+        received.append(await file.read())
+        return {"ok": True}
+
+    @app.post("/other")
+    async def other_route():
+        return {"ok": True}
+
+    return UploadSizeLimitMiddleware(app, max_size=MAX_SIZE, paths=["/upload"])
+
+
+def multipart(data):
+    boundary = "boundary123"
+    body = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="dataset.csv"\r\n'
+        "Content-Type: text/csv\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}".encode()
+
+
+def call(app, path, body=b"", headers=(), chunk_size=None):
+    """Run one request through an ASGI app; returns (status, body, whether the body was fully read)"""
+    chunks = [body] if chunk_size is None else [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+    sent = []
+    reads = {"count": 0}
+
+    async def receive():
+        if reads["count"] < len(chunks):
+            index = reads["count"]
+            reads["count"] += 1
+            return {"type": "http.request", "body": chunks[index], "more_body": index < len(chunks) - 1}
+        await asyncio.sleep(0)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": list(headers),
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80)
+    }
+    asyncio.run(app(scope, receive, send))
+    status = next(message["status"] for message in sent if message["type"] == "http.response.start")
+    content = b"".join(message.get("body", b"") for message in sent if message["type"] == "http.response.body")
+    return status, content, reads["count"] == len(chunks)
+
+
+def test_upload_within_limit_passes_through():
+    received = []
+    body, content_type = multipart(b"a,b\n1,2\n")
+    status, _, _ = call(
+        make_app(received), "/upload", body,
+        [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]
+    )
+    assert status == 200
+    assert received == [b"a,b\n1,2\n"]
+
+
+def test_oversized_content_length_is_rejected_without_reading():
+    received = []
+    body, content_type = multipart(b"x" * (MAX_SIZE + MULTIPART_OVERHEAD + 1))
+    status, content, _ = call(
+        make_app(received), "/upload", body,
+        [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]
+    )
+    assert status == 413
+    assert b"maximum upload size" in content
+    assert received == []
+
+
+def test_oversized_chunked_body_is_aborted():
+    received = []
+    body, content_type = multipart(b"x" * 3 * (MAX_SIZE + MULTIPART_OVERHEAD))
+    status, _, fully_read = call(make_app(received), "/upload", body, [(b"content-type", content_type)], chunk_size=4096)
+    assert status == 413
+    assert received == []
+    assert not fully_read
+
+
+def test_malformed_content_length_is_a_bad_request():
+    received = []
+    status, content, _ = call(make_app(received), "/upload", b"", [(b"content-length", b"12abc")])
+    assert status == 400
+    assert b"Invalid Content-Length header" in content
+
+
+def test_other_paths_are_not_limited():
+    status, _, _ = call(make_app([]), "/other", b"x" * (MAX_SIZE * 100), [(b"content-length", b"not checked")])
+    assert status == 200